@@ -1,7 +1,22 @@
-from flask import Flask, request, session, redirect
+from flask import Flask, Response, jsonify, request, session, redirect
 from datetime import datetime
+from functools import lru_cache, wraps
+from collections import Counter
+import bisect
+import gzip
+import hashlib
+import heapq
+import os
+import threading
 import unicodedata
 
+from persistencia import ArmazenamentoMemoria, ArmazenamentoSQLite, DiarioEventos
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: sem ele as páginas fixas saem só em gzip
+    brotli = None
+
 app = Flask(__name__)
 app.secret_key = 'reagentes-secret-2024'
 
@@ -11,7 +26,7 @@ app.secret_key = 'reagentes-secret-2024'
 
 def remover_acentos(texto):
     """Remove acentos de um texto."""
-    if not texto:
+    if not texto or texto.isascii():
         return texto
     nfd = unicodedata.normalize('NFD', texto)
     sem_acentos = ''.join(char for char in nfd if unicodedata.category(char) != 'Mn')
@@ -21,6 +36,20 @@ def normalizar_para_comparacao(texto):
     """Prepara texto para comparação."""
     return remover_acentos(texto).lower()
 
+@lru_cache(maxsize=2048)
+def normalizar_busca(texto):
+    """Normaliza um termo de busca, memorizando os termos mais recentes."""
+    return normalizar_para_comparacao(texto)
+
+# Campos de cada registro cuja versão normalizada é gravada em registro['_busca']
+CAMPOS_BUSCA_REAGENTE = ('nome', 'marca', 'volume_nominal', 'localizacao')
+CAMPOS_BUSCA_USUARIO = ('username',)
+
+def preencher_campos_busca(registro, campos, normalizar=normalizar_para_comparacao):
+    """Grava em registro['_busca'] as chaves de busca normalizadas, uma vez por escrita."""
+    registro['_busca'] = {campo: normalizar(registro.get(campo) or '') for campo in campos}
+    return registro
+
 # Dados em memória
 reagentes_data = [
     {'id': 1, 'nome': 'Água Destilada', 'volume_nominal': '1L', 'quantidade_embalagens': 10, 'marca': 'Synth', 'localizacao': 'Prateleira A1'},
@@ -33,6 +62,10 @@ pedidos_data = [
     {'id': 2, 'reagente': 'Potássio', 'data': '2024-08-22', 'controlado': 'Não', 'status': 'Aberto', 'quantidade_nominal': '250g'}
 ]
 
+# Quantidade de pedidos por status, mantida a cada criação/finalização
+contagem_pedidos = Counter(p['status'] for p in pedidos_data)
+trava_pedidos = threading.Lock()
+
 entradas_data = []
 saidas_data = []
 
@@ -80,6 +113,55 @@ usuarios_data = [
     }
 ]
 
+# Último ID atribuído em cada coleção. Só cresce, então um ID nunca é
+# reaproveitado depois de uma remoção; é salvo junto com os snapshots.
+COLECOES = {
+    'reagentes': reagentes_data,
+    'pedidos': pedidos_data,
+    'entradas': entradas_data,
+    'saidas': saidas_data,
+    'usuarios': usuarios_data
+}
+sequencias_id = {}
+trava_sequencias = threading.Lock()
+
+def iniciar_sequencias(valores=None):
+    """Define as sequências; sem valores salvos, parte do maior ID de cada coleção."""
+    valores = valores or {}
+    with trava_sequencias:
+        for colecao, registros in COLECOES.items():
+            if colecao in valores:
+                sequencias_id[colecao] = valores[colecao]
+            else:
+                sequencias_id[colecao] = max((r['id'] for r in registros), default=0)
+
+def proximo_id(colecao):
+    with trava_sequencias:
+        sequencias_id[colecao] += 1
+        return sequencias_id[colecao]
+
+def avancar_sequencia(colecao, ultimo_id):
+    """Garante que a sequência já passou de ultimo_id (ao reaplicar eventos)."""
+    with trava_sequencias:
+        if ultimo_id > sequencias_id[colecao]:
+            sequencias_id[colecao] = ultimo_id
+
+def id_registro(registro):
+    return registro['id']
+
+def atribuir_id(colecao, registro):
+    """Dá ao registro o próximo ID da coleção, ou avança a sequência até o ID que ele já traz.
+
+    Chamar sob a mesma trava que anexa o registro à lista: assim inserções
+    simultâneas entram na lista na mesma ordem dos seus IDs.
+    """
+    if 'id' in registro:
+        avancar_sequencia(colecao, registro['id'])
+    else:
+        registro['id'] = proximo_id(colecao)
+
+iniciar_sequencias()
+
 # Mapeamento de roles e permissões
 ROLES = {
     'admin': {
@@ -104,6 +186,320 @@ ROLES = {
     }
 }
 
+# Permissões de cada role compiladas na importação, para teste em tempo constante
+PERMISSOES_POR_ROLE = {role: frozenset(dados['permissoes']) for role, dados in ROLES.items()}
+
+# ============================================================================
+# ÍNDICE DO ESTOQUE
+# ============================================================================
+
+def chave_reagente(nome, marca, volume_nominal):
+    """Chave normalizada que identifica um lote: (nome, marca, volume_nominal)."""
+    return (
+        normalizar_busca(nome or ''),
+        normalizar_busca(marca or ''),
+        normalizar_busca(volume_nominal or '')
+    )
+
+# Reagentes com menos embalagens que isto são considerados em estoque crítico
+LIMITE_ESTOQUE_CRITICO = 5
+
+# Quantidade de travas por lote; lotes com o mesmo hash de chave compartilham a trava
+N_TRAVAS_ESTOQUE = 64
+
+# Campos normalizados com índice de trigramas para busca por substring
+CAMPOS_TRIGRAMA = ('nome', 'volume_nominal', 'localizacao')
+
+# Máximo de sugestões devolvidas por consulta do autocompletar
+LIMITE_SUGESTOES = 20
+
+def trigramas(texto):
+    """Conjunto de trigramas (substrings de 3 caracteres) de um texto."""
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+class EstoqueReagentes:
+    """Envolve a lista de reagentes mantendo índices em memória.
+
+    A lista original continua sendo a fonte de verdade (as rotas a percorrem
+    diretamente); toda inserção, atualização e remoção deve passar por aqui
+    para que os índices e os campos de busca não fiquem desatualizados.
+
+    Concorrência: a verificação e a alteração da quantidade de um lote ficam
+    sob a trava do lote (travar()), escolhida entre N_TRAVAS_ESTOQUE por
+    hash da chave, então saídas de lotes diferentes não se bloqueiam. Os
+    índices compartilhados têm uma trava própria, mantida só durante a
+    atualização das estruturas.
+    """
+
+    def __init__(self, itens):
+        self.itens = itens
+        self._travas = [threading.RLock() for _ in range(N_TRAVAS_ESTOQUE)]
+        self._trava_indices = threading.RLock()
+        self.reindexar()
+
+    def travar(self, nome, marca, volume_nominal):
+        """Trava do lote, para usar em volta de verificar-e-alterar a quantidade."""
+        return self._travas[hash(chave_reagente(nome, marca, volume_nominal)) % len(self._travas)]
+
+    def reindexar(self):
+        """Reconstrói todos os índices a partir da lista (ex.: após restaurar um snapshot)."""
+        with self._trava_indices:
+            self._por_chave = {}
+            self._por_id = {}
+            self._trigramas = {campo: {} for campo in CAMPOS_TRIGRAMA}
+            self._por_nome = []  # (nome normalizado, id), sempre ordenada, para busca por prefixo
+            self._por_quantidade = []  # (quantidade_embalagens, id), sempre ordenada
+            self._heap_maior = []  # (-quantidade_embalagens, id), com remoção preguiçosa
+            self._criticos = set()
+            self._zerados = set()
+            self.total_embalagens = 0
+            for r in self.itens:
+                preencher_campos_busca(r, CAMPOS_BUSCA_REAGENTE)
+                self._indexar(r)
+
+    @staticmethod
+    def _chave(r):
+        busca = r['_busca']
+        return (busca['nome'], busca['marca'], busca['volume_nominal'])
+
+    def _indexar(self, r):
+        self._por_id[r['id']] = r
+        self._indexar_busca(r)
+        self._indexar_quantidade(r)
+
+    def _desindexar(self, r):
+        self._por_id.pop(r['id'], None)
+        self._desindexar_busca(r)
+        self._desindexar_quantidade(r)
+
+    def _indexar_busca(self, r):
+        self._por_chave[self._chave(r)] = r
+        bisect.insort(self._por_nome, (r['_busca']['nome'], r['id']))
+        for campo in CAMPOS_TRIGRAMA:
+            indice = self._trigramas[campo]
+            for grama in trigramas(r['_busca'][campo]):
+                indice.setdefault(grama, set()).add(r['id'])
+
+    def _desindexar_busca(self, r):
+        self._por_chave.pop(self._chave(r), None)
+        entrada = (r['_busca']['nome'], r['id'])
+        pos = bisect.bisect_left(self._por_nome, entrada)
+        if pos < len(self._por_nome) and self._por_nome[pos] == entrada:
+            del self._por_nome[pos]
+        for campo in CAMPOS_TRIGRAMA:
+            indice = self._trigramas[campo]
+            for grama in trigramas(r['_busca'][campo]):
+                ids = indice.get(grama)
+                if ids is not None:
+                    ids.discard(r['id'])
+                    if not ids:
+                        del indice[grama]
+
+    def _indexar_quantidade(self, r):
+        quantidade = r['quantidade_embalagens']
+        bisect.insort(self._por_quantidade, (quantidade, r['id']))
+        self.total_embalagens += quantidade
+        if quantidade < LIMITE_ESTOQUE_CRITICO:
+            self._criticos.add(r['id'])
+        if quantidade <= 0:
+            self._zerados.add(r['id'])
+        
+        # Entradas obsoletas ficam no heap até chegarem ao topo; reconstrói se acumular demais
+        if len(self._heap_maior) > 2 * len(self._por_id) + 64:
+            self._heap_maior = [(-x['quantidade_embalagens'], x['id']) for x in self._por_id.values()]
+            heapq.heapify(self._heap_maior)
+        else:
+            heapq.heappush(self._heap_maior, (-quantidade, r['id']))
+
+    def _desindexar_quantidade(self, r):
+        quantidade = r['quantidade_embalagens']
+        entrada = (quantidade, r['id'])
+        pos = bisect.bisect_left(self._por_quantidade, entrada)
+        if pos < len(self._por_quantidade) and self._por_quantidade[pos] == entrada:
+            del self._por_quantidade[pos]
+            self.total_embalagens -= quantidade
+        self._criticos.discard(r['id'])
+        self._zerados.discard(r['id'])
+
+    def buscar(self, nome, marca, volume_nominal):
+        """Busca um reagente pela chave normalizada em tempo constante."""
+        return self._por_chave.get(chave_reagente(nome, marca, volume_nominal))
+
+    def buscar_linear(self, nome, marca, volume_nominal):
+        """Busca por varredura completa da lista (comportamento antigo, usado em benchmarks)."""
+        nome_norm, marca_norm, volume_norm = chave_reagente(nome, marca, volume_nominal)
+        for r in self.itens:
+            if (normalizar_para_comparacao(r['nome']) == nome_norm and
+                normalizar_para_comparacao(r.get('marca', '')) == marca_norm and
+                normalizar_para_comparacao(r.get('volume_nominal', '')) == volume_norm):
+                return r
+        return None
+
+    def buscar_substring(self, campo, termo):
+        """Reagentes cujo campo normalizado contém o termo (já normalizado).
+
+        Intersecta as listas de trigramas do termo e só confere os candidatos;
+        termos com menos de 3 caracteres caem na varredura completa.
+        """
+        gramas = trigramas(termo)
+        if not gramas:
+            return [r for r in self.itens if termo in r['_busca'][campo]]
+        
+        with self._trava_indices:
+            indice = self._trigramas[campo]
+            listas = sorted((indice.get(grama, ()) for grama in gramas), key=len)
+            if not listas[0]:
+                return []
+            candidatos = set(listas[0]).intersection(*listas[1:])
+            candidatos = [self._por_id[reagente_id] for reagente_id in sorted(candidatos)]
+        
+        # A lista está em ordem de ID (ver inserir): ordenar preserva a ordem dela
+        return [r for r in candidatos if termo in r['_busca'][campo]]
+
+    def sugerir(self, prefixo, limite=LIMITE_SUGESTOES):
+        """Até `limite` reagentes cujo nome normalizado começa com o prefixo.
+
+        Custa O(log N + limite) pelo índice ordenado de nomes; os resultados
+        voltam em ordem alfabética, com as marcas de um mesmo nome juntas.
+        """
+        prefixo = normalizar_busca(prefixo or '')
+        if not prefixo:
+            return []
+        
+        with self._trava_indices:
+            indice = self._por_nome
+            resultado = []
+            for pos in range(bisect.bisect_left(indice, (prefixo,)), len(indice)):
+                nome, reagente_id = indice[pos]
+                if not nome.startswith(prefixo) or len(resultado) >= limite:
+                    break
+                resultado.append(self._por_id[reagente_id])
+            return resultado
+
+    def faixa_quantidade(self, minimo=None, maximo=None, incluir_maximo=True):
+        """Reagentes com quantidade_embalagens entre minimo e maximo.
+
+        Custa O(log N + k) pelo índice ordenado; os resultados voltam na
+        ordem da lista para manter a exibição estável.
+        """
+        with self._trava_indices:
+            indice = self._por_quantidade
+            inicio = 0 if minimo is None else bisect.bisect_left(indice, (minimo,))
+            if maximo is None:
+                fim = len(indice)
+            elif incluir_maximo:
+                fim = bisect.bisect_right(indice, (maximo, float('inf')))
+            else:
+                fim = bisect.bisect_left(indice, (maximo,))
+            return [self._por_id[reagente_id] for reagente_id in sorted(i for _, i in indice[inicio:fim])]
+
+    def criticos(self):
+        with self._trava_indices:
+            return [self._por_id[reagente_id] for reagente_id in sorted(self._criticos)]
+
+    def zerados(self):
+        with self._trava_indices:
+            return [self._por_id[reagente_id] for reagente_id in sorted(self._zerados)]
+
+    def maior_estoque(self):
+        """Reagente com mais embalagens (o primeiro da lista em caso de empate)."""
+        with self._trava_indices:
+            heap = self._heap_maior
+            while heap:
+                quantidade_neg, reagente_id = heap[0]
+                r = self._por_id.get(reagente_id)
+                if r is not None and r['quantidade_embalagens'] == -quantidade_neg:
+                    return r
+                heapq.heappop(heap)
+            return None
+
+    def resumo(self):
+        """Totais mantidos incrementalmente, sem percorrer o estoque."""
+        with self._trava_indices:
+            return {
+                'total_itens': len(self._por_id),
+                'total_embalagens': self.total_embalagens,
+                'total_criticos': len(self._criticos),
+                'total_zerados': len(self._zerados)
+            }
+
+    def inserir(self, reagente):
+        """Adiciona um reagente; sem 'id', recebe o próximo da sequência.
+
+        A lista é mantida em ordem crescente de ID (a paginação por cursor e
+        buscar_substring dependem disso): IDs novos vão para o final e um ID
+        antigo, vindo de um evento reaplicado, entra na sua posição.
+        """
+        with self._trava_indices:
+            atribuir_id('reagentes', reagente)
+            preencher_campos_busca(reagente, CAMPOS_BUSCA_REAGENTE)
+            bisect.insort(self.itens, reagente, key=id_registro)
+            self._indexar(reagente)
+
+    def atualizar(self, reagente, **campos):
+        with self._trava_indices:
+            mudou_busca = any(campo in CAMPOS_BUSCA_REAGENTE for campo in campos)
+            mudou_quantidade = 'quantidade_embalagens' in campos
+            if mudou_busca:
+                self._desindexar_busca(reagente)
+            if mudou_quantidade:
+                self._desindexar_quantidade(reagente)
+            reagente.update(campos)
+            if mudou_busca:
+                preencher_campos_busca(reagente, CAMPOS_BUSCA_REAGENTE)
+                self._indexar_busca(reagente)
+            if mudou_quantidade:
+                self._indexar_quantidade(reagente)
+
+    def remover(self, reagente):
+        with self._trava_indices:
+            self.itens.remove(reagente)
+            self._desindexar(reagente)
+
+estoque = EstoqueReagentes(reagentes_data)
+
+class DiretorioUsuarios:
+    """Envolve a lista de usuários com índices por ID e por username.
+
+    O username é comparado sem diferenciar maiúsculas (str.casefold).
+    """
+
+    def __init__(self, itens):
+        self.itens = itens
+        self._trava = threading.Lock()
+        self.reindexar()
+
+    def reindexar(self):
+        with self._trava:
+            self._por_id = {}
+            self._por_username = {}
+            for u in self.itens:
+                self._indexar(u)
+
+    def _indexar(self, u):
+        preencher_campos_busca(u, CAMPOS_BUSCA_USUARIO, str.casefold)
+        self._por_id[u['id']] = u
+        self._por_username[u['_busca']['username']] = u
+
+    def por_id(self, user_id):
+        return self._por_id.get(user_id)
+
+    def por_username(self, username):
+        return self._por_username.get(username.casefold())
+
+    def inserir(self, usuario):
+        with self._trava:
+            self.itens.append(usuario)
+            self._indexar(usuario)
+
+    def remover(self, usuario):
+        with self._trava:
+            self.itens.remove(usuario)
+            self._por_id.pop(usuario['id'], None)
+            self._por_username.pop(usuario['_busca']['username'], None)
+
+diretorio_usuarios = DiretorioUsuarios(usuarios_data)
+
 # ============================================================================
 # FUNÇÕES DE NEGÓCIO
 # ============================================================================
@@ -111,77 +507,93 @@ ROLES = {
 def get_pedidos_abertos():
     return [p for p in pedidos_data if p['status'] == 'Aberto']
 
+def adicionar_pedido(pedido):
+    with trava_pedidos:
+        atribuir_id('pedidos', pedido)
+        bisect.insort(pedidos_data, pedido, key=id_registro)
+        contagem_pedidos[pedido['status']] += 1
+
+def registrar_entrada(entrada, pedido_id=None):
+    avancar_sequencia('entradas', entrada['id'])
+    if pedido_id is not None:
+        finalizar_pedido(pedido_id)
+    entradas_data.append(entrada)
+    atualizar_reagente_quantidade(entrada['nome_reagente'], entrada['volume_nominal'], entrada['marca'],
+                                  entrada['quantidade_embalagens'], entrada['localizacao'])
+
+def registrar_saida(saida):
+    """Abate a saída do estoque e retorna o reagente (removido se zerar)."""
+    avancar_sequencia('saidas', saida['id'])
+    with estoque.travar(saida['nome_reagente'], saida['marca'], saida['volume_nominal']):
+        reagente = estoque.buscar(saida['nome_reagente'], saida['marca'], saida['volume_nominal'])
+        saidas_data.append(saida)
+        estoque.atualizar(reagente, quantidade_embalagens=reagente['quantidade_embalagens'] - saida['quantidade_saida'])
+        if reagente['quantidade_embalagens'] <= 0:
+            estoque.remover(reagente)
+    return reagente
+
 def finalizar_pedido(pedido_id):
-    for p in pedidos_data:
-        if p['id'] == pedido_id:
-            p['status'] = 'Finalizado'
-            break
+    with trava_pedidos:
+        for p in pedidos_data:
+            if p['id'] == pedido_id:
+                if p['status'] != 'Finalizado':
+                    contagem_pedidos[p['status']] -= 1
+                    contagem_pedidos['Finalizado'] += 1
+                p['status'] = 'Finalizado'
+                break
 
 def atualizar_reagente_quantidade(nome_reagente, volume_nominal, marca, quantidade_embalagens_adicionar, localizacao=''):
-    nome_norm = normalizar_para_comparacao(nome_reagente)
-    volume_norm = normalizar_para_comparacao(volume_nominal)
-    marca_norm = normalizar_para_comparacao(marca)
-    
-    for r in reagentes_data:
-        if (normalizar_para_comparacao(r['nome']) == nome_norm and 
-            normalizar_para_comparacao(r.get('volume_nominal', '')) == volume_norm and
-            normalizar_para_comparacao(r.get('marca', '')) == marca_norm):
-            r['quantidade_embalagens'] += quantidade_embalagens_adicionar
+    with estoque.travar(nome_reagente, marca, volume_nominal):
+        r = estoque.buscar(nome_reagente, marca, volume_nominal)
+        if r:
+            campos = {'quantidade_embalagens': r['quantidade_embalagens'] + quantidade_embalagens_adicionar}
             if localizacao:
-                r['localizacao'] = localizacao
+                campos['localizacao'] = localizacao
+            estoque.atualizar(r, **campos)
             return
-    
-    novo_id = max([r['id'] for r in reagentes_data]) + 1 if reagentes_data else 1
-    reagentes_data.append({
-        'id': novo_id,
-        'nome': nome_reagente,
-        'volume_nominal': volume_nominal,
-        'marca': marca,
-        'quantidade_embalagens': quantidade_embalagens_adicionar,
-        'localizacao': localizacao or 'Não informada'
-    })
+        
+        estoque.inserir({
+            'nome': nome_reagente,
+            'volume_nominal': volume_nominal,
+            'marca': marca,
+            'quantidade_embalagens': quantidade_embalagens_adicionar,
+            'localizacao': localizacao or 'Não informada'
+        })
+
+# Filtros de consultar_reagentes atendidos pelo índice de trigramas
+FILTROS_SUBSTRING = {
+    'nome': 'nome',
+    'volume': 'volume_nominal',
+    'localizacao': 'localizacao'
+}
 
 def consultar_reagentes(filtro_tipo='', filtro_valor=''):
     resultados = []
     if not filtro_tipo or filtro_tipo == 'todos':
         return reagentes_data
     
-    filtro_valor_norm = normalizar_para_comparacao(filtro_valor)
+    filtro_valor_norm = normalizar_busca(filtro_valor)
+    
+    if filtro_tipo in FILTROS_SUBSTRING:
+        return estoque.buscar_substring(FILTROS_SUBSTRING[filtro_tipo], filtro_valor_norm)
+    
+    if filtro_tipo in ('quantidade_min', 'quantidade_max'):
+        try:
+            limite = int(filtro_valor)
+        except ValueError:
+            return []
+        if filtro_tipo == 'quantidade_min':
+            return estoque.faixa_quantidade(minimo=limite)
+        return estoque.faixa_quantidade(maximo=limite)
+    
+    if filtro_tipo == 'critico':
+        return estoque.criticos()
+    
+    if filtro_tipo == 'zerado':
+        return estoque.zerados()
     
     for r in reagentes_data:
-        match = False
-        if filtro_tipo == 'nome':
-            if filtro_valor_norm in normalizar_para_comparacao(r['nome']):
-                match = True
-        elif filtro_tipo == 'marca':
-            if normalizar_para_comparacao(r.get('marca', '')) == filtro_valor_norm:
-                match = True
-        elif filtro_tipo == 'volume':
-            if filtro_valor_norm in normalizar_para_comparacao(r.get('volume_nominal', '')):
-                match = True
-        elif filtro_tipo == 'localizacao':
-            if filtro_valor_norm in normalizar_para_comparacao(r.get('localizacao', '')):
-                match = True
-        elif filtro_tipo == 'quantidade_min':
-            try:
-                if r['quantidade_embalagens'] >= int(filtro_valor):
-                    match = True
-            except ValueError:
-                pass
-        elif filtro_tipo == 'quantidade_max':
-            try:
-                if r['quantidade_embalagens'] <= int(filtro_valor):
-                    match = True
-            except ValueError:
-                pass
-        elif filtro_tipo == 'critico':
-            if r['quantidade_embalagens'] < 5:
-                match = True
-        elif filtro_tipo == 'zerado':
-            if r['quantidade_embalagens'] <= 0:
-                match = True
-        
-        if match:
+        if filtro_tipo == 'marca' and r['_busca']['marca'] == filtro_valor_norm:
             resultados.append(r)
     
     return resultados
@@ -194,35 +606,40 @@ def consultar_pedidos(status='todos'):
     else:
         return pedidos_data
 
-def gerar_relatorio_estoque():
-    total_itens = len(reagentes_data)
-    total_embalagens = sum(r['quantidade_embalagens'] for r in reagentes_data)
-    criticos = [r for r in reagentes_data if r['quantidade_embalagens'] < 5]
-    zerados = [r for r in reagentes_data if r['quantidade_embalagens'] <= 0]
-    
-    return {
-        'total_itens': total_itens,
-        'total_embalagens': total_embalagens,
-        'itens_criticos': criticos,
-        'itens_zerados': zerados,
-        'media_embalagens': round(total_embalagens / total_itens, 2) if total_itens > 0 else 0,
-        'item_com_maior_estoque': max(reagentes_data, key=lambda x: x['quantidade_embalagens']) if reagentes_data else None
-    }
+def gerar_relatorio_estoque(incluir_itens=True):
+    """Relatório do estoque a partir dos totais mantidos pelo índice.
 
-def gerar_relatorio_pedidos():
-    pedidos_abertos = consultar_pedidos('abertos')
-    pedidos_recebidos = consultar_pedidos('recebidos')
+    Com incluir_itens=False só os contadores são devolvidos e o custo não
+    depende do tamanho do estoque.
+    """
+    relatorio = estoque.resumo()
+    total_itens = relatorio['total_itens']
+    relatorio['media_embalagens'] = round(relatorio['total_embalagens'] / total_itens, 2) if total_itens > 0 else 0
+    relatorio['item_com_maior_estoque'] = estoque.maior_estoque()
+    
+    if incluir_itens:
+        relatorio['itens_criticos'] = estoque.criticos()
+        relatorio['itens_zerados'] = estoque.zerados()
     
+    return relatorio
+
+def gerar_relatorio_pedidos(incluir_itens=True):
     total_pedidos = len(pedidos_data)
+    total_abertos = contagem_pedidos['Aberto']
+    total_recebidos = contagem_pedidos['Finalizado']
     
-    return {
+    relatorio = {
         'total_pedidos': total_pedidos,
-        'pedidos_abertos': pedidos_abertos,
-        'pedidos_recebidos': pedidos_recebidos,
-        'total_abertos': len(pedidos_abertos),
-        'total_recebidos': len(pedidos_recebidos),
-        'percentual_recebidos': round((len(pedidos_recebidos) / total_pedidos * 100), 1) if total_pedidos > 0 else 0
+        'total_abertos': total_abertos,
+        'total_recebidos': total_recebidos,
+        'percentual_recebidos': round((total_recebidos / total_pedidos * 100), 1) if total_pedidos > 0 else 0
     }
+    
+    if incluir_itens:
+        relatorio['pedidos_abertos'] = consultar_pedidos('abertos')
+        relatorio['pedidos_recebidos'] = consultar_pedidos('recebidos')
+    
+    return relatorio
 
 def consultar_estoque_por_localizacao():
     por_localizacao = {}
@@ -235,60 +652,60 @@ def consultar_estoque_por_localizacao():
 
 def obter_usuario_por_username(username):
     """Obtém um usuário pelo username."""
-    for u in usuarios_data:
-        if u['username'].lower() == username.lower():
-            return u
-    return None
+    return diretorio_usuarios.por_username(username)
 
 def obter_usuario_por_id(user_id):
     """Obtém um usuário pelo ID."""
-    for u in usuarios_data:
-        if u['id'] == user_id:
-            return u
-    return None
+    return diretorio_usuarios.por_id(user_id)
 
 def criar_usuario(username, password, email, nome_completo, role='aluno'):
     """Cria um novo usuário."""
-    if obter_usuario_por_username(username):
-        return {'erro': 'Usuário já existe!'}
-    
-    novo_id = max([u['id'] for u in usuarios_data], default=0) + 1
-    novo_usuario = {
-        'id': novo_id,
-        'username': username,
-        'password': password,
-        'email': email,
-        'nome_completo': nome_completo,
-        'role': role,
-        'ativo': True,
-        'data_criacao': datetime.now().strftime('%Y-%m-%d')
-    }
-    usuarios_data.append(novo_usuario)
+    with armazenamento.transacao():
+        if obter_usuario_por_username(username):
+            return {'erro': 'Usuário já existe!'}
+        
+        novo_id = proximo_id('usuarios')
+        novo_usuario = {
+            'id': novo_id,
+            'username': username,
+            'password': password,
+            'email': email,
+            'nome_completo': nome_completo,
+            'role': role,
+            'ativo': True,
+            'data_criacao': datetime.now().strftime('%Y-%m-%d')
+        }
+        executar_evento('usuario_criado', novo_usuario)
     return {'sucesso': True, 'usuario_id': novo_id}
 
+def adicionar_usuario(usuario):
+    avancar_sequencia('usuarios', usuario['id'])
+    diretorio_usuarios.inserir(usuario)
+
 def atualizar_usuario(user_id, **kwargs):
     """Atualiza dados de um usuário."""
-    usuario = obter_usuario_por_id(user_id)
-    if not usuario:
-        return {'erro': 'Usuário não encontrado'}
-    
-    campos_permitidos = ['email', 'nome_completo', 'role', 'ativo']
-    for campo, valor in kwargs.items():
-        if campo in campos_permitidos:
-            usuario[campo] = valor
+    with armazenamento.transacao():
+        usuario = obter_usuario_por_id(user_id)
+        if not usuario:
+            return {'erro': 'Usuário não encontrado'}
+        
+        campos_permitidos = ['email', 'nome_completo', 'role', 'ativo']
+        campos = {campo: valor for campo, valor in kwargs.items() if campo in campos_permitidos}
+        executar_evento('usuario_atualizado', {'id': user_id, 'campos': campos})
     
     return {'sucesso': True}
 
 def deletar_usuario(user_id):
     """Deleta um usuário."""
-    usuario = obter_usuario_por_id(user_id)
-    if not usuario:
-        return {'erro': 'Usuário não encontrado'}
-    
-    if usuario['username'] == 'admin':
-        return {'erro': 'Não é possível deletar o admin!'}
-    
-    usuarios_data.remove(usuario)
+    with armazenamento.transacao():
+        usuario = obter_usuario_por_id(user_id)
+        if not usuario:
+            return {'erro': 'Usuário não encontrado'}
+        
+        if usuario['username'] == 'admin':
+            return {'erro': 'Não é possível deletar o admin!'}
+        
+        executar_evento('usuario_removido', {'id': user_id})
     return {'sucesso': True}
 
 def listar_usuarios(filtro_role=None, filtro_ativo=None):
@@ -309,11 +726,7 @@ def verificar_permissao(user_id, permissao):
     if not usuario:
         return False
     
-    role = usuario['role']
-    if role not in ROLES:
-        return False
-    
-    return permissao in ROLES[role]['permissoes']
+    return permissao in PERMISSOES_POR_ROLE.get(usuario['role'], frozenset())
 
 def obter_sessao_usuario():
     """Obtém dados do usuário da sessão atual."""
@@ -321,261 +734,222 @@ def obter_sessao_usuario():
         return obter_usuario_por_id(session['user_id'])
     return None
 
+def requer_permissao(permissao):
+    """Decorator de rota: exige login e que o usuário da sessão tenha a permissão."""
+    def decorador(f):
+        @wraps(f)
+        def verificar(*args, **kwargs):
+            # Sessões criadas antes de o login gravar user_id também voltam ao login
+            if 'logged_in' not in session or 'user_id' not in session:
+                return redirect('/login')
+            if not verificar_permissao(session.get('user_id'), permissao):
+                return '<h2>❌ Acesso negado!</h2><p>Você não tem permissão para esta página.</p><p><a href="/">Voltar</a></p>', 403
+            return f(*args, **kwargs)
+        return verificar
+    return decorador
 
 # ============================================================================
-# ROTAS
+# PERSISTÊNCIA
 # ============================================================================
 
-@app.route('/')
-def home():
-    """Home da intranet do laboratório."""
-    if 'logged_in' not in session:
-        return redirect('/login')
+# Onde os eventos são gravados: só memória (padrão), diário em arquivo
+# (REAGENTES_DIARIO_DIR) ou SQLite compartilhado entre workers (REAGENTES_SQLITE)
+armazenamento = ArmazenamentoMemoria()
+
+def exportar_estado():
+    """Estado completo para snapshot, sem os campos de busca derivados."""
+    def limpar(registros):
+        return [{k: v for k, v in r.items() if k != '_busca'} for r in registros]
     
-    return '''
+    return {
+        'reagentes': limpar(reagentes_data),
+        'pedidos': limpar(pedidos_data),
+        'entradas': limpar(entradas_data),
+        'saidas': limpar(saidas_data),
+        'usuarios': limpar(usuarios_data),
+        'sequencias': dict(sequencias_id)
+    }
+
+def restaurar_estado(estado):
+    """Substitui o estado em memória pelo de um snapshot e refaz os índices."""
+    # Snapshots antigos podem ter a lista fora de ordem de ID
+    reagentes_data[:] = sorted(estado['reagentes'], key=id_registro)
+    pedidos_data[:] = sorted(estado['pedidos'], key=id_registro)
+    entradas_data[:] = estado['entradas']
+    saidas_data[:] = estado['saidas']
+    usuarios_data[:] = estado['usuarios']
+    iniciar_sequencias(estado.get('sequencias'))
+    
+    estoque.reindexar()
+    diretorio_usuarios.reindexar()
+    contagem_pedidos.clear()
+    contagem_pedidos.update(p['status'] for p in pedidos_data)
+
+def _aplicar_usuario_atualizado(dados):
+    obter_usuario_por_id(dados['id']).update(dados['campos'])
+
+def _aplicar_usuario_removido(dados):
+    diretorio_usuarios.remover(obter_usuario_por_id(dados['id']))
+
+# Como cada tipo de evento do diário é aplicado ao estado em memória
+APLICADORES = {
+    'entrada': lambda dados: registrar_entrada(dados['entrada'], dados['pedido_id']),
+    'saida': registrar_saida,
+    'pedido': adicionar_pedido,
+    'usuario_criado': adicionar_usuario,
+    'usuario_atualizado': _aplicar_usuario_atualizado,
+    'usuario_removido': _aplicar_usuario_removido
+}
+
+def aplicar_evento(tipo, dados):
+    return APLICADORES[tipo](dados)
+
+def executar_evento(tipo, dados):
+    """Grava o evento no armazenamento e então o aplica em memória."""
+    with armazenamento.transacao():
+        armazenamento.registrar(tipo, dados)
+        resultado = aplicar_evento(tipo, dados)
+        if armazenamento.precisa_snapshot():
+            armazenamento.gravar_snapshot(exportar_estado())
+    return resultado
+
+def iniciar_armazenamento(novo_armazenamento):
+    """Carrega o estado persistido no novo armazenamento e passa a usá-lo."""
+    global armazenamento
+    novo_armazenamento.carregar(restaurar_estado, aplicar_evento, exportar_estado)
+    armazenamento = novo_armazenamento
+
+SNAPSHOT_A_CADA = int(os.environ.get('REAGENTES_SNAPSHOT_A_CADA', 1000))
+
+if os.environ.get('REAGENTES_SQLITE'):
+    iniciar_armazenamento(ArmazenamentoSQLite(os.environ['REAGENTES_SQLITE'], snapshot_a_cada=SNAPSHOT_A_CADA))
+elif os.environ.get('REAGENTES_DIARIO_DIR'):
+    iniciar_armazenamento(DiarioEventos(os.environ['REAGENTES_DIARIO_DIR'], snapshot_a_cada=SNAPSHOT_A_CADA))
+
+@app.before_request
+def sincronizar_armazenamento():
+    """Traz para este worker as mudanças gravadas pelos outros."""
+    armazenamento.sincronizar()
+
+# ============================================================================
+# PAGINAÇÃO
+# ============================================================================
+
+TAMANHO_PAGINA_PADRAO = 100
+TAMANHO_PAGINA_MAXIMO = 1000
+
+# Linhas de tabela agrupadas em cada pedaço enviado pelas respostas em streaming
+LINHAS_POR_BLOCO = 100
+
+def ler_paginacao():
+    """Lê ?limite= e ?cursor= (ID do último registro da página anterior)."""
+    try:
+        limite = int(request.args.get('limite', TAMANHO_PAGINA_PADRAO))
+    except ValueError:
+        limite = TAMANHO_PAGINA_PADRAO
+    try:
+        cursor = int(request.args.get('cursor', 0))
+    except ValueError:
+        cursor = 0
+    return max(1, min(limite, TAMANHO_PAGINA_MAXIMO)), cursor
+
+def pagina_por_cursor(registros, cursor, limite):
+    """Registros logo após o ID do cursor e o cursor da página seguinte (ou None).
+
+    As listas são mantidas em ordem crescente de ID por estoque.inserir,
+    adicionar_pedido e restaurar_estado, então o início da página é achado
+    por busca binária, sem percorrer as páginas anteriores.
+    """
+    inicio = bisect.bisect_right(registros, cursor, key=id_registro)
+    pagina = registros[inicio:inicio + limite + 1]
+    if len(pagina) > limite:
+        return pagina[:limite], pagina[limite - 1]['id']
+    return pagina, None
+
+def links_paginacao(caminho, cursor, proximo_cursor, limite):
+    links = []
+    if cursor:
+        links.append(f'<a href="{caminho}?limite={limite}">⏮ Primeira página</a>')
+    if proximo_cursor is not None:
+        links.append(f'<a href="{caminho}?cursor={proximo_cursor}&limite={limite}">Próxima página →</a>')
+    return f'<p style="margin-top:20px;">{" | ".join(links)}</p>' if links else ''
+
+# ============================================================================
+# RECURSOS ESTÁTICOS
+# ============================================================================
+
+PASTA_STATIC = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+# Assets versionados pelo hash do conteúdo: a URL muda quando o arquivo muda
+CACHE_ASSET = 'public, max-age=31536000, immutable'
+# Páginas fixas: o navegador guarda, mas revalida (If-None-Match) a cada acesso
+CACHE_PAGINA = 'private, no-cache'
+
+class RecursoEstatico:
+    """Conteúdo fixo montado uma vez na inicialização.
+
+    Guarda as versões sem compressão, gzip e (se disponível) brotli, cada
+    uma com um ETag forte derivado do hash do conteúdo, e responde 304
+    quando o navegador já tem a versão atual.
+    """
+
+    def __init__(self, conteudo, mimetype, cache_control):
+        if isinstance(conteudo, str):
+            conteudo = conteudo.encode('utf-8')
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        self.hash = hashlib.sha256(conteudo).hexdigest()[:16]
+        self.versoes = {
+            'identity': conteudo,
+            'gzip': gzip.compress(conteudo, compresslevel=9, mtime=0)
+        }
+        if brotli:
+            self.versoes['br'] = brotli.compress(conteudo, quality=11)
+
+    def _escolher_codificacao(self):
+        for codificacao in ('br', 'gzip'):
+            if codificacao in self.versoes and request.accept_encodings[codificacao]:
+                return codificacao
+        return 'identity'
+
+    def responder(self):
+        codificacao = self._escolher_codificacao()
+        etag = self.hash if codificacao == 'identity' else f'{self.hash}-{codificacao}'
+        
+        if request.if_none_match.contains(etag):
+            resposta = Response(status=304)
+        else:
+            resposta = Response(self.versoes[codificacao], mimetype=self.mimetype)
+            if codificacao != 'identity':
+                resposta.headers['Content-Encoding'] = codificacao
+        
+        resposta.set_etag(etag)
+        resposta.headers['Cache-Control'] = self.cache_control
+        resposta.headers['Vary'] = 'Accept-Encoding'
+        return resposta
+
+class AssetVersionado(RecursoEstatico):
+    """Arquivo de static/ servido em /assets/<nome>.<hash>.<ext> com cache longo."""
+
+    def __init__(self, arquivo, mimetype):
+        with open(os.path.join(PASTA_STATIC, arquivo), 'rb') as f:
+            super().__init__(f.read(), mimetype, CACHE_ASSET)
+        nome, extensao = os.path.splitext(arquivo)
+        self.nome = f'{nome}.{self.hash}{extensao}'
+        self.url = f'/assets/{self.nome}'
+
+CSS_HOME = AssetVersionado('home.css', 'text/css')
+CSS_LOGIN = AssetVersionado('login.css', 'text/css')
+ASSETS = {asset.nome: asset for asset in (CSS_HOME, CSS_LOGIN)}
+
+PAGINA_HOME = RecursoEstatico(f'''
     <!DOCTYPE html>
     <html lang="pt-BR">
     <head>
         <meta charset="UTF-8">
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>Intranet do Laboratório - Faculdade de Engenharia Química</title>
-        <style>
-            * {
-                margin: 0;
-                padding: 0;
-                box-sizing: border-box;
-            }
-            
-            body {
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                background-color: #f5f5f5;
-            }
-            
-            .header {
-                background: linear-gradient(135deg, #2c3e50 0%, #34495e 100%);
-                color: white;
-                padding: 20px 40px;
-                display: flex;
-                justify-content: space-between;
-                align-items: center;
-                box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-            }
-            
-            .header-left {
-                display: flex;
-                align-items: center;
-                gap: 20px;
-            }
-            
-            .logo {
-                font-size: 24px;
-                font-weight: bold;
-            }
-            
-            .header-title {
-                border-left: 2px solid white;
-                padding-left: 20px;
-            }
-            
-            .header-title h1 {
-                font-size: 20px;
-                margin-bottom: 5px;
-            }
-            
-            .header-title p {
-                font-size: 12px;
-                opacity: 0.9;
-            }
-            
-            .user-info {
-                display: flex;
-                align-items: center;
-                gap: 15px;
-            }
-            
-            .user-info a {
-                color: white;
-                text-decoration: none;
-                padding: 8px 15px;
-                background: rgba(255,255,255,0.2);
-                border-radius: 5px;
-                transition: background 0.3s;
-            }
-            
-            .user-info a:hover {
-                background: rgba(255,255,255,0.3);
-            }
-            
-            .nav-tabs {
-                background: white;
-                border-bottom: 2px solid #ecf0f1;
-                padding: 0 40px;
-                display: flex;
-                gap: 30px;
-                flex-wrap: wrap;
-            }
-            
-            .nav-tabs a {
-                padding: 15px 0;
-                color: #2c3e50;
-                text-decoration: none;
-                border-bottom: 3px solid transparent;
-                transition: all 0.3s;
-                font-size: 14px;
-                font-weight: 500;
-            }
-            
-            .nav-tabs a:hover {
-                color: #3498db;
-                border-bottom-color: #3498db;
-            }
-            
-            .container {
-                max-width: 1400px;
-                margin: 40px auto;
-                padding: 0 40px;
-            }
-            
-            .page-title {
-                margin-bottom: 30px;
-            }
-            
-            .page-title h2 {
-                font-size: 28px;
-                color: #2c3e50;
-                display: flex;
-                align-items: center;
-                gap: 10px;
-            }
-            
-            .services-grid {
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(280px, 1fr));
-                gap: 20px;
-                margin-top: 30px;
-            }
-            
-            .service-card {
-                background: white;
-                border-radius: 8px;
-                padding: 25px;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-                transition: all 0.3s;
-                cursor: pointer;
-                border-left: 5px solid #3498db;
-            }
-            
-            .service-card:hover {
-                transform: translateY(-5px);
-                box-shadow: 0 5px 15px rgba(0,0,0,0.2);
-            }
-            
-            .service-card.reagentes {
-                border-left-color: #e74c3c;
-                background: linear-gradient(135deg, #fff5f5 0%, #ffe8e8 100%);
-            }
-            
-            .service-card.pedidos {
-                border-left-color: #f39c12;
-                background: linear-gradient(135deg, #fffbf0 0%, #ffe8cc 100%);
-            }
-            
-            .service-card.entradas {
-                border-left-color: #27ae60;
-                background: linear-gradient(135deg, #f0fff4 0%, #d5f4e6 100%);
-            }
-            
-            .service-card.saidas {
-                border-left-color: #9b59b6;
-                background: linear-gradient(135deg, #faf5ff 0%, #f0e6ff 100%);
-            }
-            
-            .service-card.relatorio {
-                border-left-color: #3498db;
-                background: linear-gradient(135deg, #f0f8ff 0%, #e0f2ff 100%);
-            }
-            
-            .service-card h3 {
-                font-size: 18px;
-                color: #2c3e50;
-                margin-bottom: 12px;
-                display: flex;
-                align-items: center;
-                gap: 8px;
-            }
-            
-            .service-card p {
-                color: #555;
-                font-size: 14px;
-                line-height: 1.6;
-                margin-bottom: 15px;
-            }
-            
-            .service-card a {
-                display: inline-block;
-                padding: 10px 20px;
-                background: #3498db;
-                color: white;
-                text-decoration: none;
-                border-radius: 5px;
-                font-size: 13px;
-                font-weight: 600;
-                transition: background 0.3s;
-            }
-            
-            .service-card.reagentes a {
-                background: #e74c3c;
-            }
-            
-            .service-card.pedidos a {
-                background: #f39c12;
-            }
-            
-            .service-card.entradas a {
-                background: #27ae60;
-            }
-            
-            .service-card.saidas a {
-                background: #9b59b6;
-            }
-            
-            .service-card.relatorio a {
-                background: #3498db;
-            }
-            
-            .service-card a:hover {
-                opacity: 0.9;
-            }
-            
-            .footer {
-                text-align: center;
-                padding: 30px;
-                color: #666;
-                font-size: 12px;
-                margin-top: 50px;
-            }
-            
-            @media (max-width: 768px) {
-                .header {
-                    flex-direction: column;
-                    gap: 15px;
-                    padding: 15px;
-                }
-                
-                .nav-tabs {
-                    padding: 0 20px;
-                    gap: 15px;
-                }
-                
-                .container {
-                    padding: 0 20px;
-                }
-                
-                .services-grid {
-                    grid-template-columns: 1fr;
-                }
-            }
-        </style>
+        <link rel="stylesheet" href="{CSS_HOME.url}">
     </head>
     <body>
         <div class="header">
@@ -642,14 +1016,75 @@ def home():
                 </div>
             </div>
         </div>
-        
-        <div class="footer">
-            <p>© 2024 Sistema de Gestão de Laboratório - LERP/Faculdade de Engenharia Química | Unicamp</p>
-            <p>Desenvolvido para melhorar a eficiência do laboratório</p>
-        </div>
+        
+        <div class="footer">
+            <p>© 2024 Sistema de Gestão de Laboratório - LERP/Faculdade de Engenharia Química | Unicamp</p>
+            <p>Desenvolvido para melhorar a eficiência do laboratório</p>
+        </div>
+    </body>
+    </html>
+    ''', 'text/html', CACHE_PAGINA)
+
+PAGINA_LOGIN = RecursoEstatico(f'''
+    <!DOCTYPE html>
+    <html lang="pt-BR">
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>Login - Intranet do Laboratório</title>
+        <link rel="stylesheet" href="{CSS_LOGIN.url}">
+    </head>
+    <body>
+        <div class="login-container">
+            <div class="login-header">
+                <h1> Login</h1>
+                <p>Intranet do Laboratório - LERP/FEQ</p>
+            </div>
+            
+            <form method="post">
+                <div class="form-group">
+                    <label>Usuário:</label>
+                    <input type="text" name="username" required autofocus>
+                </div>
+                
+                <div class="form-group">
+                    <label>Senha:</label>
+                    <input type="password" name="password" required>
+                </div>
+                
+                <div class="form-group">
+                    <button type="submit">Entrar</button>
+                </div>
+            </form>
+            
+            <div class="credentials">
+                <p><strong>Credenciais de Teste:</strong></p>
+                <p>👤 Usuário: <strong>admin</strong></p>
+                <p>🔑 Senha: <strong>admin123</strong></p>
+            </div>
+        </div>
     </body>
     </html>
-    '''
+    ''', 'text/html', CACHE_PAGINA)
+
+# ============================================================================
+# ROTAS
+# ============================================================================
+
+@app.route('/assets/<nome>')
+def asset(nome):
+    """CSS versionado pelo hash do conteúdo."""
+    if nome not in ASSETS:
+        return 'Não encontrado', 404
+    return ASSETS[nome].responder()
+
+@app.route('/')
+def home():
+    """Home da intranet do laboratório."""
+    if 'logged_in' not in session:
+        return redirect('/login')
+    
+    return PAGINA_HOME.responder()
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -660,6 +1095,7 @@ def login():
         
         if username == 'admin' and password == 'admin123':
             session['logged_in'] = True
+            session['user_id'] = obter_usuario_por_username(username)['id']
             return redirect('/')
         else:
             erro = '❌ Usuário ou senha incorretos!'
@@ -670,117 +1106,7 @@ def login():
                 <meta charset="UTF-8">
                 <meta name="viewport" content="width=device-width, initial-scale=1.0">
                 <title>Login - Intranet do Laboratório</title>
-                <style>
-                    * {{
-                        margin: 0;
-                        padding: 0;
-                        box-sizing: border-box;
-                    }}
-                    
-                    body {{
-                        font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                        min-height: 100vh;
-                        display: flex;
-                        justify-content: center;
-                        align-items: center;
-                    }}
-                    
-                    .login-container {{
-                        background: white;
-                        padding: 50px;
-                        border-radius: 10px;
-                        box-shadow: 0 10px 40px rgba(0,0,0,0.2);
-                        width: 100%;
-                        max-width: 400px;
-                    }}
-                    
-                    .login-header {{
-                        text-align: center;
-                        margin-bottom: 40px;
-                    }}
-                    
-                    .login-header h1 {{
-                        font-size: 32px;
-                        color: #2c3e50;
-                        margin-bottom: 10px;
-                    }}
-                    
-                    .login-header p {{
-                        color: #666;
-                        font-size: 14px;
-                    }}
-                    
-                    .error {{
-                        background: #f8d7da;
-                        color: #721c24;
-                        padding: 12px;
-                        border-radius: 5px;
-                        margin-bottom: 20px;
-                        border-left: 4px solid #f5c6cb;
-                    }}
-                    
-                    .form-group {{
-                        margin-bottom: 20px;
-                    }}
-                    
-                    .form-group label {{
-                        display: block;
-                        color: #2c3e50;
-                        font-weight: 600;
-                        margin-bottom: 8px;
-                    }}
-                    
-                    .form-group input {{
-                        width: 100%;
-                        padding: 12px;
-                        border: 1px solid #ddd;
-                        border-radius: 5px;
-                        font-size: 14px;
-                        transition: border-color 0.3s;
-                    }}
-                    
-                    .form-group input:focus {{
-                        outline: none;
-                        border-color: #667eea;
-                        box-shadow: 0 0 5px rgba(102, 126, 234, 0.3);
-                    }}
-                    
-                    .form-group button {{
-                        width: 100%;
-                        padding: 12px;
-                        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                        color: white;
-                        border: none;
-                        border-radius: 5px;
-                        font-size: 16px;
-                        font-weight: 600;
-                        cursor: pointer;
-                        transition: transform 0.2s;
-                    }}
-                    
-                    .form-group button:hover {{
-                        transform: translateY(-2px);
-                    }}
-                    
-                    .credentials {{
-                        background: #ecf0f1;
-                        padding: 15px;
-                        border-radius: 5px;
-                        text-align: center;
-                        font-size: 13px;
-                        color: #555;
-                    }}
-                    
-                    .credentials p {{
-                        margin: 5px 0;
-                    }}
-                    
-                    .credentials strong {{
-                        color: #2c3e50;
-                        font-family: monospace;
-                    }}
-                </style>
+                <link rel="stylesheet" href="{CSS_LOGIN.url}">
             </head>
             <body>
                 <div class="login-container">
@@ -817,148 +1143,7 @@ def login():
             </html>
             '''
     
-    return '''
-    <!DOCTYPE html>
-    <html lang="pt-BR">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Login - Intranet do Laboratório</title>
-        <style>
-            * {
-                margin: 0;
-                padding: 0;
-                box-sizing: border-box;
-            }
-            
-            body {
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                min-height: 100vh;
-                display: flex;
-                justify-content: center;
-                align-items: center;
-            }
-            
-            .login-container {
-                background: white;
-                padding: 50px;
-                border-radius: 10px;
-                box-shadow: 0 10px 40px rgba(0,0,0,0.2);
-                width: 100%;
-                max-width: 400px;
-            }
-            
-            .login-header {
-                text-align: center;
-                margin-bottom: 40px;
-            }
-            
-            .login-header h1 {
-                font-size: 32px;
-                color: #2c3e50;
-                margin-bottom: 10px;
-            }
-            
-            .login-header p {
-                color: #666;
-                font-size: 14px;
-            }
-            
-            .form-group {
-                margin-bottom: 20px;
-            }
-            
-            .form-group label {
-                display: block;
-                color: #2c3e50;
-                font-weight: 600;
-                margin-bottom: 8px;
-            }
-            
-            .form-group input {
-                width: 100%;
-                padding: 12px;
-                border: 1px solid #ddd;
-                border-radius: 5px;
-                font-size: 14px;
-                transition: border-color 0.3s;
-            }
-            
-            .form-group input:focus {
-                outline: none;
-                border-color: #667eea;
-                box-shadow: 0 0 5px rgba(102, 126, 234, 0.3);
-            }
-            
-            .form-group button {
-                width: 100%;
-                padding: 12px;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                border: none;
-                border-radius: 5px;
-                font-size: 16px;
-                font-weight: 600;
-                cursor: pointer;
-                transition: transform 0.2s;
-            }
-            
-            .form-group button:hover {
-                transform: translateY(-2px);
-            }
-            
-            .credentials {
-                background: #ecf0f1;
-                padding: 15px;
-                border-radius: 5px;
-                text-align: center;
-                font-size: 13px;
-                color: #555;
-            }
-            
-            .credentials p {
-                margin: 5px 0;
-            }
-            
-            .credentials strong {
-                color: #2c3e50;
-                font-family: monospace;
-            }
-        </style>
-    </head>
-    <body>
-        <div class="login-container">
-            <div class="login-header">
-                <h1> Login</h1>
-                <p>Intranet do Laboratório - LERP/FEQ</p>
-            </div>
-            
-            <form method="post">
-                <div class="form-group">
-                    <label>Usuário:</label>
-                    <input type="text" name="username" required autofocus>
-                </div>
-                
-                <div class="form-group">
-                    <label>Senha:</label>
-                    <input type="password" name="password" required>
-                </div>
-                
-                <div class="form-group">
-                    <button type="submit">Entrar</button>
-                </div>
-            </form>
-            
-            <div class="credentials">
-                <p><strong>Credenciais de Teste:</strong></p>
-                <p>👤 Usuário: <strong>admin</strong></p>
-                <p>🔑 Senha: <strong>admin123</strong></p>
-            </div>
-        </div>
-    </body>
-    </html>
-    '''
+    return PAGINA_LOGIN.responder()
 
 @app.route('/logout')
 def logout():
@@ -972,98 +1157,72 @@ def reagentes():
     if 'logged_in' not in session:
         return redirect('/login')
     
-    html = '<div style="margin:20px;padding:20px;">'
-    html += '<h2>🧪 Reagentes em Estoque</h2>'
-    html += '<table border="1" style="width:100%;border-collapse:collapse;">'
-    html += '<tr style="background-color:#f0f0f0;"><th>Nome</th><th>Marca</th><th>Volume/Massa</th><th>📍 Localização</th><th>Quantidade</th></tr>'
-    
-    for r in reagentes_data:
-        volume = r.get('volume_nominal', 'N/A')
-        marca = r.get('marca', 'N/A')
-        localizacao = r.get('localizacao', 'Não informada')
-        html += f'<tr><td><b>{r["nome"]}</b></td><td>{marca}</td><td>{volume}</td><td><b>{localizacao}</b></td><td><b>{r["quantidade_embalagens"]}</b></td></tr>'
-    
-    html += '</table>'
-    html += '<p style="margin-top:20px;"><a href="/">🏠 Voltar ao Menu</a></p>'
-    html += '</div>'
-    return html
-
-@app.route('/consulta', methods=['GET', 'POST'])
-def consulta():
-    """Página de consulta com abas."""
-    if 'logged_in' not in session:
-        return redirect('/login')
-    
-    aba_ativa = request.args.get('aba', 'reagentes')
-    resultados = []
-    filtro_aplicado = False
+    limite, cursor = ler_paginacao()
+    pagina, proximo_cursor = pagina_por_cursor(reagentes_data, cursor, limite)
     
-    if request.method == 'POST':
-        filtro_tipo = request.form.get('filtro_tipo', '')
-        filtro_valor = request.form.get('filtro_valor', '')
-        aba_ativa = request.form.get('aba', 'reagentes')
+    def gerar():
+        yield ('<div style="margin:20px;padding:20px;">'
+               '<h2>🧪 Reagentes em Estoque</h2>'
+               '<table border="1" style="width:100%;border-collapse:collapse;">'
+               '<tr style="background-color:#f0f0f0;"><th>Nome</th><th>Marca</th><th>Volume/Massa</th><th>📍 Localização</th><th>Quantidade</th></tr>')
         
-        if aba_ativa == 'reagentes' and filtro_tipo and filtro_valor:
-            resultados = consultar_reagentes(filtro_tipo, filtro_valor)
-            filtro_aplicado = True
-    
-    pedidos_abertos = consultar_pedidos('abertos')
-    pedidos_recebidos = consultar_pedidos('recebidos')
-    
-    html_reagentes = '<table border="1" style="width:100%;border-collapse:collapse;">'
-    html_reagentes += '<tr style="background-color:#f0f0f0;"><th>Nome</th><th>Marca</th><th>Volume/Massa</th><th>📍 Localização</th><th>Quantidade</th></tr>'
-    
-    if aba_ativa == 'reagentes':
-        if resultados:
-            for r in resultados:
-                volume = r.get('volume_nominal', 'N/A')
-                marca = r.get('marca', 'N/A')
-                localizacao = r.get('localizacao', 'Não informada')
-                qtd_cor = 'red' if r['quantidade_embalagens'] < 5 else 'green'
-                html_reagentes += f'<tr><td><b>{r["nome"]}</b></td><td>{marca}</td><td>{volume}</td><td><b>{localizacao}</b></td><td style="color:{qtd_cor};"><b>{r["quantidade_embalagens"]}</b></td></tr>'
-        else:
-            msg = '❌ Nenhum reagente encontrado' if filtro_aplicado else 'Realize uma busca para ver resultados'
-            html_reagentes += f'<tr><td colspan="5" style="text-align:center;color:{"red" if filtro_aplicado else "gray"};">{msg}</td></tr>'
-    
-    html_reagentes += '</table>'
-    
-    html_abertos = '<table border="1" style="width:100%;border-collapse:collapse;">'
-    html_abertos += '<tr style="background-color:#fff3cd;"><th>Reagente</th><th>Quantidade</th><th>Data</th><th>Controlado</th><th>Status</th></tr>'
-    
-    if pedidos_abertos:
-        for p in pedidos_abertos:
-            controlado_cor = 'red' if p['controlado'] == 'Sim' else 'green'
-            html_abertos += f'<tr style="background-color:#fffacd;"><td><b>{p["reagente"]}</b></td><td>{p["quantidade_nominal"]}</td><td>{p["data"]}</td><td style="color:{controlado_cor};"><b>{p["controlado"]}</b></td><td style="color:orange;"><b>⏳ {p["status"]}</b></td></tr>'
-    else:
-        html_abertos += '<tr><td colspan="5" style="text-align:center;color:green;">✅ Nenhum pedido aberto</td></tr>'
-    
-    html_abertos += '</table>'
+        linhas = []
+        for r in pagina:
+            volume = r.get('volume_nominal', 'N/A')
+            marca = r.get('marca', 'N/A')
+            localizacao = r.get('localizacao', 'Não informada')
+            linhas.append(f'<tr><td><b>{r["nome"]}</b></td><td>{marca}</td><td>{volume}</td><td><b>{localizacao}</b></td><td><b>{r["quantidade_embalagens"]}</b></td></tr>')
+            if len(linhas) == LINHAS_POR_BLOCO:
+                yield ''.join(linhas)
+                linhas = []
+        yield ''.join(linhas)
+        
+        yield '</table>'
+        yield links_paginacao('/reagentes', cursor, proximo_cursor, limite)
+        yield '<p style="margin-top:20px;"><a href="/">🏠 Voltar ao Menu</a></p>'
+        yield '</div>'
     
-    html_recebidos = '<table border="1" style="width:100%;border-collapse:collapse;">'
-    html_recebidos += '<tr style="background-color:#d4edda;"><th>Reagente</th><th>Quantidade</th><th>Data</th><th>Controlado</th><th>Status</th></tr>'
+    return Response(gerar(), mimetype='text/html')
+
+# Abas da consulta: cada uma é renderizada só quando for a aba pedida
+ABAS_CONSULTA = {
+    'reagentes': {'titulo': '🧪 Reagentes', 'cor': '#0066cc'},
+    'abertos': {'titulo': '⏳ Pedidos Abertos', 'cor': '#ff9800'},
+    'recebidos': {'titulo': '✅ Pedidos Recebidos', 'cor': '#4caf50'}
+}
+
+ESTILO_PEDIDOS = {
+    'abertos': {
+        'titulo': 'Pedidos Abertos', 'cabecalho': '#fff3cd', 'linha': '#fffacd', 'cor_status': 'orange', 'icone': '⏳',
+        'vazio': '<tr><td colspan="5" style="text-align:center;color:green;">✅ Nenhum pedido aberto</td></tr>'
+    },
+    'recebidos': {
+        'titulo': 'Pedidos Recebidos', 'cabecalho': '#d4edda', 'linha': '#e8f5e9', 'cor_status': 'green', 'icone': '✅',
+        'vazio': '<tr><td colspan="5" style="text-align:center;color:gray;">Nenhum pedido recebido ainda</td></tr>'
+    }
+}
+
+def renderizar_aba_reagentes(resultados=(), filtro_aplicado=False):
+    """Formulário de filtros e tabela de resultados da aba de reagentes."""
+    html = '<table border="1" style="width:100%;border-collapse:collapse;">'
+    html += '<tr style="background-color:#f0f0f0;"><th>Nome</th><th>Marca</th><th>Volume/Massa</th><th>📍 Localização</th><th>Quantidade</th></tr>'
     
-    if pedidos_recebidos:
-        for p in pedidos_recebidos:
-            controlado_cor = 'red' if p['controlado'] == 'Sim' else 'green'
-            html_recebidos += f'<tr style="background-color:#e8f5e9;"><td><b>{p["reagente"]}</b></td><td>{p["quantidade_nominal"]}</td><td>{p["data"]}</td><td style="color:{controlado_cor};"><b>{p["controlado"]}</b></td><td style="color:green;"><b>✅ {p["status"]}</b></td></tr>'
+    if resultados:
+        for r in resultados:
+            volume = r.get('volume_nominal', 'N/A')
+            marca = r.get('marca', 'N/A')
+            localizacao = r.get('localizacao', 'Não informada')
+            qtd_cor = 'red' if r['quantidade_embalagens'] < LIMITE_ESTOQUE_CRITICO else 'green'
+            html += f'<tr><td><b>{r["nome"]}</b></td><td>{marca}</td><td>{volume}</td><td><b>{localizacao}</b></td><td style="color:{qtd_cor};"><b>{r["quantidade_embalagens"]}</b></td></tr>'
     else:
-        html_recebidos += '<tr><td colspan="5" style="text-align:center;color:gray;">Nenhum pedido recebido ainda</td></tr>'
+        msg = '❌ Nenhum reagente encontrado' if filtro_aplicado else 'Realize uma busca para ver resultados'
+        cor = 'red' if filtro_aplicado else 'gray'
+        html += f'<tr><td colspan="5" style="text-align:center;color:{cor};">{msg}</td></tr>'
     
-    html_recebidos += '</table>'
-    
-    css_aba = 'padding:12px 20px;margin-right:5px;border-radius:5px;text-decoration:none;font-weight:bold;color:white;display:inline-block;'
+    html += '</table>'
     
-    return f'''
-    <div style="max-width:900px;margin:20px;padding:20px;border:1px solid #ccc;">
-        <h2>🔍 Consultas e Pedidos</h2>
-        
-        <div style="margin-bottom:25px;border-bottom:2px solid #ddd;padding-bottom:10px;">
-            <a href="/consulta?aba=reagentes" style="{css_aba}background:{'#0066cc' if aba_ativa == 'reagentes' else '#999'};">🧪 Reagentes</a>
-            <a href="/consulta?aba=abertos" style="{css_aba}background:{'#ff9800' if aba_ativa == 'abertos' else '#999'};">⏳ Pedidos Abertos ({len(pedidos_abertos)})</a>
-            <a href="/consulta?aba=recebidos" style="{css_aba}background:{'#4caf50' if aba_ativa == 'recebidos' else '#999'};">✅ Pedidos Recebidos ({len(pedidos_recebidos)})</a>
-        </div>
-        
-        {f'''<form method="post" style="margin-bottom:20px;">
+    return f"""
+        <form method="post" action="/consulta" style="margin-bottom:20px;">
             <input type="hidden" name="aba" value="reagentes">
             <p>
                 <label><strong>Tipo de Filtro:</strong></label><br>
@@ -1075,7 +1234,7 @@ def consulta():
                     <option value="localizacao">Por Localização</option>
                     <option value="quantidade_min">Quantidade Mínima</option>
                     <option value="quantidade_max">Quantidade Máxima</option>
-                    <option value="critico">Estoque Crítico (&lt; 5)</option>
+                    <option value="critico">Estoque Crítico (&lt; {LIMITE_ESTOQUE_CRITICO})</option>
                     <option value="zerado">Estoque Zerado</option>
                 </select>
             </p>
@@ -1089,23 +1248,116 @@ def consulta():
                 <button type="submit" style="padding:10px 20px;background:blue;color:white;cursor:pointer;border-radius:5px;">🔍 Buscar</button>
                 <button type="reset" style="padding:10px 20px;background:gray;color:white;cursor:pointer;border-radius:5px;">Limpar</button>
             </p>
-        </form>''' if aba_ativa == 'reagentes' else ''}
+        </form>
         
         <hr>
         
-        {f'<h3>Resultados de Reagentes ({len(resultados)}):</h3>{html_reagentes}' if aba_ativa == 'reagentes' else ''}
-        {f'<h3>Pedidos Abertos ({len(pedidos_abertos)})</h3>{html_abertos}' if aba_ativa == 'abertos' else ''}
-        {f'<h3>Pedidos Recebidos ({len(pedidos_recebidos)})</h3>{html_recebidos}' if aba_ativa == 'recebidos' else ''}
+        <h3>Resultados de Reagentes ({len(resultados)}):</h3>{html}
+    """
+
+def renderizar_aba_pedidos(aba):
+    """Tabela de pedidos de uma aba ('abertos' ou 'recebidos')."""
+    estilo = ESTILO_PEDIDOS[aba]
+    pedidos = consultar_pedidos(aba)
+    
+    html = '<table border="1" style="width:100%;border-collapse:collapse;">'
+    html += f'<tr style="background-color:{estilo["cabecalho"]};"><th>Reagente</th><th>Quantidade</th><th>Data</th><th>Controlado</th><th>Status</th></tr>'
+    
+    for p in pedidos:
+        controlado_cor = 'red' if p['controlado'] == 'Sim' else 'green'
+        html += f'<tr style="background-color:{estilo["linha"]};"><td><b>{p["reagente"]}</b></td><td>{p["quantidade_nominal"]}</td><td>{p["data"]}</td><td style="color:{controlado_cor};"><b>{p["controlado"]}</b></td><td style="color:{estilo["cor_status"]};"><b>{estilo["icone"]} {p["status"]}</b></td></tr>'
+    
+    if not pedidos:
+        html += estilo['vazio']
+    
+    html += '</table>'
+    return f'<hr><h3>{estilo["titulo"]} ({len(pedidos)})</h3>{html}'
+
+def renderizar_aba(aba, resultados=(), filtro_aplicado=False):
+    if aba == 'reagentes':
+        return renderizar_aba_reagentes(resultados, filtro_aplicado)
+    return renderizar_aba_pedidos(aba)
+
+@app.route('/consulta', methods=['GET', 'POST'])
+def consulta():
+    """Página de consulta com abas; só a aba ativa é montada."""
+    if 'logged_in' not in session:
+        return redirect('/login')
+    
+    aba_ativa = request.args.get('aba', 'reagentes')
+    resultados = []
+    filtro_aplicado = False
+    
+    if request.method == 'POST':
+        filtro_tipo = request.form.get('filtro_tipo', '')
+        filtro_valor = request.form.get('filtro_valor', '')
+        aba_ativa = request.form.get('aba', 'reagentes')
+        
+        if aba_ativa == 'reagentes' and filtro_tipo and filtro_valor:
+            resultados = consultar_reagentes(filtro_tipo, filtro_valor)
+            filtro_aplicado = True
+    
+    if aba_ativa not in ABAS_CONSULTA:
+        aba_ativa = 'reagentes'
+    
+    # Contadores mantidos a cada pedido criado/finalizado: não materializa as listas
+    totais = {'abertos': contagem_pedidos['Aberto'], 'recebidos': contagem_pedidos['Finalizado']}
+    
+    css_aba = 'padding:12px 20px;margin-right:5px;border-radius:5px;text-decoration:none;font-weight:bold;color:white;display:inline-block;'
+    links_abas = ''
+    for aba, dados in ABAS_CONSULTA.items():
+        titulo = f'{dados["titulo"]} ({totais[aba]})' if aba in totais else dados['titulo']
+        cor = dados['cor'] if aba == aba_ativa else '#999'
+        links_abas += f'<a href="/consulta?aba={aba}" data-aba="{aba}" data-cor="{dados["cor"]}" onclick="return abrirAba(this)" style="{css_aba}background:{cor};">{titulo}</a>\n'
+    
+    return f"""
+    <div style="max-width:900px;margin:20px;padding:20px;border:1px solid #ccc;">
+        <h2>🔍 Consultas e Pedidos</h2>
+        
+        <div style="margin-bottom:25px;border-bottom:2px solid #ddd;padding-bottom:10px;">
+            {links_abas}
+        </div>
+        
+        <div id="conteudoAba">{renderizar_aba(aba_ativa, resultados, filtro_aplicado)}</div>
         
         <p style="margin-top:20px;"><a href="/">🏠 Voltar ao Menu</a></p>
     </div>
-    '''
+    
+    <script>
+    // Troca de aba sem recarregar a página: busca só o conteúdo da aba escolhida
+    function abrirAba(link) {{
+        var aba = link.getAttribute('data-aba');
+        fetch('/consulta/aba/' + aba)
+            .then(function(resposta) {{
+                if (!resposta.ok) throw new Error(resposta.status);
+                return resposta.text();
+            }})
+            .then(function(html) {{
+                document.getElementById('conteudoAba').innerHTML = html;
+                document.querySelectorAll('[data-aba]').forEach(function(outro) {{
+                    outro.style.background = outro === link ? outro.getAttribute('data-cor') : '#999';
+                }});
+                history.pushState(null, '', link.href);
+            }})
+            .catch(function() {{ window.location = link.href; }});
+        return false;
+    }}
+    window.addEventListener('popstate', function() {{ window.location.reload(); }});
+    </script>
+    """
+
+@app.route('/consulta/aba/<aba>')
+def consulta_aba(aba):
+    """Conteúdo de uma única aba da consulta, carregado sob demanda pela página."""
+    if 'logged_in' not in session:
+        return 'Não autenticado', 401
+    if aba not in ABAS_CONSULTA:
+        return 'Aba inexistente', 404
+    return renderizar_aba(aba)
 
 @app.route('/entrada-reagente', methods=['GET', 'POST'])
+@requer_permissao('entradas.registrar')
 def entrada_reagente():
-    if 'logged_in' not in session:
-        return redirect('/login')
-    
     if request.method == 'POST':
         data_chegada = request.form['data_chegada']
         pedido_feito = request.form['pedido_feito']
@@ -1116,29 +1368,30 @@ def entrada_reagente():
         controlado = request.form['controlado']
         data_validade = request.form.get('data_validade', '')
         
-        if pedido_feito == 'Sim':
-            pedido_id = int(request.form['pedido_selecionado'])
-            pedido = next((p for p in pedidos_data if p['id'] == pedido_id), None)
-            if pedido:
-                nome_reagente = pedido['reagente']
-                finalizar_pedido(pedido_id)
-        else:
-            nome_reagente = request.form['nome_reagente_manual']
-        
-        nova_entrada = {
-            'id': len(entradas_data) + 1,
-            'data_chegada': data_chegada,
-            'nome_reagente': nome_reagente,
-            'marca': marca,
-            'volume_nominal': volume_nominal,
-            'quantidade_embalagens': quantidade_embalagens,
-            'localizacao': localizacao,
-            'controlado': controlado,
-            'data_validade': data_validade,
-            'pedido_origem': pedido_feito
-        }
-        entradas_data.append(nova_entrada)
-        atualizar_reagente_quantidade(nome_reagente, volume_nominal, marca, quantidade_embalagens, localizacao)
+        with armazenamento.transacao():
+            pedido_finalizado = None
+            if pedido_feito == 'Sim':
+                pedido_id = int(request.form['pedido_selecionado'])
+                pedido = next((p for p in pedidos_data if p['id'] == pedido_id), None)
+                if pedido:
+                    nome_reagente = pedido['reagente']
+                    pedido_finalizado = pedido_id
+            else:
+                nome_reagente = request.form['nome_reagente_manual']
+            
+            nova_entrada = {
+                'id': proximo_id('entradas'),
+                'data_chegada': data_chegada,
+                'nome_reagente': nome_reagente,
+                'marca': marca,
+                'volume_nominal': volume_nominal,
+                'quantidade_embalagens': quantidade_embalagens,
+                'localizacao': localizacao,
+                'controlado': controlado,
+                'data_validade': data_validade,
+                'pedido_origem': pedido_feito
+            }
+            executar_evento('entrada', {'entrada': nova_entrada, 'pedido_id': pedido_finalizado})
         
         return f'''
         <h2>✅ Entrada Registrada!</h2>
@@ -1247,52 +1500,40 @@ def entrada_reagente():
     '''
 
 @app.route('/saida-reagente', methods=['GET', 'POST'])
+@requer_permissao('saidas.registrar')
 def saida_reagente():
-    if 'logged_in' not in session:
-        return redirect('/login')
-    
     if request.method == 'POST':
         nome_reagente = request.form['nome_reagente']
         marca = request.form['marca']
         volume_nominal = request.form['volume_nominal']
         quantidade_saida = int(request.form['quantidade'])
         
-        nome_norm = normalizar_para_comparacao(nome_reagente)
-        marca_norm = normalizar_para_comparacao(marca)
-        volume_norm = normalizar_para_comparacao(volume_nominal)
-        
-        reagente_encontrado = None
-        for r in reagentes_data:
-            if (normalizar_para_comparacao(r['nome']) == nome_norm and 
-                normalizar_para_comparacao(r.get('marca', '')) == marca_norm and
-                normalizar_para_comparacao(r.get('volume_nominal', '')) == volume_norm):
-                reagente_encontrado = r
-                break
-        
-        if not reagente_encontrado:
-            return '''<h2>❌ Erro!</h2><p>Reagente não encontrado.</p><p><a href="/saida-reagente">Tentar novamente</a></p><p><a href="/">Voltar</a></p>'''
-        
-        if quantidade_saida > reagente_encontrado['quantidade_embalagens']:
-            return f'''<h2>❌ Quantidade Insuficiente!</h2><p>Disponível: {reagente_encontrado['quantidade_embalagens']}</p><p>Solicitado: {quantidade_saida}</p><p><a href="/saida-reagente">Tentar novamente</a></p>'''
-        
-        nova_saida = {
-            'id': len(saidas_data) + 1,
-            'data_saida': datetime.now().strftime('%Y-%m-%d'),
-            'nome_reagente': reagente_encontrado['nome'],
-            'marca': reagente_encontrado.get('marca', 'N/A'),
-            'volume_nominal': reagente_encontrado.get('volume_nominal', 'N/A'),
-            'quantidade_saida': quantidade_saida,
-            'usuario': 'admin',
-            'localizacao': reagente_encontrado.get('localizacao', 'N/A')
-        }
-        saidas_data.append(nova_saida)
-        reagente_encontrado['quantidade_embalagens'] -= quantidade_saida
-        
-        if reagente_encontrado['quantidade_embalagens'] <= 0:
-            reagentes_data.remove(reagente_encontrado)
-            status_estoque = "❌ Reagente ZERADO"
-        else:
-            status_estoque = f"✅ Restam {reagente_encontrado['quantidade_embalagens']}"
+        # A trava do lote cobre a verificação de disponibilidade e o abatimento
+        with armazenamento.transacao(), estoque.travar(nome_reagente, marca, volume_nominal):
+            reagente_encontrado = estoque.buscar(nome_reagente, marca, volume_nominal)
+            
+            if not reagente_encontrado:
+                return '''<h2>❌ Erro!</h2><p>Reagente não encontrado.</p><p><a href="/saida-reagente">Tentar novamente</a></p><p><a href="/">Voltar</a></p>'''
+            
+            if quantidade_saida > reagente_encontrado['quantidade_embalagens']:
+                return f'''<h2>❌ Quantidade Insuficiente!</h2><p>Disponível: {reagente_encontrado['quantidade_embalagens']}</p><p>Solicitado: {quantidade_saida}</p><p><a href="/saida-reagente">Tentar novamente</a></p>'''
+            
+            nova_saida = {
+                'id': proximo_id('saidas'),
+                'data_saida': datetime.now().strftime('%Y-%m-%d'),
+                'nome_reagente': reagente_encontrado['nome'],
+                'marca': reagente_encontrado.get('marca', 'N/A'),
+                'volume_nominal': reagente_encontrado.get('volume_nominal', 'N/A'),
+                'quantidade_saida': quantidade_saida,
+                'usuario': 'admin',
+                'localizacao': reagente_encontrado.get('localizacao', 'N/A')
+            }
+            executar_evento('saida', nova_saida)
+            
+            if reagente_encontrado['quantidade_embalagens'] <= 0:
+                status_estoque = "❌ Reagente ZERADO"
+            else:
+                status_estoque = f"✅ Restam {reagente_encontrado['quantidade_embalagens']}"
         
         return f'''
         <h2>✅ Saída Registrada!</h2>
@@ -1302,15 +1543,14 @@ def saida_reagente():
         <p><a href="/">🏠 Voltar</a></p>
         '''
     
-    reagentes_js = str(reagentes_data).replace("'", '"')
-    
     return f'''
     <div style="max-width:500px;margin:20px;padding:20px;border:1px solid #ccc;">
         <h2>➖ Saída de Reagente</h2>
         <form method="post">
             <p>
                 <label>Nome:</label><br>
-                <input type="text" name="nome_reagente" id="nomeReagente" oninput="buscarMarcas()" required style="width:300px;padding:5px;">
+                <input type="text" name="nome_reagente" id="nomeReagente" list="nomesSugeridos" oninput="agendarSugestoes()" autocomplete="off" required style="width:300px;padding:5px;">
+                <datalist id="nomesSugeridos"></datalist>
             </p>
             
             <p>
@@ -1340,16 +1580,63 @@ def saida_reagente():
     </div>
     
     <script>
-    var reagentes = {reagentes_js};
+    // Sugestões vêm do servidor (prefixo do nome, no máximo {LIMITE_SUGESTOES} por consulta)
+    var sugestoes = [];
+    var temporizador = null;
+    var consultaAtual = 0;
+    
+    function normalizar(texto) {{
+        // Mesma comparação do servidor: sem acentos e sem diferenciar maiúsculas
+        return texto.normalize('NFD').replace(/[\\u0300-\\u036f]/g, '').toLowerCase().trim();
+    }}
+    
+    function agendarSugestoes() {{
+        clearTimeout(temporizador);
+        temporizador = setTimeout(carregarSugestoes, 250);
+    }}
+    
+    function carregarSugestoes() {{
+        var nome = document.getElementById('nomeReagente').value.trim();
+        var consulta = ++consultaAtual;
+        if (!nome) {{
+            sugestoes = [];
+            preencherNomes();
+            buscarMarcas();
+            return;
+        }}
+        fetch('/reagentes/sugestoes?q=' + encodeURIComponent(nome))
+            .then(function(resposta) {{ return resposta.json(); }})
+            .then(function(dados) {{
+                // Respostas fora de ordem de teclas anteriores são ignoradas
+                if (consulta !== consultaAtual) return;
+                sugestoes = dados.sugestoes;
+                preencherNomes();
+                buscarMarcas();
+            }});
+    }}
+    
+    function preencherNomes() {{
+        var lista = document.getElementById('nomesSugeridos');
+        lista.innerHTML = '';
+        var nomes = [];
+        sugestoes.forEach(function(r) {{
+            if (nomes.indexOf(r.nome) === -1) {{
+                nomes.push(r.nome);
+                var opt = document.createElement('option');
+                opt.value = r.nome;
+                lista.appendChild(opt);
+            }}
+        }});
+    }}
     
     function buscarMarcas() {{
-        var nome = document.getElementById('nomeReagente').value.toLowerCase();
+        var nome = normalizar(document.getElementById('nomeReagente').value);
         var marcaSelect = document.getElementById('marcaSelect');
         marcaSelect.innerHTML = '<option>Selecione uma marca</option>';
         
         var marcas = [];
-        reagentes.forEach(function(r) {{
-            if (r.nome.toLowerCase().includes(nome)) {{
+        sugestoes.forEach(function(r) {{
+            if (normalizar(r.nome).startsWith(nome)) {{
                 var marca = r.marca || 'N/A';
                 if (marcas.indexOf(marca) === -1) {{
                     marcas.push(marca);
@@ -1363,13 +1650,13 @@ def saida_reagente():
     }}
     
     function buscarVolumes() {{
-        var nome = document.getElementById('nomeReagente').value.toLowerCase();
+        var nome = normalizar(document.getElementById('nomeReagente').value);
         var marca = document.getElementById('marcaSelect').value;
         var volumeSelect = document.getElementById('volumeSelect');
         volumeSelect.innerHTML = '<option>Selecione um volume</option>';
         
-        reagentes.forEach(function(r) {{
-            if (r.nome.toLowerCase().includes(nome) && (r.marca || 'N/A') === marca) {{
+        sugestoes.forEach(function(r) {{
+            if (normalizar(r.nome).startsWith(nome) && (r.marca || 'N/A') === marca) {{
                 var opt = document.createElement('option');
                 opt.value = r.volume_nominal;
                 opt.text = r.volume_nominal + ' (' + r.quantidade_embalagens + ' disponíveis)';
@@ -1380,6 +1667,23 @@ def saida_reagente():
     </script>
     '''
 
+@app.route('/reagentes/sugestoes')
+@requer_permissao('saidas.registrar')
+def sugestoes_reagentes():
+    """Autocompletar da saída: reagentes cujo nome começa com `q`."""
+    try:
+        limite = min(int(request.args.get('limite', LIMITE_SUGESTOES)), LIMITE_SUGESTOES)
+    except ValueError:
+        limite = LIMITE_SUGESTOES
+    
+    sugestoes = [{
+        'nome': r['nome'],
+        'marca': r.get('marca', 'N/A'),
+        'volume_nominal': r.get('volume_nominal', 'N/A'),
+        'quantidade_embalagens': r['quantidade_embalagens']
+    } for r in estoque.sugerir(request.args.get('q', ''), limite)]
+    return jsonify({'sugestoes': sugestoes})
+
 @app.route('/novo-pedido', methods=['GET', 'POST'])
 def novo_pedido():
     if 'logged_in' not in session:
@@ -1391,15 +1695,15 @@ def novo_pedido():
         controlado = request.form['controlado']
         quantidade_nominal = request.form['quantidade_nominal']
         
-        novo_pedido = {
-            'id': len(pedidos_data) + 1,
-            'reagente': nome_reagente,
-            'data': data_pedido,
-            'controlado': controlado,
-            'quantidade_nominal': quantidade_nominal,
-            'status': 'Aberto'
-        }
-        pedidos_data.append(novo_pedido)
+        with armazenamento.transacao():
+            novo_pedido = {
+                'reagente': nome_reagente,
+                'data': data_pedido,
+                'controlado': controlado,
+                'quantidade_nominal': quantidade_nominal,
+                'status': 'Aberto'
+            }
+            executar_evento('pedido', novo_pedido)
         
         return f'<h2>✅ Pedido Criado!</h2><p>Reagente: <b>{nome_reagente}</b></p><p><a href="/pedidos">Ver Pedidos</a></p><p><a href="/">Voltar</a></p>'
     
@@ -1439,23 +1743,33 @@ def pedidos():
     if 'logged_in' not in session:
         return redirect('/login')
     
-    html = '<div style="margin:20px;padding:20px;"><h2>📝 Pedidos</h2><table border="1" style="width:100%;border-collapse:collapse;"><tr><th>ID</th><th>Reagente</th><th>Qtd</th><th>Data</th><th>Controlado</th><th>Status</th></tr>'
+    limite, cursor = ler_paginacao()
+    pagina, proximo_cursor = pagina_por_cursor(pedidos_data, cursor, limite)
     
-    for p in pedidos_data:
-        status_cor = 'green' if p['status'] == 'Finalizado' else 'orange'
-        controlado_cor = 'red' if p['controlado'] == 'Sim' else 'green'
-        html += f'<tr><td>#{p["id"]}</td><td><b>{p["reagente"]}</b></td><td>{p["quantidade_nominal"]}</td><td>{p["data"]}</td><td style="color:{controlado_cor};">{p["controlado"]}</td><td style="color:{status_cor};">{p["status"]}</td></tr>'
+    def gerar():
+        yield '<div style="margin:20px;padding:20px;"><h2>📝 Pedidos</h2><table border="1" style="width:100%;border-collapse:collapse;"><tr><th>ID</th><th>Reagente</th><th>Qtd</th><th>Data</th><th>Controlado</th><th>Status</th></tr>'
+        
+        linhas = []
+        for p in pagina:
+            status_cor = 'green' if p['status'] == 'Finalizado' else 'orange'
+            controlado_cor = 'red' if p['controlado'] == 'Sim' else 'green'
+            linhas.append(f'<tr><td>#{p["id"]}</td><td><b>{p["reagente"]}</b></td><td>{p["quantidade_nominal"]}</td><td>{p["data"]}</td><td style="color:{controlado_cor};">{p["controlado"]}</td><td style="color:{status_cor};">{p["status"]}</td></tr>')
+            if len(linhas) == LINHAS_POR_BLOCO:
+                yield ''.join(linhas)
+                linhas = []
+        yield ''.join(linhas)
+        
+        yield '</table>'
+        yield links_paginacao('/pedidos', cursor, proximo_cursor, limite)
+        yield '<p style="margin-top:20px;"><a href="/novo-pedido">Novo Pedido</a></p><p><a href="/">Voltar</a></p></div>'
     
-    html += '</table><p style="margin-top:20px;"><a href="/novo-pedido">Novo Pedido</a></p><p><a href="/">Voltar</a></p></div>'
-    return html
+    return Response(gerar(), mimetype='text/html')
 
 @app.route('/relatorio')
+@requer_permissao('relatorios.ver')
 def relatorio():
-    if 'logged_in' not in session:
-        return redirect('/login')
-    
-    rel_estoque = gerar_relatorio_estoque()
-    rel_pedidos = gerar_relatorio_pedidos()
+    rel_estoque = gerar_relatorio_estoque(incluir_itens=False)
+    rel_pedidos = gerar_relatorio_pedidos(incluir_itens=False)
     
     html = f'''
     <div style="margin:20px;padding:20px;">
@@ -1469,8 +1783,8 @@ def relatorio():
         <p>Abertos: <b>{rel_pedidos["total_abertos"]}</b></p>
         <p>Recebidos: <b>{rel_pedidos["total_recebidos"]}</b></p>
         
-        <h3>Itens Críticos (&lt; 5):</h3>
-        {len(rel_estoque["itens_criticos"])} item(ns)
+        <h3>Itens Críticos (&lt; {LIMITE_ESTOQUE_CRITICO}):</h3>
+        {rel_estoque["total_criticos"]} item(ns)
         
         <p><a href="/">Voltar</a></p>
     </div>
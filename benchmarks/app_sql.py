@@ -0,0 +1,43 @@
+"""App Flask com os blueprints de scr/ num SQLite, para os benchmarks (como o app_sql dos testes)."""
+import importlib
+import sys
+
+from flask import Flask
+
+# Os módulos de scr/ se importam como src.* (nome do pacote no deploy)
+if 'src' not in sys.modules:
+    sys.modules['src'] = importlib.import_module('scr')
+    sys.modules['src.routes.user'] = importlib.import_module('src.routes.user_routes')
+
+from src.models.user import User, db
+from src.models.migracoes import aplicar_migracoes
+from src.routes.reagente_simple import reagente_bp
+from src.routes.entrada import entrada_bp
+from src.routes.saida import saida_bp
+from src.routes.pedido import pedido_bp
+
+def criar_app(caminho_banco):
+    """App com o banco em `caminho_banco`, migrado e com o usuário 1 (criado se faltar)."""
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY='benchmark',
+        SQLALCHEMY_DATABASE_URI='sqlite:///' + caminho_banco,
+        SQLALCHEMY_ENGINE_OPTIONS={'connect_args': {'timeout': 60, 'check_same_thread': False}}
+    )
+    db.init_app(app)
+    for blueprint in (reagente_bp, entrada_bp, saida_bp, pedido_bp):
+        app.register_blueprint(blueprint)
+    
+    with app.app_context():
+        db.create_all()
+        aplicar_migracoes(db.engine)
+        if db.session.get(User, 1) is None:
+            db.session.add(User(username='benchmark', email='benchmark@feq.unicamp.br', password_hash='x'))
+            db.session.commit()
+    return app
+
+def cliente_logado(app):
+    cliente = app.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao['user_id'] = 1
+    return cliente
@@ -0,0 +1,104 @@
+"""Benchmark de entradas e saídas simultâneas no app.py (travas por lote).
+
+Cada thread usa seu próprio cliente e alterna entrada e saídas em lotes
+compartilhados. Para cada número de threads, mede operações/s e confere se
+o estoque final é exatamente inicial + entradas - saídas aceitas. Roda
+também com uma única trava global no lugar das travas por lote, para
+comparação.
+
+    PYTHONPATH=. python benchmarks/estoque_threads.py --operacoes 4000
+"""
+import argparse
+import sys
+import threading
+import time
+from collections import Counter
+
+import app
+
+LOTES = [(f'Reagente Benchmark {n}', 'Marca', '1L') for n in range(16)]
+EMBALAGENS_INICIAIS = 1000
+
+def cliente_admin():
+    cliente = app.app.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao['logged_in'] = True
+        sessao['user_id'] = 1
+    return cliente
+
+def entrada(cliente, nome, marca, volume, quantidade):
+    resposta = cliente.post('/entrada-reagente', data={
+        'data_chegada': '2024-09-01', 'pedido_feito': 'Não', 'nome_reagente_manual': nome,
+        'marca': marca, 'volume_nominal': volume, 'quantidade_embalagens': quantidade,
+        'localizacao': 'Armário B', 'controlado': 'Não'
+    })
+    assert 'Entrada Registrada' in resposta.get_data(as_text=True)
+
+def saida(cliente, nome, marca, volume, quantidade):
+    resposta = cliente.post('/saida-reagente', data={
+        'nome_reagente': nome, 'marca': marca, 'volume_nominal': volume, 'quantidade': quantidade
+    })
+    return 'Saída Registrada' in resposta.get_data(as_text=True)
+
+def rodada(n_threads, operacoes):
+    """Executa `operacoes` no total; retorna (operações/s, estoque consistente?)."""
+    estado = app.exportar_estado()
+    cliente = cliente_admin()
+    for lote in LOTES:
+        entrada(cliente, *lote, EMBALAGENS_INICIAIS)
+    
+    adicionado = Counter()
+    retirado = Counter()
+    trava_contagem = threading.Lock()
+    
+    def trabalhar(numero):
+        cliente = cliente_admin()
+        for i in range(operacoes // n_threads):
+            lote = LOTES[(numero * 7 + i) % len(LOTES)]
+            if i % 3 == 0:
+                entrada(cliente, *lote, 2)
+                with trava_contagem:
+                    adicionado[lote] += 2
+            elif saida(cliente, *lote, 1):
+                with trava_contagem:
+                    retirado[lote] += 1
+    
+    threads = [threading.Thread(target=trabalhar, args=(n,)) for n in range(n_threads)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+    
+    consistente = all(
+        app.estoque.buscar(*lote)['quantidade_embalagens'] == EMBALAGENS_INICIAIS + adicionado[lote] - retirado[lote]
+        for lote in LOTES
+    )
+    app.restaurar_estado(estado)
+    return (operacoes // n_threads) * n_threads / duracao, consistente
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--operacoes', type=int, default=4000)
+    parser.add_argument('--threads', default='1,2,4,8,16')
+    args = parser.parse_args()
+    
+    # Troca de thread frequente, como nos testes, para intercalar as operações
+    sys.setswitchinterval(1e-4)
+    trava_global = threading.RLock()
+    travar_por_lote = app.estoque.travar
+    print(f'{args.operacoes} operações por rodada (1/3 entradas, 2/3 saídas), Python {sys.version.split()[0]}')
+    print(f'  {"threads":>7s} {"por lote":>12s} {"global":>12s}  estoque')
+    for n_threads in (int(n) for n in args.threads.split(',')):
+        por_lote, consistente_lote = rodada(n_threads, args.operacoes)
+        app.estoque.travar = lambda *chave: trava_global
+        try:
+            global_, consistente_global = rodada(n_threads, args.operacoes)
+        finally:
+            app.estoque.travar = travar_por_lote
+        estado = 'ok' if consistente_lote and consistente_global else 'INCONSISTENTE'
+        print(f'  {n_threads:7d} {por_lote:8.0f} op/s {global_:8.0f} op/s  {estado}')
+
+if __name__ == '__main__':
+    main()
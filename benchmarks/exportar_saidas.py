@@ -0,0 +1,103 @@
+"""Benchmark da exportação de historico_saidas com 1M saídas: pico de RSS e vazão.
+
+Cada modo roda num processo próprio para que o pico de RSS de um não
+contamine o outro:
+
+- json: a resposta antiga, .all() e uma lista de dicts num único jsonify;
+- ndjson / csv: o streaming de /relatorios/gerar, lido em lotes com yield_per.
+
+    PYTHONPATH=. python benchmarks/exportar_saidas.py --saidas 1000000
+"""
+import argparse
+import datetime
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from sqlalchemy import insert
+
+from app_sql import cliente_logado, criar_app, db
+from src.models.reagente import Reagente, Entrada, Saida
+
+LOTE_INSERCAO = 50_000
+
+def povoar(caminho, n_saidas, n_entradas=100):
+    app = criar_app(caminho)
+    dia = datetime.date(2020, 1, 1)
+    agora = datetime.datetime(2024, 1, 1)
+    with app.app_context():
+        reagente = Reagente(nome='Etanol', quantidade_total=0)
+        db.session.add(reagente)
+        db.session.flush()
+        entradas = [Entrada(reagente_id=reagente.id, quantidade_embalagens=1, data_recebimento=dia,
+                            marca=f'Marca {n}', localizacao='Armário', quantidade_nominal='1L',
+                            quantidade_restante=0, usuario_id=1) for n in range(n_entradas)]
+        db.session.add_all(entradas)
+        db.session.flush()
+        entrada_ids = [entrada.id for entrada in entradas]
+        for inicio in range(0, n_saidas, LOTE_INSERCAO):
+            db.session.execute(insert(Saida), [{
+                'reagente_id': reagente.id,
+                'entrada_id': entrada_ids[n % n_entradas],
+                'quantidade_abatida': 1.0,
+                'data_saida': dia + datetime.timedelta(days=n % 1500),
+                'usuario_id': 1,
+                'observacoes': 'aula prática',
+                'data_criacao': agora
+            } for n in range(inicio, min(inicio + LOTE_INSERCAO, n_saidas))])
+        db.session.commit()
+
+def exportar(caminho, modo):
+    app = criar_app(caminho)
+    cliente = cliente_logado(app)
+    pedido = {'tipo': 'historico_saidas', 'assincrono': False}
+    if modo != 'json':
+        pedido['formato'] = modo
+    rss_inicial = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    
+    inicio = time.perf_counter()
+    resposta = cliente.post('/relatorios/gerar', json=pedido, buffered=False)
+    assert resposta.status_code == 200, resposta.status_code
+    primeiro = None
+    tamanho = 0
+    for parte in resposta.response:
+        if primeiro is None:
+            primeiro = time.perf_counter() - inicio
+        tamanho += len(parte)
+    resposta.close()
+    total = time.perf_counter() - inicio
+    
+    rss_final = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f'{modo} {primeiro} {total} {tamanho} {rss_inicial} {rss_final}')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--saidas', type=int, default=1_000_000)
+    parser.add_argument('--modos', default='json,ndjson,csv')
+    parser.add_argument('--banco', help=argparse.SUPPRESS)
+    parser.add_argument('--modo', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.modo:
+        exportar(args.banco, args.modo)
+        return
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, 'saidas.db')
+        inicio = time.perf_counter()
+        povoar(caminho, args.saidas)
+        print(f'{args.saidas} saídas gravadas em {time.perf_counter() - inicio:.1f} s, Python {sys.version.split()[0]}')
+        print(f'  {"modo":8s} {"TTFB":>9s} {"total":>9s} {"linhas/s":>11s} {"tamanho":>9s} {"RSS antes":>10s} {"pico RSS":>10s}')
+        for modo in args.modos.split(','):
+            saida = subprocess.run([sys.executable, __file__, '--banco', caminho, '--modo', modo],
+                                   check=True, capture_output=True, text=True).stdout.split()
+            _, primeiro, total, tamanho, rss_inicial, rss_final = saida
+            total = float(total)
+            print(f'  {modo:8s} {float(primeiro):8.2f}s {total:8.2f}s {args.saidas / total:11,.0f} '
+                  f'{int(tamanho) / 1e6:7.0f}MB {int(rss_inicial) / 1024:8.0f}MB {int(rss_final) / 1024:8.0f}MB')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Micro-benchmark da normalização de texto usada nas buscas do app.py.
+
+Compara o caminho antigo, que normalizava cada registro a cada filtro
+(NFD + unicodedata.category por caractere), com o atual: chaves de busca
+gravadas em registro['_busca'] na escrita e termos de busca memorizados em
+normalizar_busca().
+
+    PYTHONPATH=. python benchmarks/normalizacao.py --reagentes 100000
+"""
+import argparse
+import random
+import sys
+import time
+import unicodedata
+
+import app
+
+NOMES = ['Ácido Clorídrico', 'Álcool Etílico', 'Hidróxido de Sódio', 'Água Destilada',
+         'Acetona', 'Éter Etílico', 'Cloreto de Potássio', 'Sulfato de Cobre', 'Tolueno']
+MARCAS = ['Synth', 'Dinâmica', 'Vetec', 'Neon', 'Êxodo', 'Merck']
+LOCAIS = ['Prateleira A1', 'Armário C3', 'Geladeira', 'Capela de Exaustão']
+
+def remover_acentos_antigo(texto):
+    # Versão anterior de app.remover_acentos, sem o atalho para ASCII
+    if not texto:
+        return texto
+    nfd = unicodedata.normalize('NFD', texto)
+    return ''.join(char for char in nfd if unicodedata.category(char) != 'Mn')
+
+def normalizar_antigo(texto):
+    return remover_acentos_antigo(texto).lower()
+
+def consultar_antigo(reagentes, filtro_tipo, filtro_valor):
+    # Laço da consultar_reagentes anterior: normaliza cada registro a cada filtro
+    valor = normalizar_antigo(filtro_valor)
+    if filtro_tipo == 'marca':
+        return [r for r in reagentes if normalizar_antigo(r.get('marca', '')) == valor]
+    return [r for r in reagentes if valor in normalizar_antigo(r[filtro_tipo])]
+
+def por_segundo(funcao, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return repeticoes / (time.perf_counter() - inicio)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reagentes', type=int, default=100_000)
+    parser.add_argument('--textos', type=int, default=200_000)
+    parser.add_argument('--consultas', type=int, default=20)
+    args = parser.parse_args()
+
+    aleatorio = random.Random(0)
+    textos = [f'{aleatorio.choice(NOMES)} {aleatorio.choice(MARCAS)}' for _ in range(args.textos)]
+    termos = [aleatorio.choice(NOMES) for _ in range(args.textos)]  # buscas repetem poucos termos
+
+    print(f'normalização de {args.textos} textos, Python {sys.version.split()[0]}')
+    for rotulo, funcao, entrada in [
+        ('antes (NFD por chamada)', normalizar_antigo, textos),
+        ('agora (com atalho ASCII)', app.normalizar_para_comparacao, textos),
+        ('agora, termos (memo LRU)', app.normalizar_busca, termos),
+    ]:
+        inicio = time.perf_counter()
+        for texto in entrada:
+            funcao(texto)
+        print(f'  {rotulo:28s} {len(entrada) / (time.perf_counter() - inicio):12,.0f} textos/s')
+
+    reagentes = [{
+        'nome': f'{aleatorio.choice(NOMES)} {n}',
+        'marca': aleatorio.choice(MARCAS),
+        'volume_nominal': aleatorio.choice(['1L', '500ml', '250ml', '1kg']),
+        'localizacao': aleatorio.choice(LOCAIS),
+        'quantidade_embalagens': aleatorio.randint(0, 50)
+    } for n in range(args.reagentes)]
+    inicio = time.perf_counter()
+    for r in reagentes:
+        app.estoque.inserir(r)
+    carga = time.perf_counter() - inicio
+    # O estoque também tem os reagentes de exemplo do app
+    antigo = list(app.reagentes_data)
+
+    print(f'\nconsultar_reagentes com {len(antigo)} reagentes (chaves gravadas em {carga:.2f} s na carga)')
+    for filtro_tipo, filtro_valor in [('marca', 'dinamica'), ('nome', 'acido'), ('localizacao', 'armario')]:
+        assert len(consultar_antigo(antigo, filtro_tipo, filtro_valor)) == len(app.consultar_reagentes(filtro_tipo, filtro_valor))
+        antes = por_segundo(lambda: consultar_antigo(antigo, filtro_tipo, filtro_valor), args.consultas)
+        agora = por_segundo(lambda: app.consultar_reagentes(filtro_tipo, filtro_valor), args.consultas)
+        print(f'  {filtro_tipo:12s} antes {antes:8.1f} consultas/s   agora {agora:8.1f} consultas/s   ({agora / antes:.1f}x)')
+
+if __name__ == '__main__':
+    main()
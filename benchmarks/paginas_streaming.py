@@ -0,0 +1,102 @@
+"""Benchmark de /reagentes e /pedidos com 100k registros: tempo até o
+primeiro byte (TTFB), tempo total e pico de memória de cada resposta.
+
+Compara a página paginada em streaming com a montagem antiga, que
+concatenava (html +=) a tabela inteira antes de responder. O pico de
+memória é o das alocações Python durante a resposta (tracemalloc); o pico
+de RSS do processo, que inclui os próprios dados, é mostrado no final.
+
+    PYTHONPATH=. python benchmarks/paginas_streaming.py --registros 100000
+"""
+import argparse
+import resource
+import sys
+import time
+import tracemalloc
+
+import app
+
+def pagina_antiga_reagentes():
+    # Montagem anterior de reagentes(): uma string com todas as linhas
+    html = '<div><h2>🧪 Reagentes em Estoque</h2><table border="1">'
+    for r in app.reagentes_data:
+        html += f'<tr><td><b>{r["nome"]}</b></td><td>{r.get("marca", "N/A")}</td><td>{r.get("volume_nominal", "N/A")}</td><td><b>{r.get("localizacao", "Não informada")}</b></td><td><b>{r["quantidade_embalagens"]}</b></td></tr>'
+    return html + '</table></div>'
+
+def pagina_antiga_pedidos():
+    html = '<div><h2>📝 Pedidos</h2><table border="1">'
+    for p in app.pedidos_data:
+        html += f'<tr><td>#{p["id"]}</td><td><b>{p["reagente"]}</b></td><td>{p["quantidade_nominal"]}</td><td>{p["data"]}</td><td>{p["controlado"]}</td><td>{p["status"]}</td></tr>'
+    return html + '</table></div>'
+
+def medir(gerar_partes):
+    """(TTFB, tempo total, bytes, pico de memória) de uma resposta."""
+    tracemalloc.reset_peak()
+    antes = tracemalloc.get_traced_memory()[0]
+    inicio = time.perf_counter()
+    primeiro = None
+    tamanho = 0
+    for parte in gerar_partes():
+        if primeiro is None:
+            primeiro = time.perf_counter() - inicio
+        tamanho += len(parte)
+    total = time.perf_counter() - inicio
+    return primeiro, total, tamanho, tracemalloc.get_traced_memory()[1] - antes
+
+def cliente_logado():
+    cliente = app.app.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao['logged_in'] = True
+    return cliente
+
+def rota(cliente, url):
+    def partes():
+        resposta = cliente.get(url, buffered=False)
+        assert resposta.status_code == 200
+        try:
+            yield from resposta.response
+        finally:
+            resposta.close()
+    return partes
+
+def povoar(registros):
+    for n in range(registros):
+        app.estoque.inserir({
+            'nome': f'Reagente {n}', 'volume_nominal': '500ml', 'quantidade_embalagens': n % 40,
+            'marca': 'Synth', 'localizacao': f'Prateleira {n % 30}'
+        })
+        app.adicionar_pedido({
+            'reagente': f'Reagente {n}', 'data': '2024-09-01', 'controlado': 'Não',
+            'quantidade_nominal': '1L', 'status': 'Aberto'
+        })
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--registros', type=int, default=100_000)
+    args = parser.parse_args()
+
+    povoar(args.registros)
+    cliente = cliente_logado()
+    meio = args.registros // 2  # cursor no meio da lista: a página é achada por busca binária
+    cenarios = [
+        ('/reagentes antigo (tabela inteira)', lambda: iter([pagina_antiga_reagentes()])),
+        ('/reagentes página 1 (100)', rota(cliente, '/reagentes')),
+        ('/reagentes cursor no meio (1000)', rota(cliente, f'/reagentes?cursor={meio}&limite=1000')),
+        ('/pedidos antigo (tabela inteira)', lambda: iter([pagina_antiga_pedidos()])),
+        ('/pedidos página 1 (100)', rota(cliente, '/pedidos')),
+        ('/pedidos cursor no meio (1000)', rota(cliente, f'/pedidos?cursor={meio}&limite=1000')),
+    ]
+
+    tracemalloc.start()
+    print(f'{len(app.reagentes_data)} reagentes e {len(app.pedidos_data)} pedidos, Python {sys.version.split()[0]}')
+    print(f'  {"cenário":36s} {"TTFB":>10s} {"total":>10s} {"tamanho":>11s} {"pico":>10s}')
+    for rotulo, partes in cenarios:
+        medir(partes)  # aquece
+        primeiro, total, tamanho, pico = medir(partes)
+        print(f'  {rotulo:36s} {primeiro * 1000:8.2f}ms {total * 1000:8.2f}ms {tamanho:11,d} {pico / 1e6:8.2f}MB')
+    tracemalloc.stop()
+
+    print(f'pico de RSS do processo: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark da reinicialização a frio com o DiarioEventos.
+
+Grava N eventos 'pedido' no diário e mede três partidas do app.py:
+
+1. sem snapshot: todos os N eventos são reaplicados (o pior caso, como um
+   diário que nunca foi compactado);
+2. com o snapshot que a carga anterior gravou: nenhum evento a reaplicar;
+3. o mesmo snapshot mais K eventos gravados depois dele.
+
+O tempo das partidas 2 e 3 depende de K, não de N.
+
+    PYTHONPATH=. python benchmarks/replay_diario.py --eventos 1000000 --depois 1000
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import app
+from persistencia import DiarioEventos
+
+def evento(seq):
+    return {'seq': seq, 'tipo': 'pedido', 'dados': {
+        'reagente': f'Reagente {seq}',
+        'data': '2024-09-01',
+        'controlado': 'Não',
+        'quantidade_nominal': '1L',
+        'status': 'Aberto'
+    }}
+
+def escrever_eventos(caminho, primeiro, quantidade):
+    # Direto no arquivo, no formato de DiarioEventos.registrar, para não medir a gravação
+    with open(caminho, 'a', encoding='utf-8') as f:
+        for seq in range(primeiro, primeiro + quantidade):
+            f.write(json.dumps(evento(seq), ensure_ascii=False) + '\n')
+
+def partida(diretorio, estado_inicial):
+    """Reinicia o app a partir do diário e retorna os segundos gastos na carga."""
+    app.restaurar_estado(estado_inicial)
+    inicio = time.perf_counter()
+    app.iniciar_armazenamento(DiarioEventos(diretorio, fsync=False))
+    return time.perf_counter() - inicio
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--eventos', type=int, default=1_000_000)
+    parser.add_argument('--depois', type=int, default=1000, help='eventos gravados depois do snapshot')
+    args = parser.parse_args()
+
+    estado_inicial = app.exportar_estado()
+    pedidos_iniciais = len(app.pedidos_data)
+    with tempfile.TemporaryDirectory() as diretorio:
+        diario = os.path.join(diretorio, 'diario.jsonl')
+        escrever_eventos(diario, 1, args.eventos)
+        tamanho = os.path.getsize(diario)
+
+        # Sem snapshot, a carga também grava o snapshot inicial e esvazia o diário
+        completo = partida(diretorio, estado_inicial)
+        assert len(app.pedidos_data) == pedidos_iniciais + args.eventos
+        so_snapshot = partida(diretorio, estado_inicial)
+        escrever_eventos(diario, args.eventos + 1, args.depois)
+        com_pendentes = partida(diretorio, estado_inicial)
+        assert len(app.pedidos_data) == pedidos_iniciais + args.eventos + args.depois
+
+    pico_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f'diário com {args.eventos} eventos ({tamanho / 1e6:.0f} MB), Python {sys.version.split()[0]}')
+    print(f'  reaplicando todos os eventos:      {completo:8.2f} s  ({args.eventos / completo:,.0f} eventos/s, inclui gravar o snapshot)')
+    print(f'  só o snapshot:                     {so_snapshot:8.2f} s')
+    print(f'  snapshot + {args.depois} eventos pendentes: {com_pendentes:8.2f} s')
+    print(f'  pico de RSS: {pico_mb:.0f} MB')
+
+if __name__ == '__main__':
+    main()
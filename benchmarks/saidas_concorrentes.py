@@ -0,0 +1,90 @@
+"""Benchmark de POST /saidas (scr/) com requisições paralelas: correção e vazão.
+
+As threads disputam poucas entradas, de modo que parte das saídas esgota o
+saldo e deve ser recusada com 400. Ao final, confere se nenhuma entrada
+ficou negativa e se saldo da entrada, total do reagente e saídas gravadas
+batem com as respostas 201.
+
+    PYTHONPATH=. python benchmarks/saidas_concorrentes.py --requisicoes 2000
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import func
+
+from app_sql import cliente_logado, criar_app, db
+from src.models.reagente import Reagente, Entrada, Saida
+
+ENTRADAS = 4
+
+def rodada(caminho, n_threads, requisicoes):
+    """(saídas/s, respostas por status, estoque consistente?) de uma rodada num banco novo."""
+    app = criar_app(caminho)
+    with app.app_context():
+        estoque = requisicoes // ENTRADAS * 3 // 4  # ~1/4 das requisições acha a entrada esgotada
+        reagente = Reagente(nome='Etanol', quantidade_total=estoque * ENTRADAS)
+        db.session.add(reagente)
+        db.session.flush()
+        db.session.add_all(Entrada(
+            reagente_id=reagente.id, quantidade_embalagens=1, data_recebimento=datetime.date(2024, 1, 1),
+            marca='Synth', localizacao='Armário', quantidade_nominal=f'{estoque}ml',
+            quantidade_restante=estoque, usuario_id=1
+        ) for _ in range(ENTRADAS))
+        db.session.commit()
+    
+    status = Counter()
+    trava = threading.Lock()
+    
+    def retirar(numero):
+        cliente = cliente_logado(app)
+        for i in range(requisicoes // n_threads):
+            resposta = cliente.post('/saidas', json={
+                'entrada_id': (numero + i) % ENTRADAS + 1, 'quantidade_abatida': 1, 'data_saida': '2024-02-01'
+            })
+            with trava:
+                status[resposta.status_code] += 1
+    
+    threads = [threading.Thread(target=retirar, args=(n,)) for n in range(n_threads)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+    
+    with app.app_context():
+        restantes = [e.quantidade_restante for e in Entrada.query]
+        consistente = (
+            min(restantes) >= 0 and
+            Saida.query.count() == status[201] and
+            db.session.query(func.sum(Saida.quantidade_abatida)).scalar() == estoque * ENTRADAS - sum(restantes) and
+            Reagente.query.one().quantidade_total == sum(restantes)
+        )
+        db.session.remove()
+        db.engine.dispose()
+    return sum(status.values()) / duracao, status, consistente
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requisicoes', type=int, default=2000)
+    parser.add_argument('--threads', default='1,2,4,8,16')
+    args = parser.parse_args()
+    
+    print(f'{args.requisicoes} requisições em {ENTRADAS} entradas, SQLite, Python {sys.version.split()[0]}')
+    print(f'  {"threads":>7s} {"req/s":>8s} {"201":>6s} {"400":>6s} {"outros":>6s}  estoque')
+    with tempfile.TemporaryDirectory() as diretorio:
+        for n_threads in (int(n) for n in args.threads.split(',')):
+            caminho = os.path.join(diretorio, f'saidas_{n_threads}.db')
+            por_segundo, status, consistente = rodada(caminho, n_threads, args.requisicoes)
+            outros = sum(total for codigo, total in status.items() if codigo not in (201, 400))
+            print(f'  {n_threads:7d} {por_segundo:8.0f} {status[201]:6d} {status[400]:6d} {outros:6d}  '
+                  f'{"ok" if consistente else "INCONSISTENTE"}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,298 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+class ArmazenamentoMemoria:
+    """Armazenamento padrão: sem persistência, o estado vive só no processo.
+
+    Define a interface usada por app.py. As funções de negócio sempre chamam
+    transacao()/registrar(); os outros armazenamentos gravam os eventos e
+    permitem recuperar ou compartilhar o estado.
+    """
+
+    def carregar(self, restaurar, aplicar, exportar):
+        """Recupera o estado persistido (snapshot + eventos) ao iniciar."""
+
+    def sincronizar(self):
+        """Aplica eventos gravados por outros processos desde a última leitura."""
+
+    @contextmanager
+    def transacao(self):
+        """Bloco de leitura-validação-escrita que não pode ser intercalado."""
+        yield
+
+    def registrar(self, tipo, dados):
+        """Grava um evento antes de ele ser aplicado em memória."""
+
+    def precisa_snapshot(self):
+        return False
+
+    def gravar_snapshot(self, estado):
+        """Salva o estado completo, tornando desnecessários os eventos anteriores."""
+
+class DiarioEventos(ArmazenamentoMemoria):
+    """Diário de eventos (write-ahead log) em arquivo, com snapshots periódicos.
+
+    Cada mutação do estado em memória é gravada como uma linha JSON antes de
+    ser aplicada. De tempos em tempos o estado completo é salvo em um
+    snapshot e o diário recomeça vazio, de modo que a reinicialização só
+    precisa reaplicar os eventos posteriores ao último snapshot. Atende a um
+    único processo.
+    """
+
+    def __init__(self, diretorio, snapshot_a_cada=1000, fsync=True):
+        os.makedirs(diretorio, exist_ok=True)
+        self.caminho_log = os.path.join(diretorio, 'diario.jsonl')
+        self.caminho_snapshot = os.path.join(diretorio, 'snapshot.json')
+        self.snapshot_a_cada = snapshot_a_cada
+        self.fsync = fsync
+        self.seq = 0
+        self._desde_snapshot = 0
+        self._arquivo = None
+        self._lock = threading.RLock()
+
+    def carregar(self, restaurar, aplicar, exportar):
+        estado = self.carregar_snapshot()
+        if estado is not None:
+            restaurar(estado)
+        for evento in self.eventos_pendentes():
+            aplicar(evento['tipo'], evento['dados'])
+
+        self._arquivo = open(self.caminho_log, 'a', encoding='utf-8')
+        if estado is None:
+            # Primeira execução: o snapshot inicial guarda os dados de exemplo
+            self.gravar_snapshot(exportar())
+
+    def carregar_snapshot(self):
+        """Retorna o estado do último snapshot, ou None se ainda não houver."""
+        if not os.path.exists(self.caminho_snapshot):
+            return None
+        with open(self.caminho_snapshot, encoding='utf-8') as f:
+            snapshot = json.load(f)
+        self.seq = snapshot['seq']
+        return snapshot['estado']
+
+    def eventos_pendentes(self):
+        """Percorre os eventos gravados depois do último snapshot.
+
+        Uma última linha incompleta (queda durante a escrita) é descartada e
+        cortada do arquivo para que novos eventos não sejam gravados colados
+        a ela.
+        """
+        if not os.path.exists(self.caminho_log):
+            return
+
+        seq_snapshot = self.seq
+        posicao_valida = 0
+        with open(self.caminho_log, 'rb') as f:
+            for linha in f:
+                if not linha.endswith(b'\n'):
+                    break
+                try:
+                    evento = json.loads(linha)
+                except ValueError:
+                    break
+                posicao_valida += len(linha)
+                if evento['seq'] <= seq_snapshot:
+                    continue
+                self.seq = evento['seq']
+                self._desde_snapshot += 1
+                yield evento
+
+        if posicao_valida < os.path.getsize(self.caminho_log):
+            with open(self.caminho_log, 'r+b') as f:
+                f.truncate(posicao_valida)
+
+    @contextmanager
+    def transacao(self):
+        with self._lock:
+            yield
+
+    def registrar(self, tipo, dados):
+        """Grava um evento no final do diário e retorna seu número de sequência."""
+        with self._lock:
+            self.seq += 1
+            linha = json.dumps({'seq': self.seq, 'tipo': tipo, 'dados': dados}, ensure_ascii=False)
+            self._arquivo.write(linha + '\n')
+            self._arquivo.flush()
+            if self.fsync:
+                os.fsync(self._arquivo.fileno())
+            self._desde_snapshot += 1
+            return self.seq
+
+    def precisa_snapshot(self):
+        return self._desde_snapshot >= self.snapshot_a_cada
+
+    def gravar_snapshot(self, estado):
+        """Salva o estado completo e recomeça o diário.
+
+        O snapshot é gravado em um arquivo temporário e renomeado, então uma
+        queda no meio da escrita mantém o snapshot anterior. Se a queda
+        ocorrer antes de o diário ser esvaziado, os eventos já incluídos no
+        snapshot são ignorados pela sequência na próxima carga.
+        """
+        with self._lock:
+            temporario = self.caminho_snapshot + '.tmp'
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump({'seq': self.seq, 'estado': estado}, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporario, self.caminho_snapshot)
+
+            if self._arquivo:
+                self._arquivo.close()
+            self._arquivo = open(self.caminho_log, 'w', encoding='utf-8')
+            self._desde_snapshot = 0
+
+class ArmazenamentoSQLite(ArmazenamentoMemoria):
+    """Eventos e snapshot em um banco SQLite (modo WAL) compartilhado.
+
+    Vários processos (workers do gunicorn) podem usar o mesmo arquivo. Cada
+    um mantém sua cópia em memória, com seus índices, e aplica os eventos
+    gravados pelos outros antes de atender uma requisição. Escritas abrem
+    BEGIN IMMEDIATE e se atualizam antes da validação, então dois workers
+    nunca validam contra estados diferentes.
+    """
+
+    def __init__(self, caminho, snapshot_a_cada=1000):
+        self.caminho = caminho
+        self.snapshot_a_cada = snapshot_a_cada
+        self.seq = -1  # força a restauração do snapshot na primeira leitura
+        self._seq_snapshot = 0
+        self._data_version = None
+        self._conexao = None
+        self._pid = None
+        self._profundidade = 0
+        self._gravou = False
+        self._lock = threading.RLock()
+
+    def _conectar(self):
+        # Uma conexão por processo: workers criados por fork abrem a sua
+        if self._conexao is None or self._pid != os.getpid():
+            conexao = sqlite3.connect(self.caminho, timeout=30, isolation_level=None, check_same_thread=False)
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.execute('PRAGMA synchronous=FULL')
+            conexao.execute('''CREATE TABLE IF NOT EXISTS eventos (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                tipo TEXT NOT NULL,
+                dados TEXT NOT NULL
+            )''')
+            conexao.execute('''CREATE TABLE IF NOT EXISTS snapshot (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                seq INTEGER NOT NULL,
+                estado TEXT NOT NULL
+            )''')
+            self._conexao = conexao
+            self._pid = os.getpid()
+            # PRAGMA data_version só é comparável dentro da mesma conexão: o
+            # valor herdado do processo pai (fork) não diz nada sobre esta
+            self._data_version = None
+        return self._conexao
+
+    def _data_version_atual(self, conexao):
+        return conexao.execute('PRAGMA data_version').fetchone()[0]
+
+    def carregar(self, restaurar, aplicar, exportar):
+        self._restaurar = restaurar
+        self._aplicar = aplicar
+        with self._lock:
+            conexao = self._conectar()
+            conexao.execute('BEGIN IMMEDIATE')
+            try:
+                if conexao.execute('SELECT 1 FROM snapshot WHERE id = 1').fetchone() is None:
+                    # Primeiro processo a usar o banco: os dados de exemplo viram o snapshot inicial
+                    conexao.execute('INSERT INTO snapshot (id, seq, estado) VALUES (1, 0, ?)',
+                                    (json.dumps(exportar(), ensure_ascii=False),))
+                self._data_version = self._data_version_atual(conexao)
+                self._alcancar(conexao)
+            except BaseException:
+                conexao.execute('ROLLBACK')
+                raise
+            conexao.execute('COMMIT')
+
+    def _alcancar(self, conexao):
+        """Aplica o snapshot (se necessário) e os eventos posteriores a self.seq.
+
+        Deve rodar dentro de uma transação para ver snapshot e eventos
+        consistentes entre si.
+        """
+        self._seq_snapshot = conexao.execute('SELECT seq FROM snapshot WHERE id = 1').fetchone()[0]
+        if self.seq < self._seq_snapshot:
+            primeiro = conexao.execute('SELECT MIN(seq) FROM eventos').fetchone()[0]
+            if primeiro is None or primeiro > self.seq + 1:
+                # Os eventos que faltam já foram compactados no snapshot
+                estado = conexao.execute('SELECT estado FROM snapshot WHERE id = 1').fetchone()[0]
+                self._restaurar(json.loads(estado))
+                self.seq = self._seq_snapshot
+
+        eventos = conexao.execute('SELECT seq, tipo, dados FROM eventos WHERE seq > ? ORDER BY seq', (self.seq,))
+        for seq, tipo, dados in eventos:
+            self._aplicar(tipo, json.loads(dados))
+            self.seq = seq
+
+    def sincronizar(self):
+        with self._lock:
+            if self._profundidade:
+                return
+            conexao = self._conectar()
+            data_version = self._data_version_atual(conexao)
+            if data_version == self._data_version:
+                return
+            conexao.execute('BEGIN')
+            try:
+                self._alcancar(conexao)
+            finally:
+                conexao.execute('COMMIT')
+            self._data_version = data_version
+
+    @contextmanager
+    def transacao(self):
+        with self._lock:
+            if self._profundidade:
+                self._profundidade += 1
+                try:
+                    yield
+                finally:
+                    self._profundidade -= 1
+                return
+
+            conexao = self._conectar()
+            conexao.execute('BEGIN IMMEDIATE')
+            # Com a trava de escrita ninguém mais grava até o COMMIT
+            self._data_version = self._data_version_atual(conexao)
+            self._profundidade = 1
+            self._gravou = False
+            try:
+                self._alcancar(conexao)
+                yield
+            except BaseException:
+                conexao.execute('ROLLBACK')
+                if self._gravou:
+                    # A memória já recebeu eventos descartados: recarrega tudo na próxima leitura
+                    self.seq = -1
+                    self._data_version = None
+                raise
+            else:
+                conexao.execute('COMMIT')
+            finally:
+                self._profundidade = 0
+
+    def registrar(self, tipo, dados):
+        cursor = self._conectar().execute('INSERT INTO eventos (tipo, dados) VALUES (?, ?)',
+                                          (tipo, json.dumps(dados, ensure_ascii=False)))
+        self.seq = cursor.lastrowid
+        self._gravou = True
+        return self.seq
+
+    def precisa_snapshot(self):
+        return self.seq - self._seq_snapshot >= self.snapshot_a_cada
+
+    def gravar_snapshot(self, estado):
+        """Substitui o snapshot e apaga os eventos incluídos nele (dentro da transação)."""
+        conexao = self._conectar()
+        conexao.execute('INSERT OR REPLACE INTO snapshot (id, seq, estado) VALUES (1, ?, ?)',
+                        (self.seq, json.dumps(estado, ensure_ascii=False)))
+        conexao.execute('DELETE FROM eventos WHERE seq <= ?', (self.seq,))
+        self._seq_snapshot = self.seq
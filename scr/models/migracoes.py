@@ -0,0 +1,220 @@
+from datetime import datetime
+from sqlalchemy import bindparam, inspect, text
+from src.models.unidades import converter_quantidade
+from src.models.reagente import normalizar_nome
+
+# Migrações versionadas do esquema. Cada uma recebe a conexão (já dentro de
+# uma transação) e o nome do dialeto ('postgresql' ou 'sqlite'), e deve ser
+# idempotente: workers iniciando juntos podem tentar aplicar a mesma versão.
+MIGRACOES = []
+
+def migracao(versao, descricao):
+    def registrar(funcao):
+        MIGRACOES.append((versao, descricao, funcao))
+        return funcao
+    return registrar
+
+def executar(conexao, *comandos):
+    for comando in comandos:
+        conexao.execute(text(comando))
+
+@migracao(1, 'Índices das consultas frequentes')
+def indices_consultas(conexao, dialeto):
+    executar(
+        conexao,
+        # buscar_reagentes_para_saida: entradas de um reagente com estoque restante
+        'CREATE INDEX IF NOT EXISTS ix_entrada_reagente_disponivel '
+        'ON entrada (reagente_id, quantidade_restante) WHERE quantidade_restante > 0',
+        # Entradas de um reagente (selectinload em /reagentes/buscar, exclusões)
+        'CREATE INDEX IF NOT EXISTS ix_entrada_reagente_id ON entrada (reagente_id)',
+        # Saídas de uma entrada (selectinload, verificação antes de excluir entrada)
+        'CREATE INDEX IF NOT EXISTS ix_saida_entrada_id ON saida (entrada_id)',
+        # Pedidos por status, mais recentes primeiro
+        'CREATE INDEX IF NOT EXISTS ix_pedido_status_data ON pedido (status, data_pedido, id)',
+    )
+
+    # Reagente.nome ILIKE '%x%': índice de trigramas
+    if dialeto == 'postgresql':
+        executar(
+            conexao,
+            'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+            'CREATE INDEX IF NOT EXISTS ix_reagente_nome_trgm ON reagente USING gin (nome gin_trgm_ops)',
+        )
+    elif dialeto == 'sqlite':
+        # Tabela FTS5 externa (content=reagente) com tokenizador trigram,
+        # mantida pelos triggers; consultada por filtro_nome_reagente()
+        executar(
+            conexao,
+            "CREATE VIRTUAL TABLE IF NOT EXISTS reagente_nome_fts USING fts5("
+            "nome, content='reagente', content_rowid='id', tokenize='trigram')",
+            'CREATE TRIGGER IF NOT EXISTS reagente_nome_fts_ai AFTER INSERT ON reagente BEGIN '
+            'INSERT INTO reagente_nome_fts (rowid, nome) VALUES (new.id, new.nome); END',
+            'CREATE TRIGGER IF NOT EXISTS reagente_nome_fts_ad AFTER DELETE ON reagente BEGIN '
+            "INSERT INTO reagente_nome_fts (reagente_nome_fts, rowid, nome) VALUES ('delete', old.id, old.nome); END",
+            'CREATE TRIGGER IF NOT EXISTS reagente_nome_fts_au AFTER UPDATE OF nome ON reagente BEGIN '
+            "INSERT INTO reagente_nome_fts (reagente_nome_fts, rowid, nome) VALUES ('delete', old.id, old.nome); "
+            'INSERT INTO reagente_nome_fts (rowid, nome) VALUES (new.id, new.nome); END',
+            "INSERT INTO reagente_nome_fts (reagente_nome_fts) VALUES ('rebuild')",
+        )
+
+@migracao(2, 'Índices da paginação por (data, id)')
+def indices_paginacao(conexao, dialeto):
+    executar(
+        conexao,
+        'CREATE INDEX IF NOT EXISTS ix_entrada_data_id ON entrada (data_recebimento, id)',
+        'CREATE INDEX IF NOT EXISTS ix_saida_data_id ON saida (data_saida, id)',
+        'CREATE INDEX IF NOT EXISTS ix_pedido_data_id ON pedido (data_pedido, id)',
+        'CREATE INDEX IF NOT EXISTS ix_reagente_data_id ON reagente (data_criacao, id)',
+    )
+
+@migracao(3, 'Contador de versão dos dados (cache de relatórios)')
+def versao_dados(conexao, dialeto):
+    executar(
+        conexao,
+        'CREATE TABLE IF NOT EXISTS versao_dados (id INTEGER PRIMARY KEY, versao BIGINT NOT NULL)',
+        'INSERT INTO versao_dados (id, versao) VALUES (1, 0) ON CONFLICT (id) DO NOTHING',
+    )
+
+def quantidade_nominal_antiga(quantidade_nominal):
+    """Valor por embalagem como era calculado antes da migração 4 (só os dígitos do texto)."""
+    try:
+        return float(''.join(filter(str.isdigit, quantidade_nominal.replace('.', '').replace(',', '.'))))
+    except (ValueError, AttributeError):
+        return None
+
+@migracao(4, 'Quantidade nominal convertida para a unidade base')
+def quantidade_base(conexao, dialeto):
+    for tabela in ('entrada', 'pedido'):
+        colunas = {coluna['name'] for coluna in inspect(conexao).get_columns(tabela)}
+        if 'quantidade_base' not in colunas:
+            executar(conexao, f'ALTER TABLE {tabela} ADD COLUMN quantidade_base FLOAT')
+        if 'unidade_base' not in colunas:
+            executar(conexao, f'ALTER TABLE {tabela} ADD COLUMN unidade_base VARCHAR(2)')
+        
+        # Preenche os registros existentes; textos não reconhecidos ficam nulos
+        pendentes = conexao.execute(text(
+            f'SELECT id, quantidade_nominal FROM {tabela} WHERE quantidade_base IS NULL'
+        )).all()
+        convertidos = []
+        for registro_id, quantidade_nominal in pendentes:
+            try:
+                valor, unidade = converter_quantidade(quantidade_nominal)
+            except (ValueError, AttributeError):
+                continue
+            convertidos.append({
+                'id': registro_id,
+                'valor': valor,
+                'unidade': unidade,
+                'antigo': quantidade_nominal_antiga(quantidade_nominal)
+            })
+        if not convertidos:
+            continue
+        conexao.execute(
+            text(f'UPDATE {tabela} SET quantidade_base = :valor, unidade_base = :unidade WHERE id = :id'),
+            convertidos
+        )
+        
+        if tabela == 'entrada':
+            reescalar_entradas(conexao, convertidos)
+
+def reescalar_entradas(conexao, convertidos):
+    """Passa o saldo e as saídas das entradas antigas para a unidade base.
+
+    Antes, uma entrada de "1L" valia 1 por embalagem e uma de "500ml" valia
+    500; agora valem 1000 e 500 mL. O saldo, as saídas já abatidas e o total
+    do reagente são multiplicados pelo mesmo fator (valor novo / valor
+    antigo), mantendo a proporção já consumida de cada entrada.
+    """
+    fatores = [
+        {'id': c['id'], 'fator': c['valor'] / c['antigo']}
+        for c in convertidos
+        if c['antigo'] and c['valor'] != c['antigo']
+    ]
+    if not fatores:
+        return
+    conexao.execute(
+        text('UPDATE entrada SET quantidade_restante = quantidade_restante * :fator WHERE id = :id'),
+        fatores
+    )
+    conexao.execute(
+        text('UPDATE saida SET quantidade_abatida = quantidade_abatida * :fator WHERE entrada_id = :id'),
+        fatores
+    )
+    
+    # quantidade_total é a soma dos saldos das entradas do reagente
+    reagente_ids = {
+        reagente_id for (reagente_id,) in conexao.execute(
+            text('SELECT DISTINCT reagente_id FROM entrada WHERE id IN :ids').bindparams(
+                bindparam('ids', expanding=True)),
+            {'ids': [f['id'] for f in fatores]}
+        )
+    }
+    conexao.execute(
+        text('UPDATE reagente SET quantidade_total = COALESCE(('
+             'SELECT SUM(quantidade_restante) FROM entrada WHERE entrada.reagente_id = reagente.id'
+             '), 0) WHERE id = :id'),
+        [{'id': reagente_id} for reagente_id in sorted(reagente_ids)]
+    )
+
+@migracao(5, 'Nome normalizado e único dos reagentes')
+def nome_normalizado(conexao, dialeto):
+    colunas = {coluna['name'] for coluna in inspect(conexao).get_columns('reagente')}
+    if 'nome_normalizado' not in colunas:
+        executar(conexao, 'ALTER TABLE reagente ADD COLUMN nome_normalizado VARCHAR(200)')
+    
+    reagentes = conexao.execute(text('SELECT id, nome, quantidade_total FROM reagente ORDER BY id')).all()
+    if reagentes:
+        conexao.execute(
+            text('UPDATE reagente SET nome_normalizado = :normalizado WHERE id = :id'),
+            [{'id': reagente_id, 'normalizado': normalizar_nome(nome)} for reagente_id, nome, _ in reagentes]
+        )
+    
+    # Reagentes cadastrados em duplicidade ('Ácido' e 'Acido') são unidos no
+    # de menor id, que recebe as entradas, as saídas e o estoque dos demais
+    grupos = {}
+    for reagente_id, nome, quantidade_total in reagentes:
+        grupos.setdefault(normalizar_nome(nome), []).append((reagente_id, quantidade_total))
+    for duplicados in grupos.values():
+        if len(duplicados) < 2:
+            continue
+        mantido = duplicados[0][0]
+        removidos = [reagente_id for reagente_id, _ in duplicados[1:]]
+        parametros = {'mantido': mantido, 'total': sum(total for _, total in duplicados)}
+        for tabela in ('entrada', 'saida'):
+            for removido in removidos:
+                conexao.execute(text(f'UPDATE {tabela} SET reagente_id = :mantido WHERE reagente_id = :removido'),
+                                {'mantido': mantido, 'removido': removido})
+        conexao.execute(text('UPDATE reagente SET quantidade_total = :total WHERE id = :mantido'), parametros)
+        for removido in removidos:
+            conexao.execute(text('DELETE FROM reagente WHERE id = :removido'), {'removido': removido})
+    
+    executar(conexao, 'CREATE UNIQUE INDEX IF NOT EXISTS ix_reagente_nome_normalizado ON reagente (nome_normalizado)')
+
+def aplicar_migracoes(engine):
+    """Aplica, em ordem, as migrações ainda não registradas no banco.
+
+    Chamar na inicialização, depois de db.create_all(). Cada versão roda em
+    sua própria transação junto com o registro em schema_migracoes.
+    Retorna as versões aplicadas agora.
+    """
+    with engine.begin() as conexao:
+        executar(conexao, '''CREATE TABLE IF NOT EXISTS schema_migracoes (
+            versao INTEGER PRIMARY KEY,
+            descricao VARCHAR(200) NOT NULL,
+            aplicada_em TIMESTAMP NOT NULL
+        )''')
+        aplicadas = {versao for (versao,) in conexao.execute(text('SELECT versao FROM schema_migracoes'))}
+
+    novas = []
+    for versao, descricao, funcao in sorted(MIGRACOES, key=lambda m: m[0]):
+        if versao in aplicadas:
+            continue
+        with engine.begin() as conexao:
+            funcao(conexao, engine.dialect.name)
+            conexao.execute(
+                text('INSERT INTO schema_migracoes (versao, descricao, aplicada_em) '
+                     'VALUES (:versao, :descricao, :agora) ON CONFLICT (versao) DO NOTHING'),
+                {'versao': versao, 'descricao': descricao, 'agora': datetime.utcnow()}
+            )
+        novas.append(versao)
+    return novas
@@ -1,12 +1,27 @@
+import unicodedata
+from functools import lru_cache
+from sqlalchemy import column, select, table
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import joinedload, validates
 from src.models.user import db
 from datetime import datetime
 
+@lru_cache(maxsize=2048)
+def normalizar_nome(nome):
+    """Nome sem acentos, em minúsculas e sem espaços nas pontas (como remover_acentos em app.py)."""
+    nome = (nome or '').strip()
+    if not nome.isascii():
+        nome = ''.join(char for char in unicodedata.normalize('NFD', nome) if unicodedata.category(char) != 'Mn')
+    return nome.lower()
+
 class Pedido(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     data_pedido = db.Column(db.Date, nullable=False)
     nome_reagente = db.Column(db.String(200), nullable=False)
     controlado = db.Column(db.Boolean, nullable=False, default=False)
     quantidade_nominal = db.Column(db.String(100), nullable=False)
+    quantidade_base = db.Column(db.Float, nullable=True)  # quantidade_nominal convertida (models/unidades.py)
+    unidade_base = db.Column(db.String(2), nullable=True)  # 'mL', 'g' ou 'un'; nulo se não reconhecida
     status = db.Column(db.String(20), nullable=False, default='aberto')  # 'aberto' ou 'concluido'
     usuario_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     data_criacao = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -24,6 +39,8 @@ class Pedido(db.Model):
             'nome_reagente': self.nome_reagente,
             'controlado': self.controlado,
             'quantidade_nominal': self.quantidade_nominal,
+            'quantidade_base': self.quantidade_base,
+            'unidade_base': self.unidade_base,
             'status': self.status,
             'usuario_id': self.usuario_id,
             'data_criacao': self.data_criacao.isoformat() if self.data_criacao else None
@@ -32,6 +49,8 @@ class Pedido(db.Model):
 class Reagente(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(200), nullable=False)
+    # 'Ácido' e 'acido' são o mesmo reagente: a chave única é o nome normalizado
+    nome_normalizado = db.Column(db.String(200), nullable=False, unique=True, index=True)
     controlado = db.Column(db.Boolean, nullable=False, default=False)
     quantidade_total = db.Column(db.Float, nullable=False, default=0.0)
     data_criacao = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -44,6 +63,11 @@ class Reagente(db.Model):
     def __repr__(self):
         return f'<Reagente {self.nome}>'
 
+    @validates('nome')
+    def validar_nome(self, chave, nome):
+        self.nome_normalizado = normalizar_nome(nome)
+        return nome
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -64,7 +88,9 @@ class Entrada(db.Model):
     marca = db.Column(db.String(100), nullable=False)
     localizacao = db.Column(db.String(200), nullable=False)
     quantidade_nominal = db.Column(db.String(100), nullable=False)
-    quantidade_restante = db.Column(db.Float, nullable=False)  # Para controle de saídas
+    quantidade_base = db.Column(db.Float, nullable=True)  # Por embalagem, na unidade base (models/unidades.py)
+    unidade_base = db.Column(db.String(2), nullable=True)  # 'mL', 'g' ou 'un'
+    quantidade_restante = db.Column(db.Float, nullable=False)  # Para controle de saídas, na unidade base
     usuario_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     data_criacao = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
@@ -85,6 +111,8 @@ class Entrada(db.Model):
             'marca': self.marca,
             'localizacao': self.localizacao,
             'quantidade_nominal': self.quantidade_nominal,
+            'quantidade_base': self.quantidade_base,
+            'unidade_base': self.unidade_base,
             'quantidade_restante': self.quantidade_restante,
             'usuario_id': self.usuario_id,
             'data_criacao': self.data_criacao.isoformat() if self.data_criacao else None,
@@ -117,3 +145,66 @@ class Saida(db.Model):
             'reagente_nome': self.reagente.nome if self.reagente else None,
             'entrada_marca': self.entrada.marca if self.entrada else None
         }
+
+# Relações lidas por to_dict() de cada modelo. Listagens devem carregá-las
+# junto com as linhas (com_relacoes), senão cada linha serializada dispara
+# um SELECT a mais por relação.
+RELACOES_TO_DICT = {
+    Entrada: ('reagente',),
+    Saida: ('reagente', 'entrada'),
+}
+
+def com_relacoes(query, modelo):
+    """Acrescenta à query o joinedload das relações usadas em modelo.to_dict()."""
+    opcoes = [joinedload(getattr(modelo, relacao)) for relacao in RELACOES_TO_DICT.get(modelo, ())]
+    return query.options(*opcoes) if opcoes else query
+
+# Índice de trigramas do SQLite criado pela migração 1 (models/migracoes.py)
+reagente_nome_fts = table('reagente_nome_fts', column('rowid'), column('nome'))
+
+def filtro_nome_reagente(nome):
+    """Condição "Reagente.nome contém nome" (sem diferenciar maiúsculas) que usa índice.
+
+    No PostgreSQL o ILIKE é atendido pelo índice GIN de pg_trgm; no SQLite,
+    onde LIKE '%x%' sempre varre a tabela, a busca passa pela tabela FTS5
+    com tokenizador trigram.
+    """
+    padrao = f'%{nome}%'
+    if db.engine.dialect.name == 'sqlite':
+        return Reagente.id.in_(select(reagente_nome_fts.c.rowid).where(reagente_nome_fts.c.nome.like(padrao)))
+    return Reagente.nome.ilike(padrao)
+
+def somar_estoque_reagentes(quantidades):
+    """Soma quantidades ao estoque dos reagentes, criando os que não existem.
+
+    `quantidades` mapeia nome normalizado -> (nome, controlado, quantidade).
+    Tudo é feito num único INSERT ... ON CONFLICT (nome_normalizado) DO
+    UPDATE ... RETURNING (PostgreSQL e SQLite 3.35+): não há busca prévia,
+    duas primeiras entradas simultâneas do mesmo reagente não criam
+    duplicatas, e a soma em quantidade_total é feita no banco, sem perder
+    atualizações. Retorna nome normalizado -> id do reagente.
+    """
+    insert = postgresql.insert if db.engine.dialect.name == 'postgresql' else sqlite.insert
+    agora = datetime.utcnow()
+    
+    # Ordem fixa das linhas: lotes concorrentes travam os reagentes na mesma ordem
+    comando = insert(Reagente).values([
+        {
+            'nome': nome,
+            'nome_normalizado': nome_normalizado,
+            'controlado': controlado,
+            'quantidade_total': quantidade,
+            'data_criacao': agora,
+            'data_atualizacao': agora
+        }
+        for nome_normalizado, (nome, controlado, quantidade) in sorted(quantidades.items())
+    ])
+    comando = comando.on_conflict_do_update(
+        index_elements=[Reagente.nome_normalizado],
+        set_={
+            'quantidade_total': Reagente.quantidade_total + comando.excluded.quantidade_total,
+            'data_atualizacao': agora
+        }
+    ).returning(Reagente.id, Reagente.nome_normalizado)
+    
+    return {nome_normalizado: reagente_id for reagente_id, nome_normalizado in db.session.execute(comando)}
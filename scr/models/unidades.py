@@ -0,0 +1,72 @@
+import re
+from functools import lru_cache
+
+# Fator de cada unidade aceita para a unidade base da sua grandeza
+UNIDADES = {
+    'ml': ('mL', 1.0),
+    'l': ('mL', 1000.0),
+    'litro': ('mL', 1000.0),
+    'litros': ('mL', 1000.0),
+    'dl': ('mL', 100.0),
+    'cl': ('mL', 10.0),
+    'ul': ('mL', 0.001),
+    'µl': ('mL', 0.001),
+    'μl': ('mL', 0.001),
+    'g': ('g', 1.0),
+    'gr': ('g', 1.0),
+    'grama': ('g', 1.0),
+    'gramas': ('g', 1.0),
+    'kg': ('g', 1000.0),
+    'mg': ('g', 0.001),
+    'ug': ('g', 0.000001),
+    'µg': ('g', 0.000001),
+    'μg': ('g', 0.000001),
+    '': ('un', 1.0),
+    'un': ('un', 1.0),
+    'und': ('un', 1.0),
+    'unid': ('un', 1.0),
+    'unidade': ('un', 1.0),
+    'unidades': ('un', 1.0),
+}
+
+# "500ml", "2,5 L", "1.000 g", "6 x 500 mL"
+PADRAO_QUANTIDADE = re.compile(r'^(?:(\d+)\s*[x×]\s*)?(\d[\d.,]*)\s*([^\d\s]*)$')
+
+# "1.000", "12.500", "1.000.000": pontos separando grupos de 3 dígitos (pt-BR)
+PADRAO_MILHARES = re.compile(r'^[1-9]\d{0,2}(?:\.\d{3})+$')
+
+def converter_numero(texto):
+    """Número escrito com ponto ou vírgula decimal ("2.5", "2,5", "1.000,5", "1.000")."""
+    if ',' in texto and '.' in texto:
+        # O último separador é o decimal; o outro separa milhares
+        if texto.rfind(',') > texto.rfind('.'):
+            texto = texto.replace('.', '').replace(',', '.')
+        else:
+            texto = texto.replace(',', '')
+    elif PADRAO_MILHARES.match(texto):
+        # Ponto seguido de exatamente 3 dígitos separa milhares ("1.000 g" = 1000 g);
+        # "2.5" e "0.500" continuam decimais
+        texto = texto.replace('.', '')
+    else:
+        texto = texto.replace(',', '.')
+    return float(texto)
+
+@lru_cache(maxsize=4096)
+def converter_quantidade(quantidade_nominal):
+    """Converte uma quantidade nominal em (valor, unidade base).
+
+    Volumes vão para mL, massas para g e quantidades sem unidade para 'un'.
+    As mesmas poucas strings ("500ml", "1L") se repetem muito, então o
+    resultado fica em cache. Levanta ValueError se o texto não for reconhecido.
+    """
+    encontrado = PADRAO_QUANTIDADE.match(quantidade_nominal.strip().lower())
+    if not encontrado:
+        raise ValueError(f'Quantidade nominal não reconhecida: {quantidade_nominal!r}')
+
+    multiplicador, numero, unidade = encontrado.groups()
+    if unidade not in UNIDADES:
+        raise ValueError(f'Unidade não reconhecida: {unidade!r}')
+
+    unidade_base, fator = UNIDADES[unidade]
+    valor = converter_numero(numero) * fator * int(multiplicador or 1)
+    return round(valor, 6), unidade_base
@@ -0,0 +1,78 @@
+from flask import current_app
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+from src.models.user import db
+from src.models.reagente import Pedido, Reagente, Entrada, Saida
+
+# Modelos cujas alterações mudam os relatórios e invalidam o cache
+MODELOS_VERSIONADOS = (Pedido, Reagente, Entrada, Saida)
+
+class VersaoDados(db.Model):
+    """Contador único (id = 1) da versão dos dados, compartilhado pelos processos."""
+    __tablename__ = 'versao_dados'
+
+    id = db.Column(db.Integer, primary_key=True)
+    versao = db.Column(db.BigInteger, nullable=False, default=0)
+
+def versao_atual():
+    """Versão dos dados: aumenta depois de cada commit que altera os modelos versionados.
+
+    Fica no banco, então vale para todos os processos que usam o mesmo banco.
+    Retorna None se não der para ler o contador; quem usa a versão para
+    cache deve então responder sem cache.
+    """
+    try:
+        # Conexão à parte: uma falha aqui não invalida a transação da sessão
+        with db.engine.connect() as conexao:
+            return conexao.execute(text('SELECT versao FROM versao_dados WHERE id = 1')).scalar()
+    except SQLAlchemyError:
+        current_app.logger.exception('Não foi possível ler a versão dos dados')
+        return None
+
+@event.listens_for(db.session, 'after_flush')
+def marcar_alteracao(session, contexto):
+    for objeto in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(objeto, MODELOS_VERSIONADOS):
+            session.info['dados_alterados'] = True
+            return
+
+@event.listens_for(db.session, 'do_orm_execute')
+def marcar_comando(estado):
+    # UPDATE/INSERT/DELETE em massa (abatimento condicional das saídas, upsert
+    # dos reagentes) não passam por new/dirty/deleted do flush
+    if not (estado.is_update or estado.is_insert or estado.is_delete):
+        return
+    mapper = estado.bind_mapper
+    if mapper is not None and issubclass(mapper.class_, MODELOS_VERSIONADOS):
+        estado.session.info['dados_alterados'] = True
+
+@event.listens_for(db.session, 'after_commit')
+def confirmar_alteracao(session):
+    if session.info.pop('dados_alterados', False):
+        session.info['incrementar_versao'] = True
+
+@event.listens_for(db.session, 'after_transaction_end')
+def incrementar_versao(session, transacao):
+    # Incrementa só depois do commit e numa transação própria: quem ler a
+    # versão nova já enxerga os dados novos, e a linha do contador não fica
+    # travada durante a transação que alterou os dados. Roda depois que a
+    # sessão devolveu sua conexão ao pool (em after_commit ela ainda está
+    # em uso), então cada requisição usa uma conexão por vez e threads
+    # concorrentes não esgotam o pool esperando uma segunda.
+    if transacao.parent is not None or not session.info.pop('incrementar_versao', False):
+        return
+    try:
+        with db.engine.begin() as conexao:
+            conexao.execute(text(
+                'INSERT INTO versao_dados (id, versao) VALUES (1, 1) '
+                'ON CONFLICT (id) DO UPDATE SET versao = versao_dados.versao + 1'
+            ))
+    except SQLAlchemyError:
+        # Os dados já foram gravados: a requisição não pode falhar por causa
+        # do contador. O cache fica no máximo desatualizado até o próximo
+        # incremento que der certo.
+        current_app.logger.exception('Não foi possível incrementar a versão dos dados')
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def descartar_alteracao(session, transacao_anterior):
+    session.info.pop('dados_alterados', None)
@@ -0,0 +1,35 @@
+import threading
+from collections import OrderedDict
+
+class CacheRelatorios:
+    """Corpos de relatórios já serializados, por (tipo, versão dos dados).
+
+    LRU limitado pelo total de bytes guardados. Como a versão dos dados faz
+    parte da chave, qualquer alteração invalida os relatórios sem precisar
+    apagar nada; ao guardar a versão nova de um tipo, as anteriores saem.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, tipo, versao):
+        with self._lock:
+            corpo = self._itens.get((tipo, versao))
+            if corpo is not None:
+                self._itens.move_to_end((tipo, versao))
+            return corpo
+
+    def guardar(self, tipo, versao, corpo):
+        if len(corpo) > self.max_bytes:
+            return
+        with self._lock:
+            for chave in [chave for chave in self._itens if chave[0] == tipo]:
+                self.bytes -= len(self._itens.pop(chave))
+            self._itens[(tipo, versao)] = corpo
+            self.bytes += len(corpo)
+            while self.bytes > self.max_bytes:
+                _, antigo = self._itens.popitem(last=False)
+                self.bytes -= len(antigo)
@@ -1,7 +1,9 @@
 from flask import Blueprint, jsonify, request, session
 from src.models.user import User, db
-from src.models.reagente import Pedido, Reagente, Entrada
+from src.models.reagente import Pedido, Entrada, com_relacoes, normalizar_nome, somar_estoque_reagentes
+from src.models.unidades import converter_quantidade
 from src.routes.user import login_required
+from src.routes.paginacao import resposta_paginada
 from datetime import datetime
 
 entrada_bp = Blueprint('entrada', __name__)
@@ -9,35 +11,105 @@ entrada_bp = Blueprint('entrada', __name__)
 @entrada_bp.route('/entradas', methods=['GET'])
 @login_required
 def get_entradas():
-    entradas = Entrada.query.order_by(Entrada.data_recebimento.desc()).all()
-    return jsonify([entrada.to_dict() for entrada in entradas])
+    query = com_relacoes(Entrada.query, Entrada)
+    return resposta_paginada(query, Entrada.data_recebimento, Entrada.id)
 
-@entrada_bp.route('/entradas', methods=['POST'])
-@login_required
-def create_entrada():
-    data = request.json
+def validar_entrada(data):
+    """Valida os campos de uma entrada e converte datas e quantidade.
+
+    Levanta ValueError com a mensagem de erro para o cliente.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Entrada deve ser um objeto JSON')
     
     # Validações básicas
     required_fields = ['quantidade_embalagens', 'data_recebimento', 'marca', 'localizacao', 'quantidade_nominal']
     for field in required_fields:
         if not data.get(field):
-            return jsonify({'error': f'{field} é obrigatório'}), 400
+            raise ValueError(f'{field} é obrigatório')
     
     try:
         data_recebimento = datetime.strptime(data['data_recebimento'], '%Y-%m-%d').date()
-    except ValueError:
-        return jsonify({'error': 'Formato de data de recebimento inválido. Use YYYY-MM-DD'}), 400
+    except (ValueError, TypeError):
+        raise ValueError('Formato de data de recebimento inválido. Use YYYY-MM-DD')
     
     data_validade = None
     if data.get('data_validade'):
         try:
             data_validade = datetime.strptime(data['data_validade'], '%Y-%m-%d').date()
-        except ValueError:
-            return jsonify({'error': 'Formato de data de validade inválido. Use YYYY-MM-DD'}), 400
+        except (ValueError, TypeError):
+            raise ValueError('Formato de data de validade inválido. Use YYYY-MM-DD')
+    
+    # Entrada sem pedido - todos os dados devem ser fornecidos
+    if not data.get('pedido_id') and not data.get('nome_reagente'):
+        raise ValueError('nome_reagente é obrigatório quando não há pedido')
+    
+    # Número inteiro de embalagens, como número ou texto ("3"); str() recusa
+    # também true, 2.5 e listas, que int() aceitaria ou truncaria
+    try:
+        quantidade_embalagens = int(str(data['quantidade_embalagens']))
+    except ValueError:
+        raise ValueError('quantidade_embalagens deve ser um número inteiro')
+    if quantidade_embalagens <= 0:
+        raise ValueError('quantidade_embalagens deve ser maior que zero')
+    
+    pedido_id = None
+    if data.get('pedido_id'):
+        try:
+            pedido_id = int(data['pedido_id'])
+        except (ValueError, TypeError):
+            raise ValueError('pedido_id inválido')
+    
+    # Calcular quantidade total baseada na quantidade nominal e número de embalagens,
+    # na unidade base ("1L" e "500ml" viram 1000 e 500 mL e podem ser somados)
+    try:
+        quantidade_base, unidade_base = converter_quantidade(data['quantidade_nominal'])
+        quantidade_total_entrada = quantidade_base * quantidade_embalagens
+    except (ValueError, TypeError, AttributeError):
+        raise ValueError('Formato de quantidade nominal inválido')
+    
+    return {
+        'pedido_id': pedido_id,
+        'quantidade_embalagens': quantidade_embalagens,
+        'data_recebimento': data_recebimento,
+        'data_validade': data_validade,
+        'quantidade_base': quantidade_base,
+        'unidade_base': unidade_base,
+        'quantidade_total_entrada': quantidade_total_entrada
+    }
+
+def nova_entrada(data, valores, reagente_id):
+    """Cria a Entrada (sem commit); a quantidade já foi somada por somar_estoque_reagentes."""
+    entrada = Entrada(
+        reagente_id=reagente_id,
+        pedido_id=valores['pedido_id'],
+        quantidade_embalagens=valores['quantidade_embalagens'],
+        data_recebimento=valores['data_recebimento'],
+        data_validade=valores['data_validade'],
+        marca=data['marca'],
+        localizacao=data['localizacao'],
+        quantidade_nominal=data['quantidade_nominal'],
+        quantidade_base=valores['quantidade_base'],
+        unidade_base=valores['unidade_base'],
+        quantidade_restante=valores['quantidade_total_entrada'],
+        usuario_id=session['user_id']
+    )
+    
+    db.session.add(entrada)
+    return entrada
+
+@entrada_bp.route('/entradas', methods=['POST'])
+@login_required
+def create_entrada():
+    data = request.json
+    
+    try:
+        valores = validar_entrada(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     # Verificar se é um pedido preexistente
-    pedido_id = data.get('pedido_id')
-    reagente = None
+    pedido_id = valores['pedido_id']
     
     if pedido_id:
         # Entrada baseada em pedido existente
@@ -47,70 +119,102 @@ def create_entrada():
         if pedido.status == 'concluido':
             return jsonify({'error': 'Este pedido já foi concluído'}), 400
         
-        # Buscar ou criar reagente baseado no pedido
-        reagente = Reagente.query.filter_by(nome=pedido.nome_reagente).first()
-        if not reagente:
-            reagente = Reagente(
-                nome=pedido.nome_reagente,
-                controlado=pedido.controlado,
-                quantidade_total=0.0
-            )
-            db.session.add(reagente)
-            db.session.flush()  # Para obter o ID
+        nome_reagente = pedido.nome_reagente
+        controlado = pedido.controlado
         
         # Marcar pedido como concluído
         pedido.status = 'concluido'
         
     else:
-        # Entrada sem pedido - todos os dados devem ser fornecidos
-        nome_reagente = data.get('nome_reagente')
-        if not nome_reagente:
-            return jsonify({'error': 'nome_reagente é obrigatório quando não há pedido'}), 400
-        
+        nome_reagente = data['nome_reagente']
         controlado = data.get('controlado', False)
-        
-        # Buscar ou criar reagente
-        reagente = Reagente.query.filter_by(nome=nome_reagente).first()
-        if not reagente:
-            reagente = Reagente(
-                nome=nome_reagente,
-                controlado=controlado,
-                quantidade_total=0.0
-            )
-            db.session.add(reagente)
-            db.session.flush()  # Para obter o ID
-    
-    # Calcular quantidade total baseada na quantidade nominal e número de embalagens
-    try:
-        # Extrair número da quantidade nominal (assumindo formato como "500ml", "1L", "250g", etc.)
-        quantidade_str = data['quantidade_nominal']
-        quantidade_numerica = float(''.join(filter(str.isdigit, quantidade_str.replace('.', '').replace(',', '.'))))
-        quantidade_total_entrada = quantidade_numerica * data['quantidade_embalagens']
-    except (ValueError, TypeError):
-        return jsonify({'error': 'Formato de quantidade nominal inválido'}), 400
-    
-    # Criar entrada
-    entrada = Entrada(
-        reagente_id=reagente.id,
-        pedido_id=pedido_id,
-        quantidade_embalagens=data['quantidade_embalagens'],
-        data_recebimento=data_recebimento,
-        data_validade=data_validade,
-        marca=data['marca'],
-        localizacao=data['localizacao'],
-        quantidade_nominal=data['quantidade_nominal'],
-        quantidade_restante=quantidade_total_entrada,
-        usuario_id=session['user_id']
-    )
     
-    # Atualizar quantidade total do reagente
-    reagente.quantidade_total += quantidade_total_entrada
+    # Buscar ou criar reagente e atualizar sua quantidade total, num só comando
+    nome_normalizado = normalizar_nome(nome_reagente)
+    reagente_ids = somar_estoque_reagentes({
+        nome_normalizado: (nome_reagente, controlado, valores['quantidade_total_entrada'])
+    })
     
-    db.session.add(entrada)
+    entrada = nova_entrada(data, valores, reagente_ids[nome_normalizado])
     db.session.commit()
     
     return jsonify(entrada.to_dict()), 201
 
+@entrada_bp.route('/entradas/bulk', methods=['POST'])
+@login_required
+def create_entradas_bulk():
+    """Registra um lote de entradas (ex.: uma entrega inteira) com um único commit.
+
+    Recebe uma lista de entradas no mesmo formato de POST /entradas. Os
+    pedidos do lote são buscados com uma consulta IN, os reagentes são
+    resolvidos (e seus totais somados) com um único upsert, e as entradas
+    vão ao banco num só flush. Itens inválidos são devolvidos em 'erros'
+    (com o índice no lote) sem impedir o registro dos demais.
+    """
+    itens = request.json
+    if not isinstance(itens, list) or not itens:
+        return jsonify({'error': 'Envie uma lista de entradas'}), 400
+    
+    erros = []
+    validos = []
+    for indice, data in enumerate(itens):
+        try:
+            validos.append((indice, data, validar_entrada(data)))
+        except ValueError as e:
+            erros.append({'indice': indice, 'error': str(e)})
+    
+    pedido_ids = {valores['pedido_id'] for _, _, valores in validos if valores['pedido_id']}
+    pedidos = {p.id: p for p in Pedido.query.filter(Pedido.id.in_(pedido_ids))} if pedido_ids else {}
+    
+    # Nome e controle de cada item: do pedido, ou informados diretamente
+    preparados = []
+    for indice, data, valores in validos:
+        pedido_id = valores['pedido_id']
+        if pedido_id:
+            pedido = pedidos.get(pedido_id)
+            if pedido is None:
+                erros.append({'indice': indice, 'error': 'Pedido não encontrado'})
+                continue
+            if pedido.status == 'concluido':
+                # Inclui pedidos já concluídos por um item anterior do mesmo lote
+                erros.append({'indice': indice, 'error': 'Este pedido já foi concluído'})
+                continue
+            pedido.status = 'concluido'
+            preparados.append((indice, data, valores, pedido.nome_reagente, pedido.controlado))
+        else:
+            preparados.append((indice, data, valores, data['nome_reagente'], data.get('controlado', False)))
+    
+    if not preparados:
+        db.session.rollback()
+        erros.sort(key=lambda erro: erro['indice'])
+        return jsonify({'criadas': [], 'erros': erros}), 400
+    
+    # Total recebido por reagente; o primeiro item de cada nome define nome e controle
+    quantidades = {}
+    for _, _, valores, nome_reagente, controlado in preparados:
+        nome_normalizado = normalizar_nome(nome_reagente)
+        nome, controlado, total = quantidades.get(nome_normalizado, (nome_reagente, controlado, 0.0))
+        quantidades[nome_normalizado] = (nome, controlado, total + valores['quantidade_total_entrada'])
+    reagente_ids = somar_estoque_reagentes(quantidades)
+    
+    criadas = [
+        nova_entrada(data, valores, reagente_ids[normalizar_nome(nome_reagente)])
+        for _, data, valores, nome_reagente, _ in preparados
+    ]
+    
+    # Serializa antes do commit, que expiraria os objetos e forçaria um SELECT
+    # por entrada; o reagente de cada uma (reagente_nome) vem no mesmo SELECT
+    db.session.flush()
+    carregadas = {
+        entrada.id: entrada
+        for entrada in com_relacoes(Entrada.query, Entrada).filter(Entrada.id.in_([e.id for e in criadas]))
+    }
+    resultado = [carregadas[entrada.id].to_dict() for entrada in criadas]
+    db.session.commit()
+    
+    erros.sort(key=lambda erro: erro['indice'])
+    return jsonify({'criadas': resultado, 'erros': erros}), 201
+
 @entrada_bp.route('/entradas/<int:entrada_id>', methods=['GET'])
 @login_required
 def get_entrada(entrada_id):
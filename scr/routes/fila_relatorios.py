@@ -0,0 +1,136 @@
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+
+class FilaRelatorios:
+    """Fila de geração de relatórios em segundo plano, dentro do processo.
+
+    Um pool de threads gera cada relatório em um arquivo de `diretorio`,
+    liberando o worker que recebeu a requisição; o cliente acompanha o job
+    pelo id e baixa o arquivo quando ele fica pronto. Pedidos idênticos
+    (mesmo tipo e formato) feitos enquanto um job está na fila recebem o
+    mesmo job; um job executando ou concluído há menos de `validade`
+    segundos só é reaproveitado se foi enviado na mesma versão dos dados.
+
+    O estado de cada job também é gravado em <id>.json ao lado do arquivo,
+    então qualquer processo que use o mesmo diretório consegue informar o
+    status e servir o download. A deduplicação vale dentro de cada processo.
+    """
+
+    def __init__(self, diretorio, gerar, max_workers=2, validade=300, retencao=3600):
+        self.diretorio = diretorio
+        self.gerar = gerar  # gerar(tipo, formato) -> blocos de texto do relatório
+        self.validade = validade
+        self.retencao = retencao
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='relatorio')
+        self._jobs = {}
+        self._por_chave = {}
+        self._lock = threading.Lock()
+        os.makedirs(diretorio, exist_ok=True)
+
+    def enviar(self, tipo, formato, versao=None):
+        """Retorna o job que atende (tipo, formato), criando e enfileirando se preciso.
+
+        `versao` é a versão dos dados no momento do pedido (versao_atual());
+        com None, só um job ainda na fila é reaproveitado.
+        """
+        chave = (tipo, formato)
+        with self._lock:
+            self._limpar()
+            job = self._jobs.get(self._por_chave.get(chave))
+            if job is not None and self._reaproveitavel(job, versao):
+                return dict(job)
+
+            job = {
+                'id': uuid.uuid4().hex,
+                'tipo': tipo,
+                'formato': formato,
+                'versao': versao,
+                'status': 'pendente',
+                'erro': None,
+                'criado_em': time.time(),
+                'concluido_em': None
+            }
+            self._jobs[job['id']] = job
+            self._por_chave[chave] = job['id']
+            self._salvar(job)
+
+        # A thread precisa do app para abrir sessões do banco
+        self._executor.submit(self._executar, current_app._get_current_object(), job)
+        return dict(job)
+
+    def obter(self, job_id):
+        """Estado do job (deste ou de outro processo), ou None se não existir."""
+        with self._lock:
+            if job_id in self._jobs:
+                return dict(self._jobs[job_id])
+        try:
+            uuid.UUID(hex=job_id)  # evita caminhos arbitrários vindos da URL
+            with open(self._caminho(job_id, 'json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            return None
+
+    def caminho_arquivo(self, job):
+        return self._caminho(job['id'], job['formato'])
+
+    def _caminho(self, job_id, extensao):
+        return os.path.join(self.diretorio, f'{job_id}.{extensao}')
+
+    def _reaproveitavel(self, job, versao):
+        if job['status'] == 'pendente':
+            # Ainda não leu nada do banco: vai gerar com os dados atuais
+            return True
+        if versao is None or job['versao'] != versao:
+            # Os dados mudaram depois do envio (ou a versão é desconhecida)
+            return False
+        if job['status'] == 'executando':
+            return True
+        return (job['status'] == 'concluido' and
+                time.time() - job['concluido_em'] < self.validade and
+                os.path.exists(self.caminho_arquivo(job)))
+
+    def _salvar(self, job):
+        temporario = self._caminho(job['id'], 'json.tmp')
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(job, f)
+        os.replace(temporario, self._caminho(job['id'], 'json'))
+
+    def _atualizar(self, job, **campos):
+        with self._lock:
+            job.update(campos)
+            self._salvar(job)
+
+    def _executar(self, app, job):
+        self._atualizar(job, status='executando')
+        caminho = self.caminho_arquivo(job)
+        temporario = caminho + '.tmp'
+        try:
+            with app.app_context():
+                with open(temporario, 'w', encoding='utf-8', newline='') as f:
+                    for bloco in self.gerar(job['tipo'], job['formato']):
+                        f.write(bloco)
+            os.replace(temporario, caminho)
+        except Exception as e:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            self._atualizar(job, status='erro', erro=str(e), concluido_em=time.time())
+        else:
+            self._atualizar(job, status='concluido', concluido_em=time.time())
+
+    def _limpar(self):
+        """Apaga arquivos de jobs deste processo concluídos há mais de `retencao` segundos."""
+        agora = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job['concluido_em'] is None or agora - job['concluido_em'] < self.retencao:
+                continue
+            for caminho in (self.caminho_arquivo(job), self._caminho(job_id, 'json')):
+                if os.path.exists(caminho):
+                    os.remove(caminho)
+            del self._jobs[job_id]
+            if self._por_chave.get((job['tipo'], job['formato'])) == job_id:
+                del self._por_chave[(job['tipo'], job['formato'])]
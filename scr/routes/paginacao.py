@@ -0,0 +1,60 @@
+import base64
+import json
+from flask import jsonify, request
+from sqlalchemy import tuple_
+
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 1000
+
+def codificar_cursor(data, registro_id):
+    """Cursor opaco com a (data, id) do último registro da página."""
+    bruto = json.dumps([data.isoformat(), registro_id]).encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip('=')
+
+def decodificar_cursor(cursor, coluna_data):
+    """Inverso de codificar_cursor; levanta ValueError se o cursor for inválido."""
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data, registro_id = json.loads(bruto)
+        return coluna_data.type.python_type.fromisoformat(data), int(registro_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError('cursor inválido') from e
+
+def resposta_paginada(query, coluna_data, coluna_id):
+    """Lista paginada por keyset em ordem decrescente de (data, id).
+
+    A página seguinte começa logo depois da (data, id) do cursor, então o
+    banco desce direto pelo índice em vez de pular linhas com OFFSET, e o
+    custo não cresce com a profundidade da página. Registros inseridos entre
+    uma página e outra não fazem itens se repetirem ou sumirem.
+
+    Parâmetros: ?limit= (padrão LIMITE_PADRAO, máximo LIMITE_MAXIMO) e
+    ?cursor= (o campo 'next' da resposta anterior).
+    """
+    try:
+        limite = max(1, min(int(request.args.get('limit', LIMITE_PADRAO)), LIMITE_MAXIMO))
+    except ValueError:
+        return jsonify({'error': 'limit deve ser um número inteiro'}), 400
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            data, registro_id = decodificar_cursor(cursor, coluna_data)
+        except ValueError:
+            return jsonify({'error': 'Cursor inválido'}), 400
+        # Comparação de linha: o banco posiciona direto no índice (data, id)
+        query = query.filter(tuple_(coluna_data, coluna_id) < tuple_(data, registro_id))
+
+    # Um registro a mais só para saber se existe próxima página
+    registros = query.order_by(coluna_data.desc(), coluna_id.desc()).limit(limite + 1).all()
+
+    proximo = None
+    if len(registros) > limite:
+        registros = registros[:limite]
+        ultimo = registros[-1]
+        proximo = codificar_cursor(getattr(ultimo, coluna_data.key), getattr(ultimo, coluna_id.key))
+
+    return jsonify({
+        'dados': [registro.to_dict() for registro in registros],
+        'next': proximo
+    })
@@ -1,11 +1,20 @@
 from flask import Blueprint, jsonify, request, session
 from src.models.user import User, db
 from src.models.reagente import Pedido
+from src.models.unidades import converter_quantidade
 from src.routes.user import login_required
+from src.routes.paginacao import resposta_paginada
 from datetime import datetime
 
 pedido_bp = Blueprint('pedido', __name__)
 
+def quantidade_base_pedido(quantidade_nominal):
+    """(valor, unidade base) da quantidade pedida, ou (None, None) se não for reconhecida."""
+    try:
+        return converter_quantidade(quantidade_nominal)
+    except (ValueError, AttributeError):
+        return None, None
+
 @pedido_bp.route('/pedidos', methods=['GET'])
 @login_required
 def get_pedidos():
@@ -16,8 +25,7 @@ def get_pedidos():
     if status:
         query = query.filter_by(status=status)
     
-    pedidos = query.order_by(Pedido.data_pedido.desc()).all()
-    return jsonify([pedido.to_dict() for pedido in pedidos])
+    return resposta_paginada(query, Pedido.data_pedido, Pedido.id)
 
 @pedido_bp.route('/pedidos', methods=['POST'])
 @login_required
@@ -35,11 +43,15 @@ def create_pedido():
     except ValueError:
         return jsonify({'error': 'Formato de data inválido. Use YYYY-MM-DD'}), 400
     
+    quantidade_base, unidade_base = quantidade_base_pedido(data['quantidade_nominal'])
+    
     pedido = Pedido(
         data_pedido=data_pedido,
         nome_reagente=data['nome_reagente'],
         controlado=data.get('controlado', False),
         quantidade_nominal=data['quantidade_nominal'],
+        quantidade_base=quantidade_base,
+        unidade_base=unidade_base,
         usuario_id=session['user_id']
     )
     
@@ -77,6 +89,7 @@ def update_pedido(pedido_id):
     pedido.nome_reagente = data.get('nome_reagente', pedido.nome_reagente)
     pedido.controlado = data.get('controlado', pedido.controlado)
     pedido.quantidade_nominal = data.get('quantidade_nominal', pedido.quantidade_nominal)
+    pedido.quantidade_base, pedido.unidade_base = quantidade_base_pedido(pedido.quantidade_nominal)
     
     db.session.commit()
     return jsonify(pedido.to_dict())
@@ -1,7 +1,18 @@
-from flask import Blueprint, jsonify, request, session
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import date
+from flask import Blueprint, Response, jsonify, request, send_file, session, stream_with_context
+from sqlalchemy.orm import selectinload
 from src.models.user import User, db
-from src.models.reagente import Pedido, Reagente, Entrada, Saida
+from src.models.reagente import Pedido, Reagente, Entrada, Saida, com_relacoes, filtro_nome_reagente
+from src.models.versao_dados import versao_atual
 from src.routes.user import login_required
+from src.routes.paginacao import resposta_paginada
+from src.routes.fila_relatorios import FilaRelatorios
+from src.routes.cache_relatorios import CacheRelatorios
 
 reagente_bp = Blueprint('reagente', __name__)
 
@@ -14,8 +25,13 @@ def buscar_reagentes():
     if not nome:
         return jsonify({'error': 'Nome do reagente é obrigatório'}), 400
     
-    # Buscar reagentes que contenham o nome
-    reagentes = Reagente.query.filter(Reagente.nome.ilike(f'%{nome}%')).all()
+    # Buscar reagentes que contenham o nome, já com entradas e saídas: são três
+    # consultas no total, independente de quantas entradas e saídas existirem.
+    # Entrada.reagente, Saida.reagente e Saida.entrada (usados em to_dict) são
+    # resolvidos pelo identity map da sessão, sem novos SELECTs.
+    reagentes = Reagente.query.filter(filtro_nome_reagente(nome)).options(
+        selectinload(Reagente.entradas).selectinload(Entrada.saidas)
+    ).all()
     
     # Buscar também pedidos que contenham o nome (mesmo que não tenham chegado)
     pedidos_sem_entrada = Pedido.query.filter(
@@ -27,11 +43,8 @@ def buscar_reagentes():
     
     # Adicionar reagentes em estoque
     for reagente in reagentes:
-        entradas = Entrada.query.filter_by(reagente_id=reagente.id).all()
-        
-        for entrada in entradas:
-            saidas = Saida.query.filter_by(entrada_id=entrada.id).all()
-            historico_saidas = [saida.to_dict() for saida in saidas]
+        for entrada in sorted(reagente.entradas, key=lambda e: e.id):
+            historico_saidas = [saida.to_dict() for saida in sorted(entrada.saidas, key=lambda s: s.id)]
             
             item = {
                 'tipo': 'estoque',
@@ -66,57 +79,177 @@ def buscar_reagentes():
 @reagente_bp.route('/reagentes', methods=['GET'])
 @login_required
 def get_reagentes():
-    """Lista todos os reagentes em estoque"""
-    reagentes = Reagente.query.all()
-    return jsonify([reagente.to_dict() for reagente in reagentes])
+    """Lista os reagentes em estoque, paginados pela data de cadastro"""
+    return resposta_paginada(Reagente.query, Reagente.data_criacao, Reagente.id)
+
+TIPOS_RELATORIO = [
+    'pedidos_abertos', 
+    'pedidos_concluidos', 
+    'estoque', 
+    'historico_chegadas', 
+    'historico_saidas'
+]
+
+# Formatos de exportação em streaming: extensão do arquivo e mimetype
+FORMATOS_EXPORTACAO = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+# Linhas lidas do cursor do banco e enviadas ao cliente por vez
+LINHAS_POR_BLOCO = 1000
+
+# Relatórios que crescem com o histórico: por padrão são gerados em segundo plano
+TIPOS_ASSINCRONOS = ('historico_chegadas', 'historico_saidas')
+
+# Relatórios pedidos com frequência e pequenos: respostas JSON ficam em cache
+TIPOS_CACHEADOS = ('estoque', 'pedidos_abertos', 'pedidos_concluidos')
+
+def consulta_relatorio(tipo_relatorio):
+    """Query (ainda não executada) com os registros de um tipo de relatório."""
+    if tipo_relatorio == 'pedidos_abertos':
+        return Pedido.query.filter_by(status='aberto').order_by(Pedido.data_pedido.desc())
+    
+    elif tipo_relatorio == 'pedidos_concluidos':
+        return Pedido.query.filter_by(status='concluido').order_by(Pedido.data_pedido.desc())
+    
+    elif tipo_relatorio == 'estoque':
+        return Reagente.query
+    
+    elif tipo_relatorio == 'historico_chegadas':
+        return com_relacoes(Entrada.query, Entrada).order_by(Entrada.data_recebimento.desc())
+    
+    elif tipo_relatorio == 'historico_saidas':
+        return com_relacoes(Saida.query, Saida).order_by(Saida.data_saida.desc())
+
+def exportar_relatorio(tipo_relatorio, formato):
+    """Gera o relatório em blocos de texto NDJSON ou CSV.
+
+    Os registros vêm do banco em lotes de LINHAS_POR_BLOCO (yield_per usa
+    cursor do lado do servidor no PostgreSQL), e cada bloco é enviado assim
+    que fica pronto, então a memória usada não depende do tamanho do relatório.
+    """
+    buffer = io.StringIO()
+    escritor = None
+    linhas = 0
+    
+    for registro in consulta_relatorio(tipo_relatorio).yield_per(LINHAS_POR_BLOCO):
+        dados = registro.to_dict()
+        if formato == 'csv':
+            if escritor is None:
+                escritor = csv.DictWriter(buffer, fieldnames=list(dados))
+                escritor.writeheader()
+            escritor.writerow(dados)
+        else:
+            buffer.write(json.dumps(dados, ensure_ascii=False))
+            buffer.write('\n')
+        
+        linhas += 1
+        if linhas % LINHAS_POR_BLOCO == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue()
+
+fila_relatorios = FilaRelatorios(
+    os.environ.get('REAGENTES_RELATORIOS_DIR', os.path.join(tempfile.gettempdir(), 'relatorios')),
+    exportar_relatorio
+)
+
+cache_relatorios = CacheRelatorios(int(os.environ.get('REAGENTES_CACHE_RELATORIOS_BYTES', 32 * 1024 * 1024)))
+
+def nome_arquivo_relatorio(tipo_relatorio, formato):
+    return f'relatorio_{tipo_relatorio}_{date.today().isoformat()}.{formato}'
+
+def resposta_job(job):
+    return {
+        'job_id': job['id'],
+        'tipo': job['tipo'],
+        'formato': job['formato'],
+        'status': job['status'],
+        'erro': job['erro'],
+        'url_status': f'/relatorios/jobs/{job["id"]}',
+        'url_download': f'/relatorios/jobs/{job["id"]}/download'
+    }
 
 @reagente_bp.route('/relatorios/gerar', methods=['POST'])
 @login_required
 def gerar_relatorio():
-    """Gera relatório em formato JSON (versão simplificada)"""
+    """Gera relatório em formato JSON, exporta em streaming (NDJSON/CSV) ou enfileira um job
+
+    Os históricos (TIPOS_ASSINCRONOS) e pedidos com "assincrono": true viram
+    um job em segundo plano: a resposta traz o job_id para acompanhar em
+    /relatorios/jobs/<id> e baixar o arquivo quando ficar pronto.
+    """
     data = request.json
     tipo_relatorio = data.get('tipo')
+    formato = data.get('formato')
     
-    tipos_validos = [
-        'pedidos_abertos', 
-        'pedidos_concluidos', 
-        'estoque', 
-        'historico_chegadas', 
-        'historico_saidas'
-    ]
-    
-    if tipo_relatorio not in tipos_validos:
+    if tipo_relatorio not in TIPOS_RELATORIO:
         return jsonify({'error': 'Tipo de relatório inválido'}), 400
     
+    if formato is not None and formato not in FORMATOS_EXPORTACAO:
+        return jsonify({'error': 'Formato inválido. Use ndjson ou csv'}), 400
+    
+    if data.get('assincrono', tipo_relatorio in TIPOS_ASSINCRONOS):
+        job = fila_relatorios.enviar(tipo_relatorio, formato or 'ndjson', versao_atual())
+        return jsonify(resposta_job(job)), 202
+    
+    if formato is not None:
+        nome_arquivo = nome_arquivo_relatorio(tipo_relatorio, formato)
+        return Response(
+            stream_with_context(exportar_relatorio(tipo_relatorio, formato)),
+            mimetype=FORMATOS_EXPORTACAO[formato],
+            headers={'Content-Disposition': f'attachment; filename={nome_arquivo}'}
+        )
+    
     try:
-        # Gerar dados baseado no tipo
-        if tipo_relatorio == 'pedidos_abertos':
-            pedidos = Pedido.query.filter_by(status='aberto').order_by(Pedido.data_pedido.desc()).all()
-            dados = [pedido.to_dict() for pedido in pedidos]
-            
-        elif tipo_relatorio == 'pedidos_concluidos':
-            pedidos = Pedido.query.filter_by(status='concluido').order_by(Pedido.data_pedido.desc()).all()
-            dados = [pedido.to_dict() for pedido in pedidos]
-        
-        elif tipo_relatorio == 'estoque':
-            reagentes = Reagente.query.all()
-            dados = [reagente.to_dict() for reagente in reagentes]
-        
-        elif tipo_relatorio == 'historico_chegadas':
-            entradas = Entrada.query.order_by(Entrada.data_recebimento.desc()).all()
-            dados = [entrada.to_dict() for entrada in entradas]
+        # Reaproveita o corpo já serializado enquanto os dados não mudarem
+        versao = versao_atual() if tipo_relatorio in TIPOS_CACHEADOS else None
+        if versao is not None:
+            corpo = cache_relatorios.obter(tipo_relatorio, versao)
+            if corpo is not None:
+                return Response(corpo, mimetype='application/json')
         
-        elif tipo_relatorio == 'historico_saidas':
-            saidas = Saida.query.order_by(Saida.data_saida.desc()).all()
-            dados = [saida.to_dict() for saida in saidas]
+        dados = [registro.to_dict() for registro in consulta_relatorio(tipo_relatorio).all()]
         
-        return jsonify({
+        resposta = jsonify({
             'tipo': tipo_relatorio,
             'dados': dados,
             'total': len(dados),
             'message': 'Relatório gerado com sucesso (formato JSON)'
         })
+        if versao is not None:
+            cache_relatorios.guardar(tipo_relatorio, versao, resposta.get_data())
+        return resposta
     
     except Exception as e:
         return jsonify({'error': f'Erro ao gerar relatório: {str(e)}'}), 500
 
+@reagente_bp.route('/relatorios/jobs/<job_id>', methods=['GET'])
+@login_required
+def status_relatorio(job_id):
+    """Estado de um relatório gerado em segundo plano"""
+    job = fila_relatorios.obter(job_id)
+    if job is None:
+        return jsonify({'error': 'Job não encontrado'}), 404
+    return jsonify(resposta_job(job))
+
+@reagente_bp.route('/relatorios/jobs/<job_id>/download', methods=['GET'])
+@login_required
+def download_relatorio(job_id):
+    """Arquivo de um relatório gerado em segundo plano"""
+    job = fila_relatorios.obter(job_id)
+    if job is None:
+        return jsonify({'error': 'Job não encontrado'}), 404
+    if job['status'] != 'concluido':
+        return jsonify(resposta_job(job)), 409
+    
+    return send_file(
+        fila_relatorios.caminho_arquivo(job),
+        mimetype=FORMATOS_EXPORTACAO[job['formato']],
+        as_attachment=True,
+        download_name=nome_arquivo_relatorio(job['tipo'], job['formato'])
+    )
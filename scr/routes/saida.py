@@ -1,7 +1,10 @@
+import math
 from flask import Blueprint, jsonify, request, session
+from sqlalchemy import update
 from src.models.user import User, db
-from src.models.reagente import Reagente, Entrada, Saida
+from src.models.reagente import Reagente, Entrada, Saida, com_relacoes, filtro_nome_reagente
 from src.routes.user import login_required
+from src.routes.paginacao import resposta_paginada
 from datetime import datetime
 
 saida_bp = Blueprint('saida', __name__)
@@ -9,8 +12,8 @@ saida_bp = Blueprint('saida', __name__)
 @saida_bp.route('/saidas', methods=['GET'])
 @login_required
 def get_saidas():
-    saidas = Saida.query.order_by(Saida.data_saida.desc()).all()
-    return jsonify([saida.to_dict() for saida in saidas])
+    query = com_relacoes(Saida.query, Saida)
+    return resposta_paginada(query, Saida.data_saida, Saida.id)
 
 @saida_bp.route('/reagentes/buscar', methods=['GET'])
 @login_required
@@ -22,7 +25,7 @@ def buscar_reagentes_para_saida():
         return jsonify({'error': 'Nome do reagente é obrigatório'}), 400
     
     # Buscar reagentes que contenham o nome
-    reagentes = Reagente.query.filter(Reagente.nome.ilike(f'%{nome}%')).all()
+    reagentes = Reagente.query.filter(filtro_nome_reagente(nome)).all()
     
     if not reagentes:
         return jsonify({'message': 'Nenhum reagente encontrado com esse nome'}), 404
@@ -53,35 +56,88 @@ def buscar_reagentes_para_saida():
     
     return jsonify(resultado)
 
-@saida_bp.route('/saidas', methods=['POST'])
-@login_required
-def create_saida():
-    data = request.json
+def validar_saida(data):
+    """Valida os campos de uma saída; devolve (entrada_id, data_saida, quantidade_abatida).
+
+    Levanta ValueError com a mensagem de erro para o cliente.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Saída deve ser um objeto JSON')
     
     # Validações
     required_fields = ['entrada_id', 'quantidade_abatida', 'data_saida']
     for field in required_fields:
         if not data.get(field):
-            return jsonify({'error': f'{field} é obrigatório'}), 400
+            raise ValueError(f'{field} é obrigatório')
+    
+    # Aceita o ID como número ou texto ("2"), como o get_or_404 de create_saida
+    try:
+        entrada_id = int(data['entrada_id'])
+    except (ValueError, TypeError):
+        raise ValueError('entrada_id inválido')
     
     try:
         data_saida = datetime.strptime(data['data_saida'], '%Y-%m-%d').date()
-    except ValueError:
-        return jsonify({'error': 'Formato de data inválido. Use YYYY-MM-DD'}), 400
+    except (ValueError, TypeError):
+        raise ValueError('Formato de data inválido. Use YYYY-MM-DD')
     
-    quantidade_abatida = float(data['quantidade_abatida'])
+    try:
+        quantidade_abatida = float(data['quantidade_abatida'])
+    except (ValueError, TypeError):
+        raise ValueError('Quantidade inválida')
+    if not math.isfinite(quantidade_abatida):
+        # "nan" e "inf" passariam pelas comparações abaixo
+        raise ValueError('Quantidade inválida')
     if quantidade_abatida <= 0:
-        return jsonify({'error': 'Quantidade deve ser maior que zero'}), 400
+        raise ValueError('Quantidade deve ser maior que zero')
+    
+    return entrada_id, data_saida, quantidade_abatida
+
+@saida_bp.route('/saidas', methods=['POST'])
+@login_required
+def create_saida():
+    data = request.json
+    
+    try:
+        entrada_id, data_saida, quantidade_abatida = validar_saida(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     # Buscar entrada
-    entrada = Entrada.query.get_or_404(data['entrada_id'])
+    entrada = Entrada.query.get_or_404(entrada_id)
     
-    # Verificar se há quantidade suficiente
-    if quantidade_abatida > entrada.quantidade_restante:
+    # Abater com UPDATE condicional: a verificação de saldo e o abatimento são
+    # um único comando no banco, então saídas simultâneas não ultrapassam o
+    # estoque nem perdem atualizações. As linhas da entrada e do reagente
+    # ficam travadas até o commit logo abaixo; são sempre atualizadas nessa
+    # ordem (entrada, depois reagente), o que evita deadlock entre saídas.
+    abatimento_entrada = db.session.execute(
+        update(Entrada)
+        .where(Entrada.id == entrada.id, Entrada.quantidade_restante >= quantidade_abatida)
+        .values(quantidade_restante=Entrada.quantidade_restante - quantidade_abatida)
+        .execution_options(synchronize_session=False)
+    )
+    if abatimento_entrada.rowcount != 1:
+        db.session.rollback()
+        disponivel = db.session.get(Entrada, entrada.id).quantidade_restante
         return jsonify({
-            'error': f'Quantidade insuficiente. Disponível: {entrada.quantidade_restante}'
+            'error': f'Quantidade insuficiente. Disponível: {disponivel}'
         }), 400
     
+    abatimento_reagente = db.session.execute(
+        update(Reagente)
+        .where(Reagente.id == entrada.reagente_id, Reagente.quantidade_total >= quantidade_abatida)
+        .values(quantidade_total=Reagente.quantidade_total - quantidade_abatida)
+        .execution_options(synchronize_session=False)
+    )
+    if abatimento_reagente.rowcount != 1:
+        # A entrada tinha saldo, mas o total do reagente é menor que ele: os
+        # dois estão inconsistentes e a saída não é registrada
+        db.session.rollback()
+        return jsonify({
+            'error': 'Estoque do reagente inconsistente com o saldo da entrada. Contate o administrador.'
+        }), 409
+    
     # Criar saída
     saida = Saida(
         reagente_id=entrada.reagente_id,
@@ -92,18 +148,92 @@ def create_saida():
         observacoes=data.get('observacoes', '')
     )
     
-    # Atualizar quantidade restante na entrada
-    entrada.quantidade_restante -= quantidade_abatida
-    
-    # Atualizar quantidade total do reagente
-    reagente = entrada.reagente
-    reagente.quantidade_total -= quantidade_abatida
-    
     db.session.add(saida)
     db.session.commit()
     
     return jsonify(saida.to_dict()), 201
 
+@saida_bp.route('/saidas/bulk', methods=['POST'])
+@login_required
+def create_saidas_bulk():
+    """Registra um lote de saídas (ex.: o consumo do dia) com um único commit.
+
+    As entradas do lote são buscadas com uma consulta IN e os saldos são
+    conferidos item a item, na ordem do lote; itens inválidos ou sem saldo
+    vão para 'erros' sem impedir os demais. O abatimento usa um UPDATE
+    condicional por entrada e por reagente com o total aceito, como em
+    create_saida. Se outra operação consumiu o estoque entre a leitura e o
+    abatimento, o lote inteiro é desfeito (409) e pode ser reenviado.
+    """
+    itens = request.json
+    if not isinstance(itens, list) or not itens:
+        return jsonify({'error': 'Envie uma lista de saídas'}), 400
+    
+    erros = []
+    validos = []
+    for indice, data in enumerate(itens):
+        try:
+            validos.append((indice, data) + validar_saida(data))
+        except ValueError as e:
+            erros.append({'indice': indice, 'error': str(e)})
+    
+    entrada_ids = {entrada_id for _, _, entrada_id, _, _ in validos}
+    entradas = {e.id: e for e in com_relacoes(Entrada.query, Entrada).filter(Entrada.id.in_(entrada_ids))} if entrada_ids else {}
+    
+    saldos = {entrada_id: entrada.quantidade_restante for entrada_id, entrada in entradas.items()}
+    abatido_entrada = {}
+    abatido_reagente = {}
+    saidas = []
+    for indice, data, entrada_id, data_saida, quantidade_abatida in validos:
+        entrada = entradas.get(entrada_id)
+        if entrada is None:
+            erros.append({'indice': indice, 'error': 'Entrada não encontrada'})
+            continue
+        if quantidade_abatida > saldos[entrada.id]:
+            erros.append({'indice': indice, 'error': f'Quantidade insuficiente. Disponível: {saldos[entrada.id]}'})
+            continue
+        
+        saldos[entrada.id] -= quantidade_abatida
+        abatido_entrada[entrada.id] = abatido_entrada.get(entrada.id, 0) + quantidade_abatida
+        abatido_reagente[entrada.reagente_id] = abatido_reagente.get(entrada.reagente_id, 0) + quantidade_abatida
+        saidas.append(Saida(
+            reagente_id=entrada.reagente_id,
+            entrada_id=entrada.id,
+            quantidade_abatida=quantidade_abatida,
+            data_saida=data_saida,
+            usuario_id=session['user_id'],
+            observacoes=data.get('observacoes', '')
+        ))
+    
+    erros.sort(key=lambda erro: erro['indice'])
+    if not saidas:
+        return jsonify({'criadas': [], 'erros': erros}), 400
+    
+    # Entradas antes de reagentes e em ordem de ID: lotes concorrentes travam
+    # as linhas sempre na mesma ordem e não entram em deadlock
+    abatimentos = [(Entrada, Entrada.quantidade_restante, entrada_id, total)
+                   for entrada_id, total in sorted(abatido_entrada.items())]
+    abatimentos += [(Reagente, Reagente.quantidade_total, reagente_id, total)
+                    for reagente_id, total in sorted(abatido_reagente.items())]
+    for modelo, coluna, registro_id, total in abatimentos:
+        resultado = db.session.execute(
+            update(modelo)
+            .where(modelo.id == registro_id, coluna >= total)
+            .values({coluna: coluna - total})
+            .execution_options(synchronize_session=False)
+        )
+        if resultado.rowcount != 1:
+            db.session.rollback()
+            return jsonify({'error': 'O estoque foi alterado por outra operação durante o lote. Envie novamente.'}), 409
+    
+    db.session.add_all(saidas)
+    # Serializa antes do commit, que expiraria os objetos e forçaria um SELECT por saída
+    db.session.flush()
+    resultado = [saida.to_dict() for saida in saidas]
+    db.session.commit()
+    
+    return jsonify({'criadas': resultado, 'erros': erros}), 201
+
 @saida_bp.route('/saidas/<int:saida_id>', methods=['GET'])
 @login_required
 def get_saida(saida_id):
@@ -143,12 +273,20 @@ def delete_saida(saida_id):
     if not user.is_admin() and saida.usuario_id != session['user_id']:
         return jsonify({'error': 'Você só pode deletar suas próprias saídas'}), 403
     
-    # Reverter as quantidades
-    entrada = saida.entrada
-    entrada.quantidade_restante += saida.quantidade_abatida
-    
-    reagente = saida.reagente
-    reagente.quantidade_total += saida.quantidade_abatida
+    # Reverter as quantidades no banco (sem ler-modificar-gravar), na mesma
+    # ordem de create_saida: entrada e depois reagente
+    db.session.execute(
+        update(Entrada)
+        .where(Entrada.id == saida.entrada_id)
+        .values(quantidade_restante=Entrada.quantidade_restante + saida.quantidade_abatida)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.execute(
+        update(Reagente)
+        .where(Reagente.id == saida.reagente_id)
+        .values(quantidade_total=Reagente.quantidade_total + saida.quantidade_abatida)
+        .execution_options(synchronize_session=False)
+    )
     
     db.session.delete(saida)
     db.session.commit()
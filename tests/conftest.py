@@ -0,0 +1,92 @@
+import datetime
+import importlib
+import os
+import sys
+
+import pytest
+from flask import Flask
+
+# app.py e persistencia.py ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Os módulos de scr/ se importam como src.* (nome do pacote no deploy) e
+# pegam login_required de src.routes.user, que aqui é scr/routes/user_routes.py
+if 'src' not in sys.modules:
+    sys.modules['src'] = importlib.import_module('scr')
+    sys.modules['src.routes.user'] = importlib.import_module('src.routes.user_routes')
+
+@pytest.fixture
+def app_sql(tmp_path, monkeypatch):
+    """App Flask com os blueprints de scr/ num SQLite novo, já migrado, com o usuário 1."""
+    from src.models.user import User, db
+    from src.models.migracoes import aplicar_migracoes
+    from src.routes import reagente_simple
+    from src.routes.cache_relatorios import CacheRelatorios
+    from src.routes.reagente_simple import reagente_bp
+    from src.routes.entrada import entrada_bp
+    from src.routes.saida import saida_bp
+    from src.routes.pedido import pedido_bp
+    
+    flask_app = Flask(__name__)
+    flask_app.config.update(
+        SECRET_KEY='teste',
+        SQLALCHEMY_DATABASE_URI='sqlite:///' + str(tmp_path / 'reagentes.db'),
+        # Arquivo (e não :memory:) para que threads de teste usem conexões próprias
+        SQLALCHEMY_ENGINE_OPTIONS={'connect_args': {'timeout': 30, 'check_same_thread': False}}
+    )
+    db.init_app(flask_app)
+    # Cada banco de teste recomeça a versão dos dados do zero: o cache não
+    # pode trazer corpos guardados por outro teste com a mesma versão
+    monkeypatch.setattr(reagente_simple, 'cache_relatorios', CacheRelatorios(1024 * 1024))
+    for blueprint in (reagente_bp, entrada_bp, saida_bp, pedido_bp):
+        flask_app.register_blueprint(blueprint)
+    
+    with flask_app.app_context():
+        db.create_all()
+        aplicar_migracoes(db.engine)
+        db.session.add(User(username='teste', email='teste@feq.unicamp.br', password_hash='x'))
+        db.session.commit()
+        yield flask_app
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture
+def cliente_sql(app_sql):
+    cliente = app_sql.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao['user_id'] = 1
+    return cliente
+
+@pytest.fixture
+def povoar(app_sql):
+    """povoar(reagentes, entradas_por_reagente, saidas_por_entrada, quantidade=100.0)
+
+    Cria 'Acido N' com entradas de `quantidade` e saídas de 1 cada,
+    mantendo quantidade_restante e quantidade_total coerentes.
+    """
+    from src.models.user import db
+    from src.models.reagente import Reagente, Entrada, Saida
+    
+    def criar(n_reagentes, entradas_por_reagente, saidas_por_entrada, quantidade=100.0):
+        dia = datetime.date(2024, 1, 1)
+        restante = quantidade - saidas_por_entrada
+        for n in range(n_reagentes):
+            reagente = Reagente(nome=f'Acido {n}', quantidade_total=restante * entradas_por_reagente)
+            db.session.add(reagente)
+            db.session.flush()
+            for i in range(entradas_por_reagente):
+                entrada = Entrada(
+                    reagente_id=reagente.id, quantidade_embalagens=1, data_recebimento=dia,
+                    marca='Marca', localizacao='Armário', quantidade_nominal=f'{quantidade:g}ml',
+                    quantidade_restante=restante, usuario_id=1
+                )
+                db.session.add(entrada)
+                db.session.flush()
+                db.session.add_all(
+                    Saida(reagente_id=reagente.id, entrada_id=entrada.id, quantidade_abatida=1,
+                          data_saida=dia + datetime.timedelta(days=k), usuario_id=1)
+                    for k in range(saidas_por_entrada)
+                )
+        db.session.commit()
+    
+    return criar
@@ -0,0 +1,121 @@
+import pytest
+from sqlalchemy import event, update
+
+from src.models.reagente import Reagente
+from src.models.user import db
+from src.models.versao_dados import versao_atual
+
+ENTRADA = {
+    'nome_reagente': 'Etanol',
+    'quantidade_embalagens': 2,
+    'data_recebimento': '2024-03-01',
+    'marca': 'Synth',
+    'localizacao': 'Armário A',
+    'quantidade_nominal': '1L'
+}
+PEDIDO = {'data_pedido': '2024-03-01', 'nome_reagente': 'Acetona', 'quantidade_nominal': '500ml'}
+
+def relatorio(cliente, tipo):
+    resposta = cliente.post('/relatorios/gerar', json={'tipo': tipo})
+    assert resposta.status_code == 200
+    return resposta.json['dados']
+
+def estoque(cliente):
+    return {r['nome']: r['quantidade_total'] for r in relatorio(cliente, 'estoque')}
+
+def nomes_pedidos_abertos(cliente):
+    return sorted(p['nome_reagente'] for p in relatorio(cliente, 'pedidos_abertos'))
+
+@pytest.fixture
+def com_entrada(cliente_sql):
+    assert cliente_sql.post('/entradas', json=ENTRADA).status_code == 201
+    return cliente_sql
+
+def test_relatorio_repetido_vem_do_cache(com_entrada):
+    assert estoque(com_entrada) == {'Etanol': 2000}
+    versao = versao_atual()
+    assert estoque(com_entrada) == {'Etanol': 2000}
+    assert versao_atual() == versao
+
+def test_criar_entrada_invalida_estoque(com_entrada):
+    assert estoque(com_entrada) == {'Etanol': 2000}
+    assert com_entrada.post('/entradas', json=ENTRADA).status_code == 201
+    assert estoque(com_entrada) == {'Etanol': 4000}
+
+def test_alterar_entrada_muda_a_versao(com_entrada):
+    versao = versao_atual()
+    assert com_entrada.put('/entradas/1', json={'marca': 'Vetec'}).status_code == 200
+    assert versao_atual() > versao
+
+def test_excluir_entrada_invalida_estoque(com_entrada):
+    assert estoque(com_entrada) == {'Etanol': 2000}
+    assert com_entrada.delete('/entradas/1').status_code == 204
+    assert estoque(com_entrada) == {'Etanol': 0}
+
+def test_criar_e_excluir_saida_invalidam_estoque(com_entrada):
+    assert estoque(com_entrada) == {'Etanol': 2000}
+    resposta = com_entrada.post('/saidas', json={'entrada_id': 1, 'quantidade_abatida': 250, 'data_saida': '2024-03-02'})
+    assert resposta.status_code == 201
+    assert estoque(com_entrada) == {'Etanol': 1750}
+    
+    assert com_entrada.put(f'/saidas/{resposta.json["id"]}', json={'observacoes': 'aula'}).status_code == 200
+    assert com_entrada.delete(f'/saidas/{resposta.json["id"]}').status_code == 204
+    assert estoque(com_entrada) == {'Etanol': 2000}
+
+def test_saidas_em_lote_invalidam_estoque(com_entrada):
+    assert estoque(com_entrada) == {'Etanol': 2000}
+    saida = {'entrada_id': 1, 'quantidade_abatida': 100, 'data_saida': '2024-03-02'}
+    assert com_entrada.post('/saidas/bulk', json=[saida, saida]).status_code == 201
+    assert estoque(com_entrada) == {'Etanol': 1800}
+
+def test_pedidos_criados_alterados_e_excluidos_invalidam_relatorio(cliente_sql):
+    assert nomes_pedidos_abertos(cliente_sql) == []
+    pedido_id = cliente_sql.post('/pedidos', json=PEDIDO).json['id']
+    assert nomes_pedidos_abertos(cliente_sql) == ['Acetona']
+    
+    assert cliente_sql.put(f'/pedidos/{pedido_id}', json={'nome_reagente': 'Metanol'}).status_code == 200
+    assert nomes_pedidos_abertos(cliente_sql) == ['Metanol']
+    
+    assert cliente_sql.delete(f'/pedidos/{pedido_id}').status_code == 204
+    assert nomes_pedidos_abertos(cliente_sql) == []
+
+def test_pedido_atendido_por_entrada_sai_dos_abertos(cliente_sql):
+    pedido_id = cliente_sql.post('/pedidos', json=PEDIDO).json['id']
+    assert nomes_pedidos_abertos(cliente_sql) == ['Acetona']
+    entrada = {k: v for k, v in ENTRADA.items() if k != 'nome_reagente'}
+    assert cliente_sql.post('/entradas', json=dict(entrada, pedido_id=pedido_id)).status_code == 201
+    assert nomes_pedidos_abertos(cliente_sql) == []
+
+def test_update_do_core_sem_objetos_do_orm_invalida_estoque(com_entrada):
+    assert estoque(com_entrada) == {'Etanol': 2000}
+    db.session.execute(
+        update(Reagente).values(quantidade_total=Reagente.quantidade_total + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    assert estoque(com_entrada) == {'Etanol': 2001}
+
+def test_rollback_nao_muda_a_versao(com_entrada):
+    versao = versao_atual()
+    db.session.execute(update(Reagente).values(quantidade_total=0).execution_options(synchronize_session=False))
+    db.session.rollback()
+    db.session.commit()
+    assert versao_atual() == versao
+
+def test_incremento_da_versao_nao_pega_segunda_conexao_do_pool(cliente_sql):
+    # Com uma conexão pedida ao pool enquanto a da sessão ainda está em uso,
+    # N threads gravando ao mesmo tempo precisariam de 2N conexões
+    em_uso = []
+    
+    def ao_pegar(*args):
+        em_uso.append(db.engine.pool.checkedout())
+    
+    event.listen(db.engine.pool, 'checkout', ao_pegar)
+    try:
+        versao = versao_atual()
+        assert cliente_sql.post('/pedidos', json=PEDIDO).status_code == 201
+    finally:
+        event.remove(db.engine.pool, 'checkout', ao_pegar)
+    
+    assert versao_atual() == versao + 1
+    assert max(em_uso) == 1
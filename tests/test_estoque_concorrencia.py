@@ -0,0 +1,117 @@
+import sys
+import threading
+from collections import Counter
+
+import pytest
+
+import app
+
+THREADS = 8
+OPERACOES_POR_THREAD = 60
+LOTES = [(f'Reagente Concorrência {n}', 'Marca', '1L') for n in range(4)]
+EMBALAGENS_INICIAIS = 40
+
+@pytest.fixture
+def estado_app():
+    estado = app.exportar_estado()
+    intervalo = sys.getswitchinterval()
+    # Troca de thread frequente para intercalar as operações o máximo possível
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(intervalo)
+    app.restaurar_estado(estado)
+
+def cliente_admin():
+    cliente = app.app.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao['logged_in'] = True
+        sessao['user_id'] = 1
+    return cliente
+
+def registrar_entrada(cliente, nome, marca, volume, quantidade):
+    resposta = cliente.post('/entrada-reagente', data={
+        'data_chegada': '2024-09-01',
+        'pedido_feito': 'Não',
+        'nome_reagente_manual': nome,
+        'marca': marca,
+        'volume_nominal': volume,
+        'quantidade_embalagens': quantidade,
+        'localizacao': 'Armário T',
+        'controlado': 'Não'
+    })
+    assert 'Entrada Registrada' in resposta.get_data(as_text=True)
+
+def registrar_saida(cliente, nome, marca, volume, quantidade):
+    resposta = cliente.post('/saida-reagente', data={
+        'nome_reagente': nome,
+        'marca': marca,
+        'volume_nominal': volume,
+        'quantidade': quantidade
+    })
+    return 'Saída Registrada' in resposta.get_data(as_text=True)
+
+def test_entradas_e_saidas_simultaneas_mantem_estoque_consistente(estado_app):
+    cliente = cliente_admin()
+    for nome, marca, volume in LOTES:
+        registrar_entrada(cliente, nome, marca, volume, EMBALAGENS_INICIAIS)
+    
+    adicionado = Counter()
+    retirado = Counter()
+    novos = []
+    trava_contagem = threading.Lock()
+    erros = []
+
+    def trabalhar(numero):
+        cliente = cliente_admin()
+        try:
+            for i in range(OPERACOES_POR_THREAD):
+                lote = LOTES[(numero + i) % len(LOTES)]
+                if i % 3 == 0:
+                    registrar_entrada(cliente, *lote, 2)
+                    with trava_contagem:
+                        adicionado[lote] += 2
+                elif registrar_saida(cliente, *lote, 3):
+                    with trava_contagem:
+                        retirado[lote] += 3
+                # Lote novo a cada operação: inserções simultâneas em travas de lote diferentes
+                novo = (f'Novo {numero}-{i}', 'Marca', '500ml')
+                registrar_entrada(cliente, *novo, 1)
+                with trava_contagem:
+                    novos.append(novo)
+        except Exception as e:  # repassado à thread principal
+            erros.append(e)
+
+    threads = [threading.Thread(target=trabalhar, args=(n,)) for n in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not erros
+
+    for lote in LOTES:
+        esperado = EMBALAGENS_INICIAIS + adicionado[lote] - retirado[lote]
+        reagente = app.estoque.buscar(*lote)
+        if esperado == 0:
+            assert reagente is None  # lote zerado é removido
+        else:
+            assert reagente['quantidade_embalagens'] == esperado
+        assert esperado >= 0
+    assert sum(retirado.values()) > 0
+    
+    for novo in novos:
+        assert app.estoque.buscar(*novo)['quantidade_embalagens'] == 1
+    
+    assert app.estoque.total_embalagens == sum(r['quantidade_embalagens'] for r in app.reagentes_data)
+    assert app.estoque.resumo()['total_itens'] == len(app.reagentes_data)
+    
+    # IDs únicos e lista em ordem de ID, da qual a paginação por cursor depende
+    ids = [r['id'] for r in app.reagentes_data]
+    assert ids == sorted(set(ids))
+    paginados = []
+    cursor = 0
+    while True:
+        pagina, cursor = app.pagina_por_cursor(app.reagentes_data, cursor, 50)
+        paginados += [r['id'] for r in pagina]
+        if cursor is None:
+            break
+    assert paginados == ids
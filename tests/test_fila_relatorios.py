@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from src.routes import reagente_simple
+from src.routes.fila_relatorios import FilaRelatorios
+
+def esperar(fila, job_id, timeout=10):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        job = fila.obter(job_id)
+        if job['status'] in ('concluido', 'erro'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f'job {job_id} não terminou')
+
+@pytest.fixture
+def contexto():
+    with Flask(__name__).app_context():
+        yield
+
+@pytest.fixture
+def fila(tmp_path, contexto):
+    gerados = []
+    
+    def gerar(tipo, formato):
+        gerados.append((tipo, formato))
+        yield f'{tipo} {len(gerados)}\n'
+    
+    fila = FilaRelatorios(str(tmp_path), gerar, max_workers=1)
+    fila.gerados = gerados
+    return fila
+
+def test_job_concluido_e_reaproveitado_na_mesma_versao(fila):
+    primeiro = fila.enviar('estoque', 'ndjson', 7)
+    esperar(fila, primeiro['id'])
+    
+    assert fila.enviar('estoque', 'ndjson', 7)['id'] == primeiro['id']
+    assert len(fila.gerados) == 1
+
+def test_job_concluido_nao_e_reaproveitado_depois_de_alteracao(fila):
+    primeiro = fila.enviar('estoque', 'ndjson', 7)
+    esperar(fila, primeiro['id'])
+    
+    segundo = fila.enviar('estoque', 'ndjson', 8)
+    assert segundo['id'] != primeiro['id']
+    esperar(fila, segundo['id'])
+    with open(fila.caminho_arquivo(segundo), encoding='utf-8') as f:
+        assert f.read() == 'estoque 2\n'
+
+def test_sem_versao_nao_reaproveita_job_concluido(fila):
+    primeiro = fila.enviar('estoque', 'ndjson')
+    esperar(fila, primeiro['id'])
+    
+    assert fila.enviar('estoque', 'ndjson')['id'] != primeiro['id']
+
+def test_job_executando_so_e_reaproveitado_na_mesma_versao(tmp_path, contexto):
+    liberar = threading.Event()
+    
+    def gerar(tipo, formato):
+        liberar.wait(10)
+        yield 'x\n'
+    
+    fila = FilaRelatorios(str(tmp_path), gerar, max_workers=2)
+    try:
+        job = fila.enviar('historico_saidas', 'csv', 3)
+        while fila.obter(job['id'])['status'] != 'executando':
+            time.sleep(0.01)
+        
+        assert fila.enviar('historico_saidas', 'csv', 3)['id'] == job['id']
+        assert fila.enviar('historico_saidas', 'csv', 4)['id'] != job['id']
+    finally:
+        liberar.set()
+
+def test_relatorio_assincrono_reflete_entrada_nova(cliente_sql, tmp_path, monkeypatch):
+    fila = FilaRelatorios(str(tmp_path / 'relatorios'), reagente_simple.exportar_relatorio)
+    monkeypatch.setattr(reagente_simple, 'fila_relatorios', fila)
+    entrada = {
+        'nome_reagente': 'Etanol', 'quantidade_embalagens': 1, 'data_recebimento': '2024-03-01',
+        'marca': 'Synth', 'localizacao': 'Armário A', 'quantidade_nominal': '1L'
+    }
+    pedido = {'tipo': 'estoque', 'assincrono': True}
+    
+    def baixar():
+        job = cliente_sql.post('/relatorios/gerar', json=pedido).json
+        esperar(fila, job['job_id'])
+        return job['job_id'], cliente_sql.get(job['url_download']).get_data(as_text=True)
+    
+    assert cliente_sql.post('/entradas', json=entrada).status_code == 201
+    primeiro, corpo = baixar()
+    assert '"quantidade_total": 1000' in corpo
+    assert baixar()[0] == primeiro
+    
+    assert cliente_sql.post('/entradas', json=entrada).status_code == 201
+    segundo, corpo = baixar()
+    assert segundo != primeiro
+    assert '"quantidade_total": 2000' in corpo
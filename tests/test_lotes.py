@@ -0,0 +1,49 @@
+from src.models.reagente import Reagente, Entrada, Saida
+
+ENTRADA = {
+    'nome_reagente': 'Etanol',
+    'quantidade_embalagens': 2,
+    'data_recebimento': '2024-03-01',
+    'marca': 'Synth',
+    'localizacao': 'Armário A',
+    'quantidade_nominal': '1L'
+}
+
+def test_entradas_bulk_recusa_itens_invalidos_sem_perder_os_validos(cliente_sql):
+    lote = [
+        ENTRADA,
+        dict(ENTRADA, data_recebimento=5),
+        dict(ENTRADA, data_validade=['2025-01-01']),
+        dict(ENTRADA, quantidade_embalagens=-3),
+        dict(ENTRADA, quantidade_embalagens='muitas'),
+        dict(ENTRADA, quantidade_embalagens=2.5),
+        dict(ENTRADA, pedido_id=[1]),
+        dict(ENTRADA, quantidade_embalagens='3'),
+    ]
+    resposta = cliente_sql.post('/entradas/bulk', json=lote)
+    
+    assert resposta.status_code == 201
+    assert [e['quantidade_embalagens'] for e in resposta.json['criadas']] == [2, 3]
+    assert [e['indice'] for e in resposta.json['erros']] == [1, 2, 3, 4, 5, 6]
+    assert 'quantidade_embalagens' in resposta.json['erros'][2]['error']
+    assert Reagente.query.one().quantidade_total == 5000
+
+def test_saidas_bulk_recusa_itens_invalidos_sem_perder_os_validos(cliente_sql, povoar):
+    povoar(1, 1, 0, quantidade=100)
+    saida = {'entrada_id': 1, 'quantidade_abatida': 10, 'data_saida': '2024-03-02'}
+    lote = [
+        saida,
+        dict(saida, data_saida=5),
+        dict(saida, quantidade_abatida='nan'),
+        dict(saida, quantidade_abatida='inf'),
+        dict(saida, entrada_id={'id': 1}),
+        dict(saida, entrada_id='1'),
+    ]
+    resposta = cliente_sql.post('/saidas/bulk', json=lote)
+    
+    assert resposta.status_code == 201
+    assert len(resposta.json['criadas']) == 2
+    assert [e['indice'] for e in resposta.json['erros']] == [1, 2, 3, 4]
+    assert Entrada.query.one().quantidade_restante == 80
+    assert Reagente.query.one().quantidade_total == 80
+    assert Saida.query.count() == 2
@@ -0,0 +1,118 @@
+from sqlalchemy import create_engine, text
+
+from src.models import migracoes
+from src.models.reagente import Pedido, Reagente, Entrada, Saida, filtro_nome_reagente
+from src.models.user import db
+
+def plano(consulta):
+    """Linhas do EXPLAIN QUERY PLAN do SQLite para uma query do ORM."""
+    compilado = consulta.statement.compile(db.engine)
+    parametros = tuple(compilado.params[nome] for nome in compilado.positiontup)
+    linhas = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compilado), parametros)
+    return [linha[-1] for linha in linhas]
+
+def test_migracoes_ja_aplicadas_nao_rodam_de_novo(app_sql):
+    assert migracoes.aplicar_migracoes(db.engine) == []
+
+def test_entradas_disponiveis_do_reagente_usam_indice_parcial(app_sql, povoar):
+    povoar(20, 5, 2)
+    detalhes = plano(Entrada.query.filter(Entrada.reagente_id == 3, Entrada.quantidade_restante > 0))
+    assert any('ix_entrada_reagente_disponivel' in d for d in detalhes), detalhes
+
+def test_saidas_da_entrada_usam_indice(app_sql, povoar):
+    povoar(20, 5, 2)
+    detalhes = plano(Saida.query.filter(Saida.entrada_id == 7))
+    assert any('ix_saida_entrada_id' in d for d in detalhes), detalhes
+
+def test_pedidos_por_status_saem_ordenados_do_indice(app_sql):
+    detalhes = plano(
+        Pedido.query.filter(Pedido.status == 'aberto').order_by(Pedido.data_pedido.desc(), Pedido.id.desc())
+    )
+    assert any('ix_pedido_status_data' in d for d in detalhes), detalhes
+    assert not any('TEMP B-TREE' in d for d in detalhes), detalhes
+
+def test_filtro_de_nome_usa_tabela_fts(app_sql, povoar):
+    povoar(20, 1, 0)
+    consulta = Reagente.query.filter(filtro_nome_reagente('cido 1'))
+    detalhes = plano(consulta)
+    assert any('reagente_nome_fts VIRTUAL TABLE INDEX' in d for d in detalhes), detalhes
+    assert 'SCAN reagente' not in detalhes, detalhes  # sem varredura da tabela de reagentes
+    assert sorted(r.nome for r in consulta) == ['Acido 1'] + [f'Acido {n}' for n in range(10, 20)]
+
+# Esquema como o db.create_all() do commit inicial o criava: sem
+# quantidade_base/unidade_base nem nome_normalizado
+ESQUEMA_ORIGINAL = (
+    '''CREATE TABLE user (
+        id INTEGER PRIMARY KEY, username VARCHAR(80) NOT NULL UNIQUE, email VARCHAR(120) NOT NULL UNIQUE,
+        password_hash VARCHAR(255) NOT NULL, tipo VARCHAR(20) NOT NULL, ativo BOOLEAN NOT NULL,
+        data_criacao DATETIME NOT NULL)''',
+    '''CREATE TABLE pedido (
+        id INTEGER PRIMARY KEY, data_pedido DATE NOT NULL, nome_reagente VARCHAR(200) NOT NULL,
+        controlado BOOLEAN NOT NULL, quantidade_nominal VARCHAR(100) NOT NULL, status VARCHAR(20) NOT NULL,
+        usuario_id INTEGER NOT NULL REFERENCES user (id), data_criacao DATETIME NOT NULL)''',
+    '''CREATE TABLE reagente (
+        id INTEGER PRIMARY KEY, nome VARCHAR(200) NOT NULL, controlado BOOLEAN NOT NULL,
+        quantidade_total FLOAT NOT NULL, data_criacao DATETIME NOT NULL, data_atualizacao DATETIME NOT NULL)''',
+    '''CREATE TABLE entrada (
+        id INTEGER PRIMARY KEY, reagente_id INTEGER NOT NULL REFERENCES reagente (id),
+        pedido_id INTEGER REFERENCES pedido (id), quantidade_embalagens INTEGER NOT NULL,
+        data_recebimento DATE NOT NULL, data_validade DATE, marca VARCHAR(100) NOT NULL,
+        localizacao VARCHAR(200) NOT NULL, quantidade_nominal VARCHAR(100) NOT NULL,
+        quantidade_restante FLOAT NOT NULL, usuario_id INTEGER NOT NULL REFERENCES user (id),
+        data_criacao DATETIME NOT NULL)''',
+    '''CREATE TABLE saida (
+        id INTEGER PRIMARY KEY, reagente_id INTEGER NOT NULL REFERENCES reagente (id),
+        entrada_id INTEGER NOT NULL REFERENCES entrada (id), quantidade_abatida FLOAT NOT NULL,
+        data_saida DATE NOT NULL, usuario_id INTEGER NOT NULL REFERENCES user (id), observacoes TEXT,
+        data_criacao DATETIME NOT NULL)''',
+)
+
+DADOS_ORIGINAIS = (
+    "INSERT INTO user VALUES (1, 'teste', 'teste@feq.unicamp.br', 'x', 'admin', 1, '2024-01-01')",
+    "INSERT INTO pedido VALUES (1, '2024-01-01', 'Acetona', 0, '2,5 L', 'aberto', 1, '2024-01-01')",
+    "INSERT INTO pedido VALUES (2, '2024-01-01', 'Luvas', 0, 'caixa', 'aberto', 1, '2024-01-01')",
+    # Antes só os dígitos contavam: 2 x "1L" valiam 2 e 2 x "500ml" valiam 1000;
+    # 0,5 foi abatido da entrada de "1L", e o total somava unidades diferentes
+    "INSERT INTO reagente VALUES (1, 'Etanol', 0, 1001.5, '2024-01-01', '2024-01-01')",
+    "INSERT INTO reagente VALUES (2, 'Álcool isopropílico', 0, 3, '2024-01-01', '2024-01-01')",
+    "INSERT INTO reagente VALUES (3, 'Alcool Isopropilico', 0, 2, '2024-01-01', '2024-01-01')",
+    "INSERT INTO entrada VALUES (1, 1, NULL, 2, '2024-01-01', NULL, 'M', 'A', '1L', 1.5, 1, '2024-01-01')",
+    "INSERT INTO entrada VALUES (2, 1, NULL, 2, '2024-01-01', NULL, 'M', 'A', '500ml', 1000, 1, '2024-01-01')",
+    "INSERT INTO entrada VALUES (3, 2, NULL, 3, '2024-01-01', NULL, 'M', 'A', 'frasco', 3, 1, '2024-01-01')",
+    "INSERT INTO entrada VALUES (4, 3, NULL, 2, '2024-01-01', NULL, 'M', 'A', 'frasco', 2, 1, '2024-01-01')",
+    "INSERT INTO saida VALUES (1, 1, 1, 0.5, '2024-01-02', 1, NULL, '2024-01-02')",
+)
+
+def test_migracoes_a_partir_do_esquema_original(tmp_path):
+    engine = create_engine('sqlite:///' + str(tmp_path / 'antigo.db'))
+    with engine.begin() as conexao:
+        for comando in ESQUEMA_ORIGINAL + DADOS_ORIGINAIS:
+            conexao.execute(text(comando))
+    
+    assert migracoes.aplicar_migracoes(engine) == [versao for versao, _, _ in migracoes.MIGRACOES]
+    
+    with engine.connect() as conexao:
+        def linhas(consulta):
+            return conexao.execute(text(consulta)).all()
+        
+        assert linhas('SELECT id, quantidade_base, unidade_base, quantidade_restante FROM entrada ORDER BY id') == [
+            (1, 1000, 'mL', 1500),  # fator 1000: saldo de 1,5 L
+            (2, 500, 'mL', 1000),   # já estava em mL
+            (3, None, None, 3),     # texto não reconhecido fica como estava
+            (4, None, None, 2),
+        ]
+        assert linhas('SELECT quantidade_abatida FROM saida') == [(500,)]
+        assert linhas('SELECT id, quantidade_base, unidade_base FROM pedido ORDER BY id') == [
+            (1, 2500, 'mL'),
+            (2, None, None),
+        ]
+        # Duplicados pelo nome normalizado são unidos no de menor id
+        assert linhas('SELECT id, nome_normalizado, quantidade_total FROM reagente ORDER BY id') == [
+            (1, 'etanol', 2500),
+            (2, 'alcool isopropilico', 5),
+        ]
+        assert linhas('SELECT id, reagente_id FROM entrada WHERE id > 2 ORDER BY id') == [(3, 2), (4, 2)]
+        assert linhas('SELECT versao FROM versao_dados') == [(0,)]
+    
+    assert migracoes.aplicar_migracoes(engine) == []
+    engine.dispose()
@@ -0,0 +1,26 @@
+import pytest
+
+import app
+
+ROTAS_PROTEGIDAS = ['/entrada-reagente', '/saida-reagente', '/relatorio']
+
+@pytest.fixture
+def cliente():
+    return app.app.test_client()
+
+@pytest.mark.parametrize('rota', ROTAS_PROTEGIDAS)
+def test_sessao_antiga_sem_user_id_volta_ao_login(cliente, rota):
+    with cliente.session_transaction() as sessao:
+        sessao['logged_in'] = True
+        sessao['username'] = 'admin'
+    resposta = cliente.get(rota)
+    assert resposta.status_code == 302
+    assert resposta.headers['Location'].endswith('/login')
+
+@pytest.mark.parametrize('rota', ROTAS_PROTEGIDAS)
+def test_usuario_sem_permissao_recebe_403(cliente, rota):
+    with cliente.session_transaction() as sessao:
+        sessao['logged_in'] = True
+        sessao['user_id'] = 4  # aluno_grad: só reagentes.ver, pedidos.ver e relatorios.ver
+    resposta = cliente.get(rota)
+    assert resposta.status_code == (200 if rota == '/relatorio' else 403)
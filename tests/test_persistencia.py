@@ -0,0 +1,188 @@
+import json
+import multiprocessing
+import os
+
+import pytest
+
+import app
+from persistencia import ArmazenamentoMemoria, ArmazenamentoSQLite, DiarioEventos
+
+WORKERS = 3
+PEDIDOS_POR_WORKER = 20
+
+@pytest.fixture
+def armazenamento_sqlite(tmp_path):
+    """Carrega o app em um SQLite compartilhado, como o gunicorn --preload antes do fork."""
+    estado = app.exportar_estado()
+    app.iniciar_armazenamento(ArmazenamentoSQLite(str(tmp_path / 'estado.db'), snapshot_a_cada=25))
+    yield app.armazenamento
+    app.armazenamento = ArmazenamentoMemoria()
+    app.restaurar_estado(estado)
+
+def estado_pedidos():
+    return [(p['id'], p['reagente'], p['status']) for p in app.pedidos_data]
+
+def escritor(numero, prontos, escritas_prontas, resultados):
+    for i in range(PEDIDOS_POR_WORKER):
+        app.executar_evento('pedido', {
+            'reagente': f'Reagente {numero}-{i}',
+            'data': '2024-09-01',
+            'controlado': 'Não',
+            'quantidade_nominal': '1L',
+            'status': 'Aberto'
+        })
+    prontos.put(numero)
+    escritas_prontas.wait(60)
+    app.armazenamento.sincronizar()
+    resultados.put(('escritor', estado_pedidos()))
+
+def leitor(escritas_prontas, resultados):
+    # Só lê: nunca abre transação de escrita, então depende de sincronizar()
+    escritas_prontas.wait(60)
+    app.armazenamento.sincronizar()
+    resultados.put(('leitor', estado_pedidos()))
+
+def test_workers_criados_por_fork_convergem(armazenamento_sqlite):
+    contexto = multiprocessing.get_context('fork')
+    prontos = contexto.Queue()
+    resultados = contexto.Queue()
+    escritas_prontas = contexto.Event()
+    pedidos_iniciais = len(app.pedidos_data)
+
+    processo_leitor = contexto.Process(target=leitor, args=(escritas_prontas, resultados))
+    processo_leitor.start()
+    escritores = [contexto.Process(target=escritor, args=(n, prontos, escritas_prontas, resultados))
+                  for n in range(WORKERS)]
+    for processo in escritores:
+        processo.start()
+    for _ in escritores:
+        prontos.get(timeout=60)
+    escritas_prontas.set()
+    estados = [resultados.get(timeout=60) for _ in range(WORKERS + 1)]
+    for processo in escritores + [processo_leitor]:
+        processo.join(60)
+
+    armazenamento_sqlite.sincronizar()
+    esperado = estado_pedidos()
+    assert len(esperado) == pedidos_iniciais + WORKERS * PEDIDOS_POR_WORKER
+    assert len({pedido_id for pedido_id, _, _ in esperado}) == len(esperado)
+    for origem, estado in estados:
+        assert estado == esperado, origem
+    assert all(processo.exitcode == 0 for processo in escritores + [processo_leitor])
+
+class Lista:
+    """Estado mínimo para o diário: uma lista de números, um evento 'n' por número."""
+
+    def __init__(self):
+        self.itens = []
+
+    def restaurar(self, estado):
+        self.itens = list(estado)
+
+    def aplicar(self, tipo, dados):
+        assert tipo == 'n'
+        self.itens.append(dados)
+
+    def exportar(self):
+        return list(self.itens)
+
+def abrir_diario(diretorio, snapshot_a_cada=1000):
+    """Carrega o diário em um estado novo, como numa reinicialização do processo."""
+    lista = Lista()
+    diario = DiarioEventos(str(diretorio), snapshot_a_cada=snapshot_a_cada, fsync=False)
+    diario.carregar(lista.restaurar, lista.aplicar, lista.exportar)
+    return diario, lista
+
+def gravar(diario, lista, *numeros):
+    # Mesma sequência de app.executar_evento
+    for n in numeros:
+        with diario.transacao():
+            diario.registrar('n', n)
+            lista.aplicar('n', n)
+            if diario.precisa_snapshot():
+                diario.gravar_snapshot(lista.exportar())
+
+def linhas_diario(diretorio):
+    with open(os.path.join(diretorio, 'diario.jsonl'), encoding='utf-8') as f:
+        return [json.loads(linha) for linha in f]
+
+def test_diario_reaplica_eventos_ao_reiniciar(tmp_path):
+    diario, lista = abrir_diario(tmp_path)
+    gravar(diario, lista, 1, 2, 3)
+    
+    diario, lista = abrir_diario(tmp_path)
+    assert lista.itens == [1, 2, 3]
+    assert diario.seq == 3
+    
+    gravar(diario, lista, 4)
+    assert [evento['seq'] for evento in linhas_diario(tmp_path)] == [1, 2, 3, 4]
+    assert abrir_diario(tmp_path)[1].itens == [1, 2, 3, 4]
+
+def test_snapshot_compacta_o_diario(tmp_path):
+    diario, lista = abrir_diario(tmp_path, snapshot_a_cada=3)
+    gravar(diario, lista, *range(1, 8))
+    
+    # Snapshots depois dos eventos 3 e 6: só o 7 continua no diário
+    with open(tmp_path / 'snapshot.json', encoding='utf-8') as f:
+        assert json.load(f) == {'seq': 6, 'estado': [1, 2, 3, 4, 5, 6]}
+    assert linhas_diario(tmp_path) == [{'seq': 7, 'tipo': 'n', 'dados': 7}]
+    
+    diario, lista = abrir_diario(tmp_path, snapshot_a_cada=3)
+    assert lista.itens == list(range(1, 8))
+    assert diario.seq == 7
+    assert not diario.precisa_snapshot()
+
+def test_eventos_ja_incluidos_no_snapshot_sao_ignorados(tmp_path):
+    diario, lista = abrir_diario(tmp_path)
+    gravar(diario, lista, 1, 2, 3, 4)
+    
+    # Queda entre gravar o snapshot e esvaziar o diário: os eventos 1 a 3
+    # estão nos dois lugares
+    with open(tmp_path / 'snapshot.json', 'w', encoding='utf-8') as f:
+        json.dump({'seq': 3, 'estado': [1, 2, 3]}, f)
+    
+    diario, lista = abrir_diario(tmp_path)
+    assert lista.itens == [1, 2, 3, 4]
+    assert diario.seq == 4
+
+@pytest.mark.parametrize('resto', [
+    '{"seq": 4, "tipo": "n", "da',   # escrita interrompida no meio da linha
+    '{"seq": 4, "tipo": "n"\n',      # linha terminada, mas JSON inválido
+])
+def test_linha_final_incompleta_e_cortada(tmp_path, resto):
+    diario, lista = abrir_diario(tmp_path)
+    gravar(diario, lista, 1, 2, 3)
+    tamanho_valido = os.path.getsize(tmp_path / 'diario.jsonl')
+    with open(tmp_path / 'diario.jsonl', 'a', encoding='utf-8') as f:
+        f.write(resto)
+    
+    diario, lista = abrir_diario(tmp_path)
+    assert lista.itens == [1, 2, 3]
+    assert os.path.getsize(tmp_path / 'diario.jsonl') == tamanho_valido
+    
+    # O próximo evento começa numa linha própria e sobrevive a outra reinicialização
+    gravar(diario, lista, 4)
+    assert abrir_diario(tmp_path)[1].itens == [1, 2, 3, 4]
+
+def test_app_recupera_pedidos_do_diario(tmp_path):
+    estado = app.exportar_estado()
+    try:
+        app.iniciar_armazenamento(DiarioEventos(str(tmp_path), snapshot_a_cada=2, fsync=False))
+        for i in range(3):
+            app.executar_evento('pedido', {
+                'reagente': f'Reagente diário {i}',
+                'data': '2024-09-01',
+                'controlado': 'Não',
+                'quantidade_nominal': '1L',
+                'status': 'Aberto'
+            })
+        esperado = estado_pedidos()
+        
+        # Reinicialização: a memória volta aos dados de exemplo e o diário é relido
+        app.restaurar_estado(estado)
+        app.iniciar_armazenamento(DiarioEventos(str(tmp_path), snapshot_a_cada=2, fsync=False))
+        assert estado_pedidos() == esperado
+        assert [p[1] for p in esperado[-3:]] == [f'Reagente diário {i}' for i in range(3)]
+    finally:
+        app.armazenamento = ArmazenamentoMemoria()
+        app.restaurar_estado(estado)
@@ -0,0 +1,30 @@
+import pytest
+from sqlalchemy import event
+
+from src.models.user import db
+
+def contar_comandos(funcao):
+    """Executa funcao() e devolve (comandos SQL emitidos, resultado)."""
+    comandos = []
+    def registrar(conexao, cursor, comando, parametros, contexto, executemany):
+        comandos.append(comando)
+    event.listen(db.engine, 'before_cursor_execute', registrar)
+    try:
+        resultado = funcao()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', registrar)
+    return comandos, resultado
+
+@pytest.mark.parametrize('entradas, saidas', [(2, 2), (20, 15)])
+def test_buscar_reagentes_usa_numero_fixo_de_comandos(app_sql, cliente_sql, povoar, entradas, saidas):
+    povoar(3, entradas, saidas)
+    
+    comandos, resposta = contar_comandos(lambda: cliente_sql.get('/reagentes/buscar?nome=acido'))
+    
+    assert resposta.status_code == 200
+    itens = [item for item in resposta.json if item['tipo'] == 'estoque']
+    assert len(itens) == 3 * entradas
+    assert all(len(item['historico_saidas']) == saidas for item in itens)
+    assert itens[0]['entrada']['reagente_nome'] == 'Acido 0'
+    # Reagentes, entradas (selectinload), saídas (selectinload) e pedidos
+    assert len(comandos) == 4, comandos
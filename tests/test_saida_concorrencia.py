@@ -0,0 +1,55 @@
+import threading
+
+from src.models.reagente import Reagente, Entrada, Saida
+from src.models.user import db
+
+THREADS = 8
+TENTATIVAS_POR_THREAD = 10
+ESTOQUE = 50
+
+def test_saidas_simultaneas_nao_ultrapassam_o_estoque(app_sql, povoar):
+    povoar(1, 1, 0, quantidade=ESTOQUE)
+    respostas = []
+    trava = threading.Lock()
+    
+    def retirar():
+        cliente = app_sql.test_client()
+        with cliente.session_transaction() as sessao:
+            sessao['user_id'] = 1
+        for _ in range(TENTATIVAS_POR_THREAD):
+            resposta = cliente.post('/saidas', json={
+                'entrada_id': 1, 'quantidade_abatida': 1, 'data_saida': '2024-02-01'
+            })
+            with trava:
+                respostas.append(resposta.status_code)
+    
+    threads = [threading.Thread(target=retirar) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(respostas) == THREADS * TENTATIVAS_POR_THREAD
+    assert respostas.count(201) == ESTOQUE
+    assert respostas.count(400) == THREADS * TENTATIVAS_POR_THREAD - ESTOQUE
+    
+    db.session.expire_all()
+    assert db.session.get(Entrada, 1).quantidade_restante == 0
+    assert db.session.get(Reagente, 1).quantidade_total == 0
+    assert Saida.query.count() == ESTOQUE
+
+def test_total_do_reagente_menor_que_a_entrada_nao_e_reportado_como_falta_de_saldo(app_sql, povoar):
+    povoar(1, 1, 0, quantidade=50)
+    Reagente.query.one().quantidade_total = 5
+    db.session.commit()
+    cliente = app_sql.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao['user_id'] = 1
+    
+    resposta = cliente.post('/saidas', json={'entrada_id': 1, 'quantidade_abatida': 10, 'data_saida': '2024-02-01'})
+    
+    assert resposta.status_code == 409
+    assert 'inconsistente' in resposta.json['error']
+    db.session.expire_all()
+    assert db.session.get(Entrada, 1).quantidade_restante == 50
+    assert Saida.query.count() == 0
@@ -0,0 +1,64 @@
+import pytest
+
+from src.models.unidades import converter_numero, converter_quantidade
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('500ml', (500, 'mL')),
+    ('500 ML', (500, 'mL')),
+    ('1L', (1000, 'mL')),
+    ('2,5 L', (2500, 'mL')),
+    ('2.5 L', (2500, 'mL')),
+    ('1.5 L', (1500, 'mL')),
+    ('12.500 mL', (12500, 'mL')),
+    ('250 µL', (0.25, 'mL')),
+    ('1 litro', (1000, 'mL')),
+    ('1.000 g', (1000, 'g')),
+    ('1.000.000 mg', (1000, 'g')),
+    ('1.000,5 g', (1000.5, 'g')),
+    ('1,000.5 g', (1000.5, 'g')),
+    ('0.500 kg', (500, 'g')),
+    ('25 gr', (25, 'g')),
+    ('6 x 500 mL', (3000, 'mL')),
+    ('6×1L', (6000, 'mL')),
+    ('10', (10, 'un')),
+    ('10 un', (10, 'un')),
+    ('  2 kg  ', (2000, 'g')),
+])
+def test_formatos_aceitos(texto, esperado):
+    assert converter_quantidade(texto) == esperado
+
+def test_ponto_seguido_de_tres_digitos_e_separador_de_milhar():
+    # Heurística pt-BR: "1.500 L" é mil e quinhentos litros, não 1,5 L.
+    # Só "0.500" (zero à esquerda) continua decimal
+    assert converter_quantidade('1.500 L') == (1500000, 'mL')
+    assert converter_quantidade('0.500 L') == (500, 'mL')
+
+@pytest.mark.parametrize('texto', [
+    '',
+    '   ',
+    'abc',
+    'frasco',
+    '1 xyz',
+    'L 500',
+    '500 ml de etanol',
+    '1,5,5 L',
+    '2 x L',
+    '-5 ml',
+])
+def test_formatos_recusados(texto):
+    with pytest.raises(ValueError):
+        converter_quantidade(texto)
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('2', 2.0),
+    ('2.5', 2.5),
+    ('2,5', 2.5),
+    ('0.500', 0.5),
+    ('1.000', 1000.0),
+    ('1.000.000', 1000000.0),
+    ('1.000,25', 1000.25),
+    ('1,000.25', 1000.25),
+    ('1000.5', 1000.5),
+])
+def test_converter_numero(texto, esperado):
+    assert converter_numero(texto) == esperado